@@ -6,13 +6,18 @@ from time import sleep
 
 # importing myo communication package
 from myo_read_multi.pipeline_buffer import launch_myo_comm, reset_pipeline_buff_flags, wait_for_start_time
+from myo_read_multi.pipeline_buffer import read_pipeline_buff, wait_for_pipeline_buff, wait_for_event
+from myo_read_multi.pipeline_buffer import attach_pipeline_transport
 from myo_read_multi.myo_raw import Pose
 
 pipeline_buffer_size = 25
 n_clients = 10
 
+# specifying the transport for the buffer content ("redis", "shm" or "stream")
+backend = "redis"
+
 # specifying a check delay (default is 0.1)
-# defines the wait time between pipeline checks in the buffer maintenance process
+# defines the max wait time between pipeline checks (processes are woken up when data is published)
 check_delay = 0.1
 
 # client process for the myo server
@@ -20,26 +25,31 @@ def myo_client_process(r_server, client_index, check_delay):
 
     client_activated = False
 
+    # attaching the client process to the buffer transport (once per process)
+    transport = attach_pipeline_transport(r_server)
+
     try :
 
         # while the incoming buffer is maintained
         while(r_server.get("buffer_maintained") == "1"):
             
-            # once the model is activated, reduce resource consumption
-            if client_activated : sleep(check_delay)
+            # pipeline buffer is ready to be read (waits for the buffer to be published)
+            if(wait_for_pipeline_buff(r_server, transport, client_index, check_delay)):
 
-            # checking if the client is activated
-            else :
-                client_activated = wait_for_start_time(r_server, client_index)
+                # checking if the client is activated
+                if not client_activated :
+                    client_activated = wait_for_start_time(r_server, client_index)
 
-            # pipeline buffer is ready to be read
-            if(r_server.lindex("client_read_data", client_index) == "1" and client_activated):
+                # activation is checked again when the next buffer is published
+                if not client_activated :
+                    wait_for_event(r_server, "pipeline_buff", check_delay)
+                    continue
 
                 # reading data from the buffer
-                #print("Raw data : ", np.array(json.loads(r_server.get("pipeline_buff"))))
+                #print("Raw data : ", read_pipeline_buff(r_server, transport, client_index))
 
                 # marking buffer as read (by this client)
-                reset_pipeline_buff_flags(r_server, client_index)
+                reset_pipeline_buff_flags(r_server, transport, client_index)
                 
                 print("Client with index : ", client_index, " received data.")
                 
@@ -54,7 +64,7 @@ if __name__ == "__main__":
 
     # starting the buffer maintenance process
     r_server, buffer_maintenance_p = launch_myo_comm(pipeline_buffer_size, n_clients=n_clients, 
-                                                    check_delay=check_delay)
+                                                    check_delay=check_delay, backend=backend)
 
     # lauching the client processes
     myo_clients = []
@@ -0,0 +1,108 @@
+import json
+import time
+import numpy as np
+
+from multiprocessing import Process
+
+# importing myo communication package
+from myo_read_multi import pipeline_buffer
+from myo_read_multi.pipeline_buffer import launch_myo_comm, reset_pipeline_buff_flags, wait_for_start_time
+from myo_read_multi.pipeline_buffer import read_pipeline_buff, wait_for_pipeline_buff, write_model_prediction
+from myo_read_multi.pipeline_buffer import publish_event, attach_pipeline_transport
+
+# Measures the latency from the arrival of a window to the prediction written by a client,
+# with the pipeline stages woken by events, then polling the flags every check_delay
+# (requires a running redis server, the myo is replaced by a simulated stream)
+# The benchmark runs in its own redis db (bench_redis_db_id), flushed after each run,
+# the db of the live pipeline (redis_db_id) is not touched
+
+pipeline_buffer_size = 25
+n_outputs = 7
+n_windows = 80
+check_delay = 0.1
+
+# nominal myo raw emg rate (samples per second)
+sample_rate = 200
+
+# redis db of the benchmark (last of the 16 default redis dbs), must differ from redis_db_id
+bench_redis_db_id = 15
+
+
+# Simulated myo stream, replaces collect_myo_data in the buffer maintenance process
+# A window is published every pipeline_buffer_size samples, its arrival time is recorded
+# (the transport is not used, windows go through redis)
+def simulated_myo_data(conn_pool, transport):
+
+    r_server = pipeline_buffer.redis.StrictRedis(connection_pool=conn_pool)
+    window = np.random.randint(-128, 128, (pipeline_buffer.n_incoming_sensors, pipeline_buffer_size))
+
+    next_window = time.time()
+    n_published = 0
+    while n_published < n_windows:
+
+        next_window += pipeline_buffer_size / sample_rate
+        time.sleep(max(0, next_window - time.time()))
+
+        # windows arriving while the previous one is not forwarded are dropped
+        if r_server.get("raw_data_ready") == "0":
+            r_server.rpush("bench_arrival_times", str(time.time()))
+            r_server.set("raw_data", json.dumps(window.tolist()))
+            r_server.set("raw_data_ready", "1")
+            publish_event(r_server, "buffer")
+            n_published += 1
+
+    r_server.set("incoming_data", "0")
+
+
+# Single client, writes a prediction for every window and records the latency
+def bench_client(r_server):
+
+    client_activated = False
+    transport = attach_pipeline_transport(r_server)
+    while(r_server.get("buffer_maintained") == "1"):
+
+        if(wait_for_pipeline_buff(r_server, transport, 0, check_delay)):
+
+            if not client_activated :
+                client_activated = wait_for_start_time(r_server, 0)
+
+            window = read_pipeline_buff(r_server, transport, 0)
+            data_count = int(r_server.get("data_count"))
+            write_model_prediction(r_server, 0, 0, [0.0] * n_outputs, data_count)
+
+            arrival_time = float(r_server.lindex("bench_arrival_times", data_count - 1))
+            r_server.rpush("bench_latencies", str(time.time() - arrival_time))
+            reset_pipeline_buff_flags(r_server, transport, 0)
+
+
+# Runs the simulated pipeline and returns the latencies (in seconds)
+def bench_pipeline(use_events):
+
+    pipeline_buffer.use_pipeline_events = use_events
+    pipeline_buffer.collect_myo_data = simulated_myo_data
+    pipeline_buffer.redis_db_id = bench_redis_db_id
+
+    r_server, buffer_maintenance_p = launch_myo_comm(pipeline_buffer_size, n_outputs, n_clients=1,
+                                                     check_delay=check_delay)
+    r_server.delete("bench_arrival_times", "bench_latencies")
+
+    client_p = Process(target=bench_client, args=(r_server,))
+    client_p.start()
+    buffer_maintenance_p.start()
+    buffer_maintenance_p.join()
+    client_p.join()
+
+    latencies = np.array([float(l) for l in r_server.lrange("bench_latencies", 0, -1)])
+    r_server.flushdb()
+    return latencies
+
+
+if __name__ == "__main__":
+
+    if bench_redis_db_id == pipeline_buffer.redis_db_id:
+        raise(ValueError("The benchmark db must differ from the pipeline db : " + str(bench_redis_db_id)))
+
+    for name, use_events in (("events", True), ("polling", False)):
+        latencies = bench_pipeline(use_events) * 1000
+        print("%-8s : %d windows, latency mean %6.2f ms, median %6.2f ms, max %6.2f ms" %
+              (name, len(latencies), latencies.mean(), np.median(latencies), latencies.max()))
@@ -12,6 +12,7 @@
 
 from __future__ import print_function
 
+import collections
 import enum
 import re
 import struct
@@ -19,6 +20,7 @@ import sys
 import threading
 import time
 
+import numpy as np
 import serial
 from serial.tools.list_ports import comports
 
@@ -61,12 +63,34 @@ class Pose(enum.Enum):
     UNKNOWN = 255
 
 
+# BGAPI packet header : [type, length, class, command]
+PACKET_HEADER = struct.Struct('<4B')
+# attribute value event header : [connection, attribute handle, type, value length]
+ATTR_HEADER = struct.Struct('<BHBB')
+# raw emg attribute value event : attribute header followed by two emg samples
+# of 8 int8 values, as sent by the raw emg characteristics
+EMG_EVENT = struct.Struct('<BHBB16b')
+# length of a raw emg attribute value event packet (packet header included)
+EMG_EVENT_LEN = 4 + EMG_EVENT.size
+# notification handles of the four raw emg characteristics
+EMG_HANDLES = (0x2b, 0x2e, 0x31, 0x34)
+
+
 class Packet(object):
-    def __init__(self, ords):
-        self.typ = ords[0]
-        self.cls = ords[2]
-        self.cmd = ords[3]
-        self.payload = multichr(ords[4:])
+    '''A BGAPI packet framed in a receive buffer. The payload is not copied,
+    it is a memoryview slice of the buffer the packet was framed in.
+    '''
+    __slots__ = ('typ', 'cls', 'cmd', 'buf', 'offset', 'end')
+
+    def __init__(self, buf, offset=0, end=None):
+        self.typ, _, self.cls, self.cmd = PACKET_HEADER.unpack_from(buf, offset)
+        self.buf = buf
+        self.offset = offset
+        self.end = len(buf) if end is None else end
+
+    @property
+    def payload(self):
+        return memoryview(self.buf)[self.offset + 4 : self.end]
 
     def __repr__(self):
         return 'Packet(%02X, %02X, %02X, [%s])' % \
@@ -74,30 +98,38 @@ class Packet(object):
              ' '.join('%02X' % b for b in multiord(self.payload)))
 
 
+# BGAPI packet types : [BLE response pkt, BLE event pkt, wifi response pkt, wifi event pkt]
+PACKET_TYPES = (0x00, 0x80, 0x08, 0x88)
+
+
 class BT(object):
     '''Implements the non-Myo-specific details of the Bluetooth protocol.'''
-    def __init__(self, tty):
-        self.ser = serial.Serial(port=tty, baudrate=9600, dsrdtr=1)
-        self.buf = []
+    def __init__(self, tty, ser=None):
+        if ser is None:
+            ser = serial.Serial(port=tty, baudrate=9600, dsrdtr=1)
+        self.ser = ser
+        self.buf = b''
+        self.packets = collections.deque()
         self.lock = threading.Lock()
         self.handlers = []
+        self.batch_handlers = []
 
     # internal data-handling methods
     def recv_packet(self, timeout=None):
         t0 = time.time()
-        self.ser.timeout = None
-        while timeout is None or time.time() < t0 + timeout:
+        while not self.packets:
+            remaining = None
             if timeout is not None:
-                self.ser.timeout = t0 + timeout - time.time()
-            c = self.ser.read()
-            if not c:
+                remaining = t0 + timeout - time.time()
+                if remaining <= 0:
+                    return None
+            if not self.read_bytes(remaining):
                 return None
 
-            ret = self.proc_byte(ord(c))
-            if ret:
-                if ret.typ == 0x80:
-                    self.handle_event(ret)
-                return ret
+        p = self.packets.popleft()
+        if p.typ == 0x80:
+            self.handle_event(p)
+        return p
 
     def recv_packets(self, timeout=.5):
         res = []
@@ -109,31 +141,83 @@ class BT(object):
             res.append(p)
         return res
 
-    def proc_byte(self, c):
-        if not self.buf:
-            if c in [0x00, 0x80, 0x08, 0x88]:  # [BLE response pkt, BLE event pkt, wifi response pkt, wifi event pkt]
-                self.buf.append(c)
-            return None
-        elif len(self.buf) == 1:
-            self.buf.append(c)
-            self.packet_len = 4 + (self.buf[0] & 0x07) + self.buf[1]
-            return None
-        else:
-            self.buf.append(c)
+    def recv_batch(self, timeout=None):
+        '''Waits up to timeout for incoming bytes, frames every complete packet
+        they contain and dispatches the events among them as one batch.
+        '''
+        if not self.packets:
+            self.read_bytes(timeout)
+
+        packets = list(self.packets)
+        self.packets.clear()
+        self.handle_events([p for p in packets if p.typ == 0x80])
+        return packets
+
+    def read_bytes(self, timeout=None):
+        '''Reads everything waiting on the serial port in one call (blocking
+        for at least one byte) and queues the complete packets found in it.
+        Returns the number of bytes read.
+        '''
+        # reconfiguring the port is expensive, only do it when needed
+        if self.ser.timeout != timeout:
+            self.ser.timeout = timeout
 
-        if self.packet_len and len(self.buf) == self.packet_len:
-            p = Packet(self.buf)
-            self.buf = []
-            return p
-        return None
+        data = self.ser.read(max(1, self.ser.in_waiting))
+        if not data:
+            return 0
+
+        # grabbing what arrived while we were blocked on the first byte
+        n_waiting = self.ser.in_waiting
+        if n_waiting:
+            data += self.ser.read(n_waiting)
+
+        self.packets.extend(self.proc_bytes(data))
+        return len(data)
+
+    def proc_bytes(self, data):
+        '''Frames all the complete packets in the pending bytes followed by
+        data. The trailing partial packet is kept for the next call.
+        '''
+        if self.buf:
+            data = self.buf + data
+
+        packets = []
+        n = len(data)
+        i = 0
+        while i < n:
+            # resynchronizing on the next valid packet type
+            if data[i] not in PACKET_TYPES:
+                i += 1
+                continue
+            if i + 1 >= n:
+                break
+            end = i + 4 + (data[i] & 0x07) + data[i + 1]
+            if end > n:
+                break
+            packets.append(Packet(data, i, end))
+            i = end
+
+        self.buf = data[i:]
+        return packets
 
     def handle_event(self, p):
-        for h in self.handlers:
-            h(p)
+        self.handle_events([p])
+
+    def handle_events(self, ps):
+        if not ps:
+            return
+        for h in self.batch_handlers:
+            h(ps)
+        for p in ps:
+            for h in self.handlers:
+                h(p)
 
     def add_handler(self, h):
         self.handlers.append(h)
 
+    def add_batch_handler(self, h):
+        self.batch_handlers.append(h)
+
     def remove_handler(self, h):
         try:
             self.handlers.remove(h)
@@ -192,15 +276,18 @@ class BT(object):
 class MyoRaw(object):
     '''Implements the Myo-specific communication protocol.'''
 
-    def __init__(self, tty=None):
-        if tty is None:
+    def __init__(self, tty=None, ser=None):
+        if tty is None and ser is None:
             tty = self.detect_tty()
-        if tty is None:
+        if tty is None and ser is None:
             raise ValueError('Myo dongle not found!')
 
-        self.bt = BT(tty)
+        self.bt = BT(tty, ser)
         self.conn = None
         self.emg_handlers = []
+        self.emg_block_handlers = []
+        self.emg_block_size = 0
+        self.emg_block_chunks = []
         self.imu_handlers = []
         self.arm_handlers = []
         self.pose_handlers = []
@@ -215,7 +302,7 @@ class MyoRaw(object):
         return None
 
     def run(self, timeout=None):
-        self.bt.recv_packet(timeout)
+        self.bt.recv_batch(timeout)
 
     def connect(self):
         # stop everything from before
@@ -231,7 +318,7 @@ class MyoRaw(object):
             p = self.bt.recv_packet()
             print('scan response:', p)
 
-            if p.payload.endswith(b'\x06\x42\x48\x12\x4A\x7F\x2C\x48\x47\xB9\xDE\x04\xA9\x01\x00\x06\xD5'):
+            if p.payload.tobytes().endswith(b'\x06\x42\x48\x12\x4A\x7F\x2C\x48\x47\xB9\xDE\x04\xA9\x01\x00\x06\xD5'):
                 addr = list(multiord(p.payload[2:8]))
                 break
         self.bt.end_scan()
@@ -280,7 +367,7 @@ class MyoRaw(object):
 
         else:
             name = self.read_attr(0x03)
-            print('device name: %s' % name.payload)
+            print('device name: %s' % name.payload.tobytes())
 
             # enable IMU data
             self.write_attr(0x1d, b'\x01\x00')
@@ -292,58 +379,102 @@ class MyoRaw(object):
             self.write_attr(0x12, b'\x01\x10')
 
         # add data handlers
-        def handle_data(p):
-            if (p.cls, p.cmd) != (4, 5):
-                return
+        self.bt.add_handler(self.handle_data)
+        self.bt.add_batch_handler(self.handle_data_batch)
+
+    def handle_data(self, p):
+        if p.cls != 4 or p.cmd != 5:
+            return
+
+        # the attribute header and the emg samples of a raw emg event are
+        # unpacked straight from the receive buffer with a single struct call,
+        # the payload is only sliced for the rarer events
+        if p.end - p.offset == EMG_EVENT_LEN:
+            vals = EMG_EVENT.unpack_from(p.buf, p.offset + 4)
+            attr = vals[1]
 
-            c, attr, typ = unpack('BHB', p.payload[:4])
-            pay = p.payload[5:]
-
-            if attr == 0x27:
-                # Unpack a 17 byte array, first 16 are 8 unsigned shorts, last one an unsigned char
-                vals = unpack('8HB', pay)
-                # not entirely sure what the last byte is, but it's a bitmask that
-                # seems to indicate which sensors think they're being moved around or
-                # something
-                emg = vals[:8]
-                moving = vals[8]
-                self.on_emg(emg, moving)
             # Read notification handles corresponding to the for EMG characteristics
-            elif attr == 0x2b or attr == 0x2e or attr == 0x31 or attr == 0x34:
+            if attr in EMG_HANDLES:
+                # samples are only decoded one by one for per sample handlers
+                if not self.emg_handlers:
+                    return
+
                 '''According to http://developerblog.myo.com/myocraft-emg-in-the-bluetooth-protocol/
                 each characteristic sends two secuential readings in each update,
                 so the received payload is split in two samples. According to the
                 Myo BLE specification, the data type of the EMG samples is int8_t.
                 '''
-                emg1 = struct.unpack('<8b', pay[:8])
-                emg2 = struct.unpack('<8b', pay[8:])
-                self.on_emg(emg1, 0)
-                self.on_emg(emg2, 0)
-            # Read IMU characteristic handle
-            elif attr == 0x1c:
-                vals = unpack('10h', pay)
-                quat = vals[:4]
-                acc = vals[4:7]
-                gyro = vals[7:10]
-                self.on_imu(quat, acc, gyro)
-            # Read classifier characteristic handle
-            elif attr == 0x23:
-                typ, val, xdir, _, _, _ = unpack('6B', pay)
-
-                if typ == 1:  # on arm
-                    self.on_arm(Arm(val), XDirection(xdir))
-                elif typ == 2:  # removed from arm
-                    self.on_arm(Arm.UNKNOWN, XDirection.UNKNOWN)
-                elif typ == 3:  # pose
-                    self.on_pose(Pose(val))
-            # Read battery characteristic handle
-            elif attr == 0x11:
-                battery_level = ord(pay)
-                self.on_battery(battery_level)
-            else:
-                print('data with unknown attr: %02X %s' % (attr, p))
+                self.on_emg(vals[4 : 12], 0)
+                self.on_emg(vals[12 : ], 0)
+                return
+        else:
+            c, attr, typ, _ = ATTR_HEADER.unpack_from(p.buf, p.offset + 4)
+
+        pay = p.payload[5:]
+
+        if attr == 0x27:
+            # Unpack a 17 byte array, first 16 are 8 unsigned shorts, last one an unsigned char
+            vals = unpack('8HB', pay)
+            # not entirely sure what the last byte is, but it's a bitmask that
+            # seems to indicate which sensors think they're being moved around or
+            # something
+            emg = vals[:8]
+            moving = vals[8]
+            self.on_emg(emg, moving)
+        # Read IMU characteristic handle
+        elif attr == 0x1c:
+            vals = unpack('10h', pay)
+            quat = vals[:4]
+            acc = vals[4:7]
+            gyro = vals[7:10]
+            self.on_imu(quat, acc, gyro)
+        # Read classifier characteristic handle
+        elif attr == 0x23:
+            typ, val, xdir, _, _, _ = unpack('6B', pay)
+
+            if typ == 1:  # on arm
+                self.on_arm(Arm(val), XDirection(xdir))
+            elif typ == 2:  # removed from arm
+                self.on_arm(Arm.UNKNOWN, XDirection.UNKNOWN)
+            elif typ == 3:  # pose
+                self.on_pose(Pose(val))
+        # Read battery characteristic handle
+        elif attr == 0x11:
+            battery_level = pay[0]
+            self.on_battery(battery_level)
+        else:
+            print('data with unknown attr: %02X %s' % (attr, p))
+
+    def handle_data_batch(self, ps):
+        '''Gathers the raw emg samples of a batch of packets and hands them to
+        the block handlers as one read only (n_samples, 8) int8 array.
+        '''
+        if not self.emg_block_handlers:
+            return
+
+        chunks = self.emg_block_chunks
+        for p in ps:
+            if p.cls != 4 or p.cmd != 5:
+                continue
+            p_len = p.end - p.offset
+            if p_len < 4 + ATTR_HEADER.size:
+                continue
+            c, attr, typ, _ = ATTR_HEADER.unpack_from(p.buf, p.offset + 4)
+            if attr not in EMG_HANDLES:
+                continue
+            # a truncated emg event would misalign every sample after it in the block
+            if p_len != EMG_EVENT_LEN:
+                print('emg data with invalid length, skipped: %s' % p)
+                continue
+            chunks.append(p.buf[p.offset + 9 : p.offset + EMG_EVENT_LEN])
+
+        # waiting for enough samples to fill a block
+        if not chunks or len(chunks) * 2 < self.emg_block_size:
+            return
 
-        self.bt.add_handler(handle_data)
+        self.emg_block_chunks = []
+        emg_block = np.frombuffer(b''.join(chunks), dtype=np.int8).reshape(-1, 8)
+        self.on_emg_block(emg_block)
 
     def write_attr(self, attr, val):
         if self.conn is not None:
@@ -460,6 +591,16 @@ class MyoRaw(object):
     def add_emg_handler(self, h):
         self.emg_handlers.append(h)
 
+    def add_emg_block_handler(self, h):
+        '''Block handlers receive the raw emg samples as (n_samples, 8) int8
+        arrays, one call for every batch of notifications (see set_emg_block_size).
+        '''
+        self.emg_block_handlers.append(h)
+
+    def set_emg_block_size(self, n_samples):
+        '''Minimum amount of samples gathered before calling the block handlers.'''
+        self.emg_block_size = n_samples
+
     def add_imu_handler(self, h):
         self.imu_handlers.append(h)
 
@@ -476,6 +617,10 @@ class MyoRaw(object):
         for h in self.emg_handlers:
             h(emg, moving)
 
+    def on_emg_block(self, emg_block):
+        for h in self.emg_block_handlers:
+            h(emg_block)
+
     def on_imu(self, quat, acc, gyro):
         for h in self.imu_handlers:
             h(quat, acc, gyro)
@@ -5,6 +5,9 @@ import json
 # importing myo bluetooth utilities
 from time import sleep, time
 from . import myo_raw
+from .ring_buffer import EmgRingBuffer
+from .shared_window import SharedWindowBuffer, check_shared_memory
+from .pipeline_events import RedisEvent, SharedEvent
 import sys
 
 # importing multi processing utilities 
@@ -20,8 +23,30 @@ n_incoming_sensors = 8
 # defining inter-process communications
 redis_db_id = 0 
 
-# global containers (each process will fork these containers)
-raw_incoming_data = np.zeros((8, 0))
+# capacity of the raw data ring buffer (in pipeline buffers)
+raw_buffer_windows = 4
+
+# defining the transports for the buffer content
+#   "redis" : windows are serialized in json and stored in the redis db
+#   "shm" : windows are stored as int8 frames in shared memory, redis only holds the slot index
+#   "stream" : windows are appended to a capped redis stream, each client reads it at its own pace
+#              (no lock-step between the clients, a slow client does not stall the others)
+transport_backends = ("redis", "shm", "stream")
+n_shared_slots = 3
+
+# defining the redis stream holding the windows ("stream" backend)
+stream_name = "pipeline_stream"
+stream_maxlen = 64
+
+# defining the events waking the pipeline processes
+#   "buffer" : raw data ready, buffer read or client activated (wakes the buffer maintenance)
+#   "pipeline_buff" : new content in the pipeline buffer (wakes the clients)
+#   "model_predictions" : new model prediction (wakes the prediction evaluation)
+# redis pub/sub channels with the "redis" backend, shared conditions with the "shm" backend
+# when disabled, the processes poll the redis flags every check_delay
+use_pipeline_events = True
+event_names = ("buffer", "pipeline_buff", "model_predictions")
+pipeline_events = {}
 
 # defining custom bluetooth exception (when connection fails)
 class BluetoothFailedConnection(Exception):
@@ -31,12 +56,77 @@ class BluetoothFailedConnection(Exception):
         return repr(self.value)
 
 
+# Transport of the buffer content for the processes of one pipeline (see transport_backends)
+# Each process holds its own instance (launch_myo_comm for the buffer maintenance,
+# attach_pipeline_transport for the clients), nothing is kept in module globals :
+# several pipelines can be launched from the same process
+# Passed to a spawned process, the shared windows are attached again from redis on first use
+class PipelineTransport(object):
+
+    # backend : transport used for the buffer content (see transport_backends)
+    def __init__(self, backend):
+
+        if backend not in transport_backends:
+            raise(ValueError("Unknown pipeline buffer backend : " + str(backend)))
+        if backend == "shm" : check_shared_memory()
+
+        self.backend = backend
+
+        # shared window slots ("shm" backend), created by the buffer maintenance, attached by the clients
+        self.shared_windows = None
+        self.owns_windows = False
+
+        # stream entries read by the clients of the process, pending and last consumed ids ("stream" backend)
+        self.stream_entries = {}
+        self.stream_last_ids = {}
+
+
+    # the shared memory mapping is not sent to spawned processes (attached again from redis)
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["shared_windows"] = None
+        state["owns_windows"] = False
+        return state
+
+
+    # creates the shared window slots and publishes their name in redis ("shm" backend)
+    # r_server : redis server connection instance
+    # window_size : number of samples per channel in a window
+    def create_shared_windows(self, r_server, window_size):
+
+        self.shared_windows = SharedWindowBuffer(window_size, n_incoming_sensors, n_shared_slots)
+        self.owns_windows = True
+        r_server.set("shm_window_size", str(window_size))
+        r_server.set("shm_name", self.shared_windows.name)
+
+
+    # returns the shared window slots, attaching the process on first use ("shm" backend)
+    # r_server : redis server connection instance
+    def get_shared_windows(self, r_server):
+
+        if self.shared_windows is None:
+            self.shared_windows = SharedWindowBuffer(int(r_server.get("shm_window_size")), n_incoming_sensors,
+                                                     n_shared_slots, name=r_server.get("shm_name"))
+        return self.shared_windows
+
+
+    # detaches the process from the shared window slots (destroyed if they were created by the process)
+    def close(self):
+
+        if self.shared_windows is not None:
+            self.shared_windows.close()
+            if self.owns_windows : self.shared_windows.unlink()
+        self.shared_windows = None
+        self.owns_windows = False
+
+
 # Creates necessary variables for redis session
 # Inputs : 
 #   r_server : redis server connection instance
 #   n_clients : number of clients/models that will be accessing the db variables
 #   n_outputs : number of outputs for the model/client (model is a classifier)
-def init_redis_variables(r_server, n_clients, n_outputs):
+#   backend : transport used for the buffer content (see transport_backends)
+def init_redis_variables(r_server, n_clients, n_outputs, backend="redis"):
 
     # defining reading flags for the client side
     r_server.set("pose_data_ready", "0")
@@ -48,19 +138,17 @@ def init_redis_variables(r_server, n_clients, n_outputs):
     r_server.set("n_clients", str(n_clients))
     r_server.set("n_active_clients", "0")
 
-    # defining list to store model predictions
+    # defining the hash storing the model predictions (one packed record per client)
+    r_server.set("n_outputs", str(n_outputs))
+    r_server.delete("model_predictions")
     for client_i in range(n_clients):
-
-        r_server.lpush("model_predictions", "X")
-        r_server.lpush("prediction_step", "X")
-        
-        list_name = "output_probs_" + str(client_i)
-        for _ in range(n_outputs):
-            r_server.lpush(list_name, "X")
+        r_server.hset("model_predictions", str(client_i), "X")
 
     # defining buffer maintenance flags
     r_server.set("raw_data_ready", "0")
+    r_server.set("raw_data_dropped", "0")
     r_server.set("data_count", "0")
+    r_server.set("prediction_count", "0")
 
     # defining continuation flags
     r_server.set("read_from_myo", "1")
@@ -68,6 +156,9 @@ def init_redis_variables(r_server, n_clients, n_outputs):
     r_server.set("incoming_data", "1")
 
     # defining shared buffer containers
+    r_server.set("pipeline_backend", backend)
+    r_server.set("shm_name", "")
+    r_server.delete(stream_name)
     r_server.set("raw_data", "")
     r_server.set("pipeline_buff", "")
     r_server.set("myo_pose", "")
@@ -75,14 +166,29 @@ def init_redis_variables(r_server, n_clients, n_outputs):
     return r_server
 
 
+# Returns the transport of the pipeline launched on the redis db, for the current process
+# To be called once per client process, the transport is then passed to the pipeline buffer functions
+# Inputs :
+#   r_server : redis server connection instance
+def attach_pipeline_transport(r_server):
+    return PipelineTransport(r_server.get("pipeline_backend"))
+
+
 # Resets proper maintenance flags when data is read in client/model process
 # Inputs :
 #   r_server : redis server connection instance
+#   transport : transport of the current process (see attach_pipeline_transport)
 #   client_index : index of the client (specified at creation time)
-def reset_pipeline_buff_flags(r_server, client_index):
+def reset_pipeline_buff_flags(r_server, transport, client_index):
+
+    # stream clients only move their own read position forward
+    if transport.backend == "stream":
+        entry = transport.stream_entries.pop(client_index, None)
+        if entry is not None : transport.stream_last_ids[client_index] = entry[0]
+        return
 
     # if flags were already flipped
-    if r_server.get("buffer_ready") == 0 : return
+    if r_server.get("buffer_ready") == "0" : return
 
     # flipping flag for the specified client
     r_server.lset("client_read_data", client_index, "0")
@@ -97,11 +203,14 @@ def reset_pipeline_buff_flags(r_server, client_index):
     # checking if all clients have read the buffer data
     buff_ready = True
     for i in range(client_range):
-        if r_server.lindex("client_read_data", i) == 1 : 
+        if r_server.lindex("client_read_data", i) == "1" : 
             buff_ready = False
             break
     
-    if buff_ready : r_server.set("buffer_ready", "0")
+    # waking the buffer maintenance, the buffer can be refilled
+    if buff_ready : 
+        r_server.set("buffer_ready", "0")
+        publish_event(r_server, "buffer")
        
 
 # Sets the buffer maintenance flags (use when the data is made available to clients)
@@ -118,7 +227,48 @@ def set_pipeline_buff_flags(r_server):
         r_server.lset("client_read_data", i, "1")
 
 
+# Reads the content of the pipeline buffer, whatever the transport
+# With the "shm" transport, the returned array is a view on the shared memory :
+# it has to be used (or copied) before the buffer flags are reset
+# Inputs :
+#   r_server : redis server connection instance
+#   transport : transport of the current process (see attach_pipeline_transport)
+#   client_index : index of the client (used by the "stream" transport)
+# Returns : buffer content, shape (n_incoming_sensors, pipeline_buff_size)
+def read_pipeline_buff(r_server, transport, client_index=0):
+
+    if transport.backend == "shm":
+        return transport.get_shared_windows(r_server).read(int(r_server.get("pipeline_buff")))
+    if transport.backend == "stream":
+        return np.array(json.loads(transport.stream_entries[client_index][1]["data"]))
+
+    return np.array(json.loads(r_server.get("pipeline_buff")))
+
+
+# Packs a model prediction in a single record : "label;step;prob_0,prob_1,..."
+# Inputs :
+#   label : predicted label
+#   probabilities : list of output probabilities of the prediction
+#   curr_step : the step at which the model made the prediction
+# Returns : packed record (string)
+def pack_model_prediction(label, probabilities, curr_step):
+    return str(label) + ";" + str(curr_step) + ";" + ",".join(repr(float(p)) for p in probabilities)
+
+
+# Unpacks a record made by pack_model_prediction
+# Inputs :
+#   record : packed record ("X" if the model has not predicted yet)
+# Returns : label (int), step (int), probabilities (numpy array), None for each if no prediction
+def unpack_model_prediction(record):
+
+    if record is None or record == "X" : return None, None, None
+
+    label, curr_step, probabilities = record.split(";")
+    return int(label), int(curr_step), np.array(probabilities.split(","), dtype=np.float64)
+
+
 # Stores latest prediction from specified model
+# The record and the prediction counter are written in a single transaction (one round trip)
 # Inputs : 
 #   r_server : redis server connection instance
 #   client_index : index of the model/client
@@ -127,12 +277,52 @@ def set_pipeline_buff_flags(r_server):
 #   curr_step : the step at which the model made the prediction
 def write_model_prediction(r_server, client_index, label, probabilities, curr_step):
 
-    r_server.lset("model_predictions", client_index, label)
-    r_server.lset("prediction_step", client_index, curr_step)
+    pipe = r_server.pipeline(transaction=True)
+    pipe.hset("model_predictions", str(client_index), pack_model_prediction(label, probabilities, curr_step))
+    pipe.incr("prediction_count")
+    pipe.execute()
+
+    # waking the prediction evaluation
+    publish_event(r_server, "model_predictions")
+
+
+# Stores the latest predictions of several models at once (single round trip)
+# Inputs :
+#   r_server : redis server connection instance
+#   client_indexes : indexes of the models/clients
+#   labels : predicted label for each model
+#   probabilities : list of output probabilities for each model
+#   curr_steps : the step at which each model made its prediction
+def write_model_predictions(r_server, client_indexes, labels, probabilities, curr_steps):
+
+    records = {}
+    for i in range(len(client_indexes)):
+        records[str(client_indexes[i])] = pack_model_prediction(labels[i], probabilities[i], curr_steps[i])
+
+    pipe = r_server.pipeline(transaction=True)
+    pipe.hset("model_predictions", mapping=records)
+    pipe.incr("prediction_count", len(records))
+    pipe.execute()
+
+    # waking the prediction evaluation
+    publish_event(r_server, "model_predictions")
 
-    prob_list_name = "output_probs_" + str(client_index)
-    for prob_i in range(len(probabilities)) :
-        r_server.lset(prob_list_name, prob_i, str(probabilities[prob_i]))
+
+# Reads the latest predictions of all models (single round trip)
+# Inputs :
+#   r_server : redis server connection instance
+#   n_models : number of models/clients to read
+# Returns : 
+#   list of labels, list of steps, list of probability arrays (None entries for models without prediction)
+def read_model_predictions(r_server, n_models):
+
+    records = r_server.hmget("model_predictions", [str(i) for i in range(n_models)])
+    predictions = [unpack_model_prediction(record) for record in records]
+
+    labels = [pred[0] for pred in predictions]
+    pred_steps = [pred[1] for pred in predictions]
+    pred_probs = [pred[2] for pred in predictions]
+    return labels, pred_steps, pred_probs
 
 
 # Checks if a model/client with index can start receiving data
@@ -146,15 +336,102 @@ def wait_for_start_time(r_server, client_index):
         n_active_clients = int(r_server.get("n_active_clients")) + 1
         r_server.set("n_active_clients", str(n_active_clients))
         print("Model #", client_index, " is activated")
+        publish_event(r_server, "buffer")
         return True
 
     return False
 
 
+# Returns the specified pipeline event for the current process (see event_names)
+# Inputs :
+#   r_server : redis server connection instance
+#   name : name of the event
+def get_pipeline_event(r_server, name):
+
+    if name not in pipeline_events:
+        pipeline_events[name] = RedisEvent(r_server, name + "_events")
+    return pipeline_events[name]
+
+
+# Wakes the processes waiting on the specified pipeline event
+# Inputs :
+#   r_server : redis server connection instance
+#   name : name of the event
+def publish_event(r_server, name):
+
+    if use_pipeline_events:
+        get_pipeline_event(r_server, name).publish()
+
+
+# Blocks until the specified pipeline event is published or the timeout elapses
+# Inputs :
+#   r_server : redis server connection instance
+#   name : name of the event
+#   timeout : max waiting time (in seconds)
+# Returns : boolean, true = the event was published
+def wait_for_event(r_server, name, timeout):
+
+    if not use_pipeline_events:
+        sleep(timeout)
+        return False
+
+    return get_pipeline_event(r_server, name).wait(timeout)
+
+
+# Blocks until the pipeline buffer is ready to be read by the specified client
+# Inputs :
+#   r_server : redis server connection instance
+#   transport : transport of the current process (see attach_pipeline_transport)
+#   client_index : index of the client (specified at creation time)
+#   timeout : max waiting time (in seconds)
+# Returns : boolean, true = the buffer can be read by the client
+def wait_for_pipeline_buff(r_server, transport, client_index, timeout):
+
+    if transport.backend == "stream":
+        return wait_for_stream_entry(r_server, transport, client_index, timeout)
+
+    if r_server.lindex("client_read_data", client_index) == "1" : return True
+
+    wait_for_event(r_server, "pipeline_buff", timeout)
+    return r_server.lindex("client_read_data", client_index) == "1"
+
+
+# Blocks until a stream entry is available for the specified client ("stream" backend)
+# Until it consumes its first entry, the client follows the head of the stream,
+# afterwards it reads the entries in order (entries trimmed from the stream are skipped)
+# Inputs :
+#   r_server : redis server connection instance
+#   transport : transport of the current process (holds the read positions of its clients)
+#   client_index : index of the client (specified at creation time)
+#   timeout : max waiting time (in seconds)
+# Returns : boolean, true = an entry can be read by the client
+def wait_for_stream_entry(r_server, transport, client_index, timeout):
+
+    stream_entries = transport.stream_entries
+    stream_last_ids = transport.stream_last_ids
+
+    if client_index in stream_last_ids:
+        if client_index in stream_entries : return True
+        reply = r_server.xread({stream_name : stream_last_ids[client_index]}, count=1,
+                               block=max(1, int(timeout * 1000)))
+        if reply : stream_entries[client_index] = reply[0][1][0]
+
+    # following the head of the stream (waiting for the first entry if empty)
+    else:
+        head = r_server.xrevrange(stream_name, count=1)
+        if not head:
+            reply = r_server.xread({stream_name : "$"}, count=1, block=max(1, int(timeout * 1000)))
+            if reply : head = reply[0][1]
+        if head : stream_entries[client_index] = head[0]
+
+    return client_index in stream_entries
+
+
 # Creates a connected myo bluetooth object
 # Inputs : 
 #   r_server : redis server connection
-def create_myo_connection(r_server):
+#   transport : transport of the current process (see PipelineTransport)
+def create_myo_connection(r_server, transport):
 
     # creating a connection object
     connection_success = False
@@ -170,26 +447,42 @@ def create_myo_connection(r_server):
             if(n_tries == 0):
                 raise BluetoothFailedConnection("Bluetooth connection failed")
 
-    # defining the emg raw value handler
-    def proc_emg(emg, moving, times=[]):
+    # defining the raw data container (fixed size, no reallocation per sample)
+    raw_incoming_data = EmgRingBuffer(raw_buffer_windows * pipeline_buff_size, n_incoming_sensors)
+    shared_windows = transport.get_shared_windows(r_server) if transport.backend == "shm" else None
+    n_windows_written = [0]
 
-        global raw_incoming_data
+    # defining the emg raw value handler
+    # receives blocks of samples of shape (n_samples, n_incoming_sensors)
+    def proc_emg(emg_block):
 
         # appending incoming data to the raw data buffer
-        emg_list = list(emg)
-        raw_incoming_data = np.c_[raw_incoming_data, emg_list]
+        raw_incoming_data.extend(emg_block)
 
         # when raw data buffer reaches max size, transfering it to db
-        if(raw_incoming_data.shape[1] == pipeline_buff_size):
+        while(len(raw_incoming_data) >= pipeline_buff_size):
             
             # parent process is ready for transfer
             if(r_server.get("raw_data_ready") == "0"):
-                r_server.set("raw_data", json.dumps(raw_incoming_data.tolist()))
-                raw_incoming_data = np.zeros((n_incoming_sensors, 0))
+
+                # the window is written once in shared memory, only its slot goes through redis
+                # (the slot of the previous window can still be read by the clients)
+                if shared_windows is not None:
+                    slot = n_windows_written[0] % n_shared_slots
+                    shared_windows.write(slot, raw_incoming_data.view(pipeline_buff_size))
+                    r_server.set("raw_data", str(slot))
+                else:
+                    r_server.set("raw_data", json.dumps(raw_incoming_data.view(pipeline_buff_size).tolist()))
+
+                n_windows_written[0] += 1
+                raw_incoming_data.consume(pipeline_buff_size)
                 r_server.set("raw_data_ready", "1")
+                publish_event(r_server, "buffer")
 
             # making room for newer data, while waiting for parent
-            else : raw_incoming_data = raw_incoming_data[ : , 5 : ]
+            else : 
+                raw_incoming_data.drop(len(raw_incoming_data) - pipeline_buff_size + 5)
+                r_server.set("raw_data_dropped", str(raw_incoming_data.n_dropped + raw_incoming_data.n_overruns))
 
     # defining the pose handler
     def proc_pose(pose):
@@ -197,7 +490,7 @@ def create_myo_connection(r_server):
         r_server.set("myo_pose", str(pose.value))
 
     # attaching the handlers
-    m.add_emg_handler(proc_emg)
+    m.add_emg_block_handler(proc_emg)
     m.add_pose_handler(proc_pose)
 
     m.connect()
@@ -210,14 +503,15 @@ def create_myo_connection(r_server):
 # This function is ment to be run a seperate process
 # Inputs : 
 #   conn_pool : connection pool for redis (server connections are made from connection pool)
-def collect_myo_data(conn_pool):
+#   transport : transport of the pipeline (see PipelineTransport)
+def collect_myo_data(conn_pool, transport):
 
     # creating redis for shared buffer objects
     r_server = redis.StrictRedis(connection_pool=conn_pool)
 
     # obtaining a connection to the myo
     try:
-        myo_connection = create_myo_connection(r_server)
+        myo_connection = create_myo_connection(r_server, transport)
     except BluetoothFailedConnection :
         r_server.set("incoming_data", "0")
         print("Buffer maintenance thread aborted, failed to connect to myo")
@@ -243,8 +537,9 @@ def collect_myo_data(conn_pool):
 # Inputs : 
 #   conn_pool : connection pool for redis (server connections are made from connection pool)
 #   new_pipeline_buff_size : specifies a new value for the globally defined pipeline buffer
-#   check_delay : time between data availability checks (in seconds)
-def maintain_pipeline_buffer(conn_pool, new_pipeline_buff_size=None, check_delay=0.1):
+#   check_delay : max time between data availability checks (in seconds)
+#   transport : transport of the pipeline (see PipelineTransport, read from redis if not specified)
+def maintain_pipeline_buffer(conn_pool, new_pipeline_buff_size=None, check_delay=0.1, transport=None):
 
     # changing the pipeline buffer size to a user defined value
     global pipeline_buff_size
@@ -254,19 +549,39 @@ def maintain_pipeline_buffer(conn_pool, new_pipeline_buff_size=None, check_delay
     # creating redis connection for current process
     r_server = redis.StrictRedis(connection_pool=conn_pool)
 
+    if transport is None : transport = attach_pipeline_transport(r_server)
+
+    # creating the shared window slots (mapped by the data collecting process)
+    if transport.backend == "shm":
+        transport.create_shared_windows(r_server, pipeline_buff_size)
+
     # launching data collecting thread
-    data_collection_p = Process(target=collect_myo_data, args=(conn_pool,))
+    data_collection_p = Process(target=collect_myo_data, args=(conn_pool, transport))
     data_collection_p.start()
 
     n_clients = int(r_server.get("n_clients"))
+    use_stream = transport.backend == "stream"
 
     try:
 
         # as long as the program is receiving myo data
         while(r_server.get("incoming_data") == "1"):
 
+            # waiting for new raw data or for the clients
             # buffer should take around 250 ms to fill (when pipeline_buff_size = 50)
-            sleep(check_delay)
+            wait_for_event(r_server, "buffer", check_delay)
+
+            # appending the raw data to the stream, without waiting for the clients
+            if use_stream:
+                if r_server.get("raw_data_ready") == "1":
+                    r_server.xadd(stream_name, {"data" : r_server.get("raw_data")},
+                                  maxlen=stream_maxlen, approximate=True)
+                    r_server.incr("data_count")
+                    r_server.set("buffer_ready", "1")
+                    publish_event(r_server, "pipeline_buff")
+                    r_server.set("raw_data", "")
+                    r_server.set("raw_data_ready", "0")
+                continue
 
             # making sure models are synchronized
             models_active = True
@@ -286,6 +601,9 @@ def maintain_pipeline_buffer(conn_pool, new_pipeline_buff_size=None, check_delay
                 data_count = int(r_server.get("data_count")) + 1
                 r_server.set("data_count", str(data_count))
 
+                # waking the clients
+                publish_event(r_server, "pipeline_buff")
+
                 # marking the raw data buffer as read
                 r_server.set("raw_data", "")
                 r_server.set("raw_data_ready", "0")
@@ -299,28 +617,46 @@ def maintain_pipeline_buffer(conn_pool, new_pipeline_buff_size=None, check_delay
 
     data_collection_p.join()
 
+    # destroying the shared window slots
+    transport.close()
+
 
 # Launches the buffer maintenance process and returns the handle
 # Inputs : 
 #   pipeline_buffer_size : size of the buffer conataining myo data
 #   n_clients : number of processes that will be reading accessing the pipeline buffer
-#   check_delay : time between data availability checks (in seconds)
+#   check_delay : max time between data availability checks (in seconds)
 #   n_outputs : number of outputs for the model/client (model is a classifier)
+#   backend : transport for the buffer content, "redis" (json), "shm" (shared memory) or "stream" (redis stream)
 # Returns : 
 #   Redis server connection instance
 #   Process handle for buffer maintenance process
 #   * the process has to be lauched from the returned handle
-def launch_myo_comm(pipeline_buffer_size, n_outputs, n_clients=1, check_delay=0.1):
+#   * clients attach the transport once (attach_pipeline_transport), then read the buffer content
+#     with read_pipeline_buff (any backend)
+#   * with the "stream" backend, buffer_ready is set once data is received and stays set
+def launch_myo_comm(pipeline_buffer_size, n_outputs, n_clients=1, check_delay=0.1, backend="redis"):
+
+    # checking the backend before touching the redis db (the "shm" backend requires Python3.8)
+    transport = PipelineTransport(backend)
 
     # creating redis connection pool (for multiple connected processes)
     conn_pool = redis.ConnectionPool(host='localhost', port=6379, db=redis_db_id, decode_responses=True)
 
     # creating redis connection 
     r_server = redis.StrictRedis(connection_pool=conn_pool)
-    r_server = init_redis_variables(r_server, n_clients, n_outputs)
+    r_server = init_redis_variables(r_server, n_clients, n_outputs, backend)
+
+    # the shared memory backend wakes the processes with shared conditions
+    # (created here, so they are inherited by the forked processes)
+    # the events of a previously launched pipeline are dropped
+    pipeline_events.clear()
+    if backend == "shm":
+        for name in event_names:
+            pipeline_events[name] = SharedEvent()
 
     # defining the buffer maintenance funtion as a subprocess
     buffer_maintenance_p = Process(target=maintain_pipeline_buffer, name="myo_raw",
-                                   args=(conn_pool, pipeline_buffer_size, check_delay))
+                                   args=(conn_pool, pipeline_buffer_size, check_delay, transport))
 
     return r_server, buffer_maintenance_p
\ No newline at end of file
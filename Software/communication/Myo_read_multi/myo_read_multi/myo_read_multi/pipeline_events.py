@@ -0,0 +1,72 @@
+import os
+
+# importing multi processing utilities
+from multiprocessing import Condition, Value
+
+
+# Event published through a redis pub/sub channel
+# Waiting processes are subscribed to the channel on their first wait
+# Events published before that first wait are not received : the waiter has
+# to check the state it is waiting on before blocking, and the wait timeout
+# bounds the delay of a missed event
+class RedisEvent(object):
+
+    # r_server : redis server connection instance
+    # channel : name of the pub/sub channel
+    def __init__(self, r_server, channel):
+        self.r_server = r_server
+        self.channel = channel
+        self.pubsub = None
+        self.pid = None
+
+
+    # wakes every process waiting on the event
+    def publish(self):
+        self.r_server.publish(self.channel, "1")
+
+
+    # blocks until the event is published or the timeout (in seconds) elapses
+    # returns : True if the event was published
+    def wait(self, timeout):
+
+        # the subscription can not be shared with a forked process
+        if self.pubsub is None or self.pid != os.getpid():
+            self.pubsub = self.r_server.pubsub(ignore_subscribe_messages=True)
+            self.pubsub.subscribe(self.channel)
+            self.pid = os.getpid()
+
+        message = self.pubsub.get_message(timeout=timeout)
+        published = message is not None
+
+        # events published meanwhile are merged, the caller checks the state
+        while message is not None:
+            message = self.pubsub.get_message(timeout=0)
+
+        return published
+
+
+# Event shared between forked processes (condition + publication counter)
+# Has to be created before the processes using it are forked
+class SharedEvent(object):
+
+    def __init__(self):
+        self.condition = Condition()
+        self.count = Value('L', 0, lock=False)
+        self.last_count = 0
+
+
+    # wakes every process waiting on the event
+    def publish(self):
+        with self.condition:
+            self.count.value += 1
+            self.condition.notify_all()
+
+
+    # blocks until the event is published or the timeout (in seconds) elapses
+    # returns : True if the event was published since the last wait of this process
+    def wait(self, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.count.value != self.last_count, timeout)
+            published = self.count.value != self.last_count
+            self.last_count = self.count.value
+        return published
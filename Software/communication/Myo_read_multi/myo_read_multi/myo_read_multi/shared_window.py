@@ -0,0 +1,62 @@
+import numpy as np
+
+# importing shared memory utilities (python >= 3.8)
+# the other backends of the pipeline do not need them, their absence is reported on use
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+
+# Checks that the shared memory utilities are available (raises a RuntimeError otherwise)
+def check_shared_memory():
+    if shared_memory is None:
+        raise(RuntimeError("The shared memory backend requires Python3.8 or later (multiprocessing.shared_memory)"))
+
+
+# Fixed set of window slots held in shared memory
+# Windows are stored as raw int8 frames of shape (n_channels, window_size)
+# Readers map the slots directly, no copy or decoding is done on their side
+class SharedWindowBuffer(object):
+
+    # window_size : number of samples per channel in a window
+    # n_channels : number of emg channels in a window
+    # n_slots : number of windows held simultaneously
+    # name : name of an existing segment to attach to (a new segment is created if None)
+    def __init__(self, window_size, n_channels=8, n_slots=3, name=None):
+
+        check_shared_memory()
+
+        self.window_size = window_size
+        self.n_channels = n_channels
+        self.n_slots = n_slots
+
+        size = n_slots * n_channels * window_size
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+
+        self.slots = np.ndarray((n_slots, n_channels, window_size), dtype=np.int8, buffer=self.shm.buf)
+
+
+    # copies a window of shape (n_channels, window_size) in the specified slot
+    def write(self, slot, window):
+        self.slots[slot] = window
+
+
+    # returns the window held in the specified slot (view on the shared memory)
+    def read(self, slot):
+        return self.slots[slot]
+
+
+    # detaches the current process from the segment
+    def close(self):
+        self.slots = None
+        self.shm.close()
+
+
+    # destroys the segment (call once, from the process which created it)
+    def unlink(self):
+        self.shm.unlink()
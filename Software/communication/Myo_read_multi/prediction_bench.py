@@ -0,0 +1,115 @@
+import time
+import numpy as np
+import redis
+
+# importing myo communication package
+from myo_read_multi.pipeline_buffer import init_redis_variables, write_model_prediction, read_model_predictions
+from myo_read_multi.pipeline_buffer import redis_db_id
+
+# Measures the redis round trips and the time spent per window to store the predictions
+# of all models and read them back in the prediction evaluation
+# (requires a running redis server)
+# The benchmark runs in its own redis db (bench_redis_db_id), flushed between the runs,
+# the db of the live pipeline (redis_db_id) is not touched
+
+n_models = 20
+n_outputs = 7
+n_windows = 200
+
+# redis db of the benchmark (last of the 16 default redis dbs), must differ from redis_db_id
+bench_redis_db_id = 15
+
+
+# Counts the requests sent to the redis server (one per command, one per executed pipeline)
+class RoundTripCounter(object):
+
+    def __init__(self):
+        self.count = 0
+        self.send_packed_command = redis.connection.Connection.send_packed_command
+
+    def __enter__(self):
+        counter = self
+        def counted_send(connection, *args, **kwargs):
+            counter.count += 1
+            return counter.send_packed_command(connection, *args, **kwargs)
+        redis.connection.Connection.send_packed_command = counted_send
+        return self
+
+    def __exit__(self, *args):
+        redis.connection.Connection.send_packed_command = self.send_packed_command
+
+
+# Former storage : one list entry per label, step and probability
+def legacy_init(r_server):
+    r_server.delete("model_predictions", "prediction_step")
+    for client_i in range(n_models):
+        r_server.lpush("model_predictions", "X")
+        r_server.lpush("prediction_step", "X")
+        r_server.delete("output_probs_" + str(client_i))
+        for _ in range(n_outputs):
+            r_server.lpush("output_probs_" + str(client_i), "X")
+
+
+def legacy_write(r_server, client_index, label, probabilities, curr_step):
+    r_server.lset("model_predictions", client_index, label)
+    r_server.lset("prediction_step", client_index, curr_step)
+    prob_list_name = "output_probs_" + str(client_index)
+    for prob_i in range(len(probabilities)) :
+        r_server.lset(prob_list_name, prob_i, str(probabilities[prob_i]))
+    r_server.incr("prediction_count")
+
+
+def legacy_read(r_server):
+    predictions = r_server.lrange("model_predictions", 0, n_models-1)
+    pred_steps = r_server.lrange("prediction_step", 0, n_models-1)
+    pred_probs = []
+    for model_i in range(n_models):
+        pred_probs.append(r_server.lrange("output_probs_" + str(model_i), 0, n_outputs-1))
+    return predictions, pred_steps, pred_probs
+
+
+def packed_read(r_server):
+    return read_model_predictions(r_server, n_models)
+
+
+# Writes the predictions of every model for each window, then reads them back
+# Returns : round trips per window, ms per window
+def bench_window(r_server, write, read, probabilities):
+
+    with RoundTripCounter() as counter:
+        t0 = time.time()
+        for window_i in range(n_windows):
+            for model_i in range(n_models):
+                write(r_server, model_i, str(window_i % n_outputs), probabilities[model_i], str(window_i % 10 + 1))
+            read(r_server)
+        elapsed = time.time() - t0
+
+    return counter.count / n_windows, elapsed / n_windows * 1000
+
+
+if __name__ == "__main__":
+
+    if bench_redis_db_id == redis_db_id:
+        raise(ValueError("The benchmark db must differ from the pipeline db : " + str(bench_redis_db_id)))
+
+    r_server = redis.StrictRedis(host='localhost', port=6379, db=bench_redis_db_id, decode_responses=True)
+    r_server.flushdb()
+
+    probabilities = np.random.dirichlet(np.ones(n_outputs), n_models).tolist()
+
+    legacy_init(r_server)
+    r_server.set("prediction_count", "0")
+    legacy = bench_window(r_server, legacy_write, legacy_read, probabilities)
+
+    r_server.flushdb()
+    init_redis_variables(r_server, n_models, n_outputs)
+    packed = bench_window(r_server, write_model_prediction, packed_read, probabilities)
+
+    # checking that the records are read back unchanged
+    labels, pred_steps, pred_probs = read_model_predictions(r_server, n_models)
+    assert np.allclose(np.array(pred_probs), probabilities)
+    r_server.flushdb()
+
+    print("%d models, %d outputs :" % (n_models, n_outputs))
+    for name, (round_trips, window_time) in (("per field lists", legacy), ("packed records", packed)):
+        print("    %-15s : %5.0f round trips per window, %6.2f ms per window" % (name, round_trips, window_time))
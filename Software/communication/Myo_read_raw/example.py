@@ -3,6 +3,7 @@ import json
 
 # importing myo communication utilities
 from myo_read_raw.pipeline_buffer import launch_myo_comm, reset_pipeline_buff_flags
+from myo_read_raw.pipeline_buffer import wait_for_pipeline_buff
 
 # importing pose definitions
 from myo_read_raw.myo_raw import Pose
@@ -10,6 +11,9 @@ from myo_read_raw.myo_raw import Pose
 # defining the size for the pipeline buffer
 pipeline_buffer_size = 25
 
+# max time spent waiting for the pipeline buffer (pose data is checked in between)
+check_delay = 0.05
+
 
 if __name__ == "__main__":
 
@@ -22,7 +26,7 @@ if __name__ == "__main__":
         while(r_server.get("buffer_maintained") == "1"):
 
             # pipeline buffer is ready to be read
-            if(r_server.get("buffer_ready") == "1"):
+            if(wait_for_pipeline_buff(r_server, check_delay)):
                 pipeline_buff = np.array(json.loads(r_server.get("pipeline_buff")))
                 for i in range(pipeline_buff.shape[0]) : print(pipeline_buff[i, : ])
                 # marking buffer as read, so it may be refilled
@@ -0,0 +1,238 @@
+import struct
+import sys
+import time
+import tracemalloc
+
+# importing myo bluetooth utilities
+from myo_read_raw.myo_raw import BT, MyoRaw
+
+# number of emg notifications in the synthetic capture (4 characteristics at 50 Hz)
+n_notifications = 20000
+
+# amount of bytes handed out by the replayed serial port per read (os buffer fill)
+chunk_size = 256
+
+# number of timed passes of the data handlers, the fastest one is kept
+n_repeats = 5
+
+
+# Builds a byte stream of BGAPI attribute value events as sent by the dongle
+# for the raw emg characteristics (handles 0x2b, 0x2e, 0x31, 0x34)
+# Inputs :
+#   n_packets : number of notifications in the stream
+# Returns : bytes of the captured stream
+def synthetic_capture(n_packets):
+
+    stream = bytearray()
+    emg_handles = (0x2b, 0x2e, 0x31, 0x34)
+    for i in range(n_packets):
+        samples = bytes((i + j) % 256 for j in range(16))
+        payload = struct.pack('<BHBB', 0, emg_handles[i % 4], 1, len(samples)) + samples
+        stream += struct.pack('<4B', 0x80, len(payload), 4, 5) + payload
+
+    return bytes(stream)
+
+
+# Serial port stand-in, hands out the captured stream as the dongle would
+class ReplaySerial(object):
+
+    def __init__(self, data, chunk):
+        self.data = data
+        self.chunk = chunk
+        self.pos = 0
+        self.timeout = None
+
+    @property
+    def in_waiting(self):
+        return min(self.chunk, len(self.data) - self.pos)
+
+    def read(self, size=1):
+        out = self.data[self.pos : self.pos + size]
+        self.pos += len(out)
+        return out
+
+
+# Replica of the former packet representation (payload copied out of a list of ints)
+class LegacyPacket(object):
+
+    def __init__(self, ords):
+        self.typ = ords[0]
+        self.cls = ords[2]
+        self.cmd = ords[3]
+        self.payload = bytes(ords[4:])
+
+
+# Replica of the former emg path of the data handler
+def legacy_handle_data(p, on_emg):
+
+    if (p.cls, p.cmd) != (4, 5):
+        return
+    c, attr, typ = struct.unpack('<BHB', p.payload[:4])
+    pay = p.payload[5:]
+    if attr == 0x2b or attr == 0x2e or attr == 0x31 or attr == 0x34:
+        on_emg(struct.unpack('<8b', pay[:8]), 0)
+        on_emg(struct.unpack('<8b', pay[8:]), 0)
+
+
+# Replica of the former byte per byte reader (one read and one proc_byte per byte)
+class LegacyReader(object):
+
+    def __init__(self, ser):
+        self.ser = ser
+        self.buf = []
+        self.packet_len = 0
+
+    def recv_packet(self, timeout=None):
+        t0 = time.time()
+        self.ser.timeout = None
+        while timeout is None or time.time() < t0 + timeout:
+            if timeout is not None:
+                self.ser.timeout = t0 + timeout - time.time()
+            c = self.ser.read()
+            if not c:
+                return None
+            ret = self.proc_byte(ord(c))
+            if ret:
+                return ret
+
+    def proc_byte(self, c):
+        if not self.buf:
+            if c in [0x00, 0x80, 0x08, 0x88]:
+                self.buf.append(c)
+            return None
+        elif len(self.buf) == 1:
+            self.buf.append(c)
+            self.packet_len = 4 + (self.buf[0] & 0x07) + self.buf[1]
+            return None
+        else:
+            self.buf.append(c)
+
+        if self.packet_len and len(self.buf) == self.packet_len:
+            p = LegacyPacket(self.buf)
+            self.buf = []
+            return p
+        return None
+
+
+def bench_legacy(capture):
+
+    reader = LegacyReader(ReplaySerial(capture, chunk_size))
+    n_packets = 0
+    t0 = time.time()
+    while reader.recv_packet(1) is not None:
+        n_packets += 1
+    return n_packets, time.time() - t0
+
+
+def bench_buffered(capture):
+
+    ser = ReplaySerial(capture, chunk_size)
+    bt = BT(None, ser=ser)
+    n_packets = 0
+    t0 = time.time()
+    while ser.in_waiting:
+        n_packets += len(bt.recv_batch(1))
+    return n_packets, time.time() - t0
+
+
+# Measures the memory held per framed packet and the decoding throughput of the
+# emg path (data handler, fastest of n_repeats passes), for the former and the current packets
+def bench_packets(capture):
+
+    def on_emg(emg, moving): pass
+
+    # former path : list of ints per packet, payload copied in a new bytes object
+    tracemalloc.start()
+    legacy_reader = LegacyReader(ReplaySerial(capture, chunk_size))
+    legacy_packets = []
+    while True:
+        p = legacy_reader.recv_packet(1)
+        if p is None: break
+        legacy_packets.append(p)
+    legacy_mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    legacy_time = None
+    for _ in range(n_repeats):
+        t0 = time.time()
+        for p in legacy_packets:
+            legacy_handle_data(p, on_emg)
+        elapsed = time.time() - t0
+        if legacy_time is None or elapsed < legacy_time: legacy_time = elapsed
+
+    # current path : slotted packets referencing the receive buffer
+    ser = ReplaySerial(capture, chunk_size)
+    tracemalloc.start()
+    bt = BT(None, ser=ser)
+    packets = []
+    while ser.in_waiting:
+        packets += bt.recv_batch(1)
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    myo = MyoRaw(ser=ser)
+    myo.add_emg_handler(on_emg)
+    handler_time = None
+    for _ in range(n_repeats):
+        t0 = time.time()
+        for p in packets:
+            myo.handle_data(p)
+        elapsed = time.time() - t0
+        if handler_time is None or elapsed < handler_time: handler_time = elapsed
+
+    n_packets = len(packets)
+    print("%-14s : %5.0f bytes held per packet, emg decoding %8.0f packets/s" %
+          ("copied payload", legacy_mem / n_packets, n_packets / legacy_time))
+    print("%-14s : %5.0f bytes held per packet, emg decoding %8.0f packets/s" %
+          ("buffer slices", mem / n_packets, n_packets / handler_time))
+
+
+# Compares the emg delivery through per sample handlers and through block handlers
+def bench_emg_blocks(capture):
+
+    samples = []
+    blocks = []
+
+    # per sample handlers : two struct decodes and two handler calls per notification
+    ser = ReplaySerial(capture, chunk_size)
+    myo = MyoRaw(ser=ser)
+    myo.bt.add_handler(myo.handle_data)
+    myo.add_emg_handler(lambda emg, moving: samples.append(emg))
+    t0 = time.time()
+    while ser.in_waiting:
+        myo.bt.recv_batch(1)
+    sample_time = time.time() - t0
+
+    # block handlers : one int8 array per batch of notifications
+    ser = ReplaySerial(capture, chunk_size)
+    myo = MyoRaw(ser=ser)
+    myo.bt.add_handler(myo.handle_data)
+    myo.bt.add_batch_handler(myo.handle_data_batch)
+    myo.add_emg_block_handler(blocks.append)
+    t0 = time.time()
+    while ser.in_waiting:
+        myo.bt.recv_batch(1)
+    block_time = time.time() - t0
+
+    n_samples = len(samples)
+    print("%-14s : %7d samples in %.3f s -> %10.0f samples/s" %
+          ("per sample", n_samples, sample_time, n_samples / sample_time))
+    print("%-14s : %7d samples in %.3f s -> %10.0f samples/s (%d blocks)" %
+          ("blocks", sum(len(b) for b in blocks), block_time, n_samples / block_time, len(blocks)))
+
+
+if __name__ == "__main__":
+
+    # replaying a captured stream when a file is provided
+    if len(sys.argv) >= 2:
+        capture = open(sys.argv[1], 'rb').read()
+    else:
+        capture = synthetic_capture(n_notifications)
+
+    for name, bench in (("byte per byte", bench_legacy), ("buffered", bench_buffered)):
+        n_packets, elapsed = bench(capture)
+        print("%-14s : %7d packets in %.3f s -> %10.0f packets/s" %
+              (name, n_packets, elapsed, n_packets / elapsed))
+
+    bench_packets(capture)
+    bench_emg_blocks(capture)
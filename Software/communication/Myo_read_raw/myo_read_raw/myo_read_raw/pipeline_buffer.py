@@ -5,6 +5,8 @@ import json
 # importing myo bluetooth utilities
 from time import sleep
 from . import myo_raw
+from .ring_buffer import EmgRingBuffer
+from .pipeline_events import RedisEvent
 import sys
 
 # importing multi processing utilities 
@@ -21,8 +23,13 @@ n_incoming_sensors = 8
 # defining inter-process communications
 redis_db_id = 0 
 
-# global containers (each process will fork these containers)
-raw_incoming_data = np.zeros((8, 0))
+# capacity of the raw data ring buffer (in pipeline buffers)
+raw_buffer_windows = 4
+
+# defining the events waking the pipeline processes
+# when disabled, the waiting processes poll the redis flags (check_delay)
+use_pipeline_events = True
+pipeline_events = {}
 
 # defining custom bluetooth exception (when connection fails)
 class BluetoothFailedConnection(Exception):
@@ -40,6 +47,7 @@ def init_redis_variables(r_server):
     # defining buffer maintenance flags
     r_server.set("buffer_ready", "0")
     r_server.set("raw_data_ready", "0")
+    r_server.set("raw_data_dropped", "0")
     r_server.set("pose_data_ready", "0")
 
     # defining continuation flags
@@ -61,6 +69,57 @@ def init_redis_variables(r_server):
 #   r_server : redis server connection instance
 def reset_pipeline_buff_flags(r_server):
     r_server.set("buffer_ready", "0")
+    publish_event(r_server, "buffer")
+
+
+
+# Returns the specified pipeline event for the current process
+# Inputs :
+#   r_server : redis server connection instance
+#   name : name of the event ("buffer" or "pipeline_buff")
+def get_pipeline_event(r_server, name):
+
+    if name not in pipeline_events:
+        pipeline_events[name] = RedisEvent(r_server, name + "_events")
+    return pipeline_events[name]
+
+
+# Wakes the processes waiting on the specified pipeline event
+# Inputs :
+#   r_server : redis server connection instance
+#   name : name of the event
+def publish_event(r_server, name):
+
+    if use_pipeline_events:
+        get_pipeline_event(r_server, name).publish()
+
+
+# Blocks until the specified pipeline event is published or the timeout elapses
+# Inputs :
+#   r_server : redis server connection instance
+#   name : name of the event
+#   timeout : max waiting time (in seconds)
+# Returns : boolean, true = the event was published
+def wait_for_event(r_server, name, timeout):
+
+    if not use_pipeline_events:
+        sleep(timeout)
+        return False
+
+    return get_pipeline_event(r_server, name).wait(timeout)
+
+
+# Blocks until the pipeline buffer is ready to be read
+# Inputs :
+#   r_server : redis server connection instance
+#   timeout : max waiting time (in seconds)
+# Returns : boolean, true = the buffer can be read
+def wait_for_pipeline_buff(r_server, timeout):
+
+    if r_server.get("buffer_ready") == "1" : return True
+
+    wait_for_event(r_server, "pipeline_buff", timeout)
+    return r_server.get("buffer_ready") == "1"
 
 
 
@@ -83,24 +142,30 @@ def create_myo_connection(r_server):
             if(n_tries == 0):
                 raise BluetoothFailedConnection("Bluetooth connection failed")
 
-    # defining the emg raw value handler
-    def proc_emg(emg, moving, times=[]):
+    # defining the raw data container (fixed size, no reallocation per sample)
+    raw_incoming_data = EmgRingBuffer(raw_buffer_windows * pipeline_buff_size, n_incoming_sensors)
 
-        global raw_incoming_data
+    # defining the emg raw value handler
+    # receives blocks of samples of shape (n_samples, n_incoming_sensors)
+    def proc_emg(emg_block):
 
         # appending incoming data to the raw data buffer
-        emg_list = list(emg)
-        raw_incoming_data = np.c_[raw_incoming_data, emg_list]
+        raw_incoming_data.extend(emg_block)
 
         # when raw data buffer reaches max size, transfering it to db
-        if(raw_incoming_data.shape[1] == pipeline_buff_size):
+        while(len(raw_incoming_data) >= pipeline_buff_size):
+            
             # parent process is ready for transfer
             if(r_server.get("raw_data_ready") == "0"):
-                r_server.set("raw_data", json.dumps(raw_incoming_data.tolist()))
-                raw_incoming_data = np.zeros((n_incoming_sensors, 0))
+                r_server.set("raw_data", json.dumps(raw_incoming_data.view(pipeline_buff_size).tolist()))
+                raw_incoming_data.consume(pipeline_buff_size)
                 r_server.set("raw_data_ready", "1")
+                publish_event(r_server, "buffer")
+
             # making room for newer data, while waiting for parent
-            else : raw_incoming_data = raw_incoming_data[ : , 5 : ]
+            else : 
+                raw_incoming_data.drop(len(raw_incoming_data) - pipeline_buff_size + 5)
+                r_server.set("raw_data_dropped", str(raw_incoming_data.n_dropped + raw_incoming_data.n_overruns))
 
     # defining the pose handler
     def proc_pose(pose):
@@ -108,7 +173,7 @@ def create_myo_connection(r_server):
         r_server.set("myo_pose", str(pose.value))
 
     # attaching the handlers
-    m.add_emg_handler(proc_emg)
+    m.add_emg_block_handler(proc_emg)
     m.add_pose_handler(proc_pose)
 
     m.connect()
@@ -156,7 +221,7 @@ def collect_myo_data(conn_pool):
 # Inputs : 
 #   conn_pool : connection pool for redis (server connections are made from connection pool)
 #   new_pipeline_buff_size : specifies a new value for the globally defined pipeline buffer
-#   check_delay : time between data availability checks (in seconds)
+#   check_delay : max time between data availability checks (in seconds)
 def maintain_pipeline_buffer(conn_pool, new_pipeline_buff_size=None, check_delay=0.1):
 
     # changing the pipeline buffer size to a user defined value
@@ -176,8 +241,8 @@ def maintain_pipeline_buffer(conn_pool, new_pipeline_buff_size=None, check_delay
         # as long as the program is receiving myo data
         while(r_server.get("incoming_data") == "1"):
 
-            # buffer should take around 250 ms to fill (when pipeline_buff_size = 50)
-            sleep(check_delay)
+            # woken when new raw data is available or when the client read the buffer
+            wait_for_event(r_server, "buffer", check_delay)
 
             # data is not currently available to parent process
             # and child process cant write to raw data buffer
@@ -186,6 +251,7 @@ def maintain_pipeline_buffer(conn_pool, new_pipeline_buff_size=None, check_delay
                 # transfering the raw data buffer content to the pipeline buffer
                 r_server.set("pipeline_buff", r_server.get("raw_data"))    
                 r_server.set("buffer_ready", "1")
+                publish_event(r_server, "pipeline_buff")
                 
                 # marking the raw data buffer as read
                 r_server.set("raw_data", "")
@@ -205,7 +271,7 @@ def maintain_pipeline_buffer(conn_pool, new_pipeline_buff_size=None, check_delay
 # Initializes redis server for inter-process communication 
 # Input : 
 #   pipeline_buffer_size : size of the buffer conataining myo data 
-#   check_delay : time between data availability checks (in seconds)
+#   check_delay : max time between data availability checks (in seconds)
 # Returns : 
 #   Redis server connection instance
 #   Process handle for buffer maintenance process
@@ -224,6 +290,6 @@ def launch_myo_comm(pipeline_buffer_size, check_delay=0.1):
     buffer_maintenance_p.start()
 
     # waiting for confirmation that myo is connected (data  is received)
-    while(r_server.get("buffer_ready") != "1"): sleep(0.05)
+    while(not wait_for_pipeline_buff(r_server, 0.05)): pass
 
     return r_server, buffer_maintenance_p
\ No newline at end of file
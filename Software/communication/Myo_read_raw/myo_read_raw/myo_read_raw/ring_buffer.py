@@ -0,0 +1,102 @@
+import numpy as np
+
+
+# Fixed capacity circular buffer for emg samples, stored channel major
+# Every sample is written twice (at i and i + capacity) in a storage twice the
+# capacity long, so the unread samples are always a contiguous slice of it
+# When the writer laps the reader, the oldest unread samples are overwritten
+# and counted as overruns
+class EmgRingBuffer(object):
+
+    # capacity : max amount of unread samples held by the buffer
+    # n_channels : number of emg channels per sample
+    # dtype : sample type (np.int8 for raw myo data, np.int16 for wider values)
+    def __init__(self, capacity, n_channels=8, dtype=np.int8):
+
+        if capacity <= 0:
+            raise(ValueError("Ring buffer capacity has to be greater than 0."))
+
+        self.capacity = capacity
+        self.n_channels = n_channels
+        self.data = np.zeros((n_channels, 2 * capacity), dtype=dtype)
+
+        # absolute sample counts (never wrapped)
+        self.write_count = 0
+        self.read_count = 0
+
+        # samples lost by the consumer : overwritten before being read, or dropped
+        self.n_overruns = 0
+        self.n_dropped = 0
+
+
+    # amount of unread samples
+    def __len__(self):
+        return self.write_count - self.read_count
+
+
+    # appends one sample of shape (n_channels)
+    def append(self, sample):
+
+        pos = self.write_count % self.capacity
+        self.data[ : , pos] = sample
+        self.data[ : , pos + self.capacity] = sample
+        self.write_count += 1
+        self.check_overrun()
+
+
+    # appends a block of samples of shape (n_samples, n_channels)
+    def extend(self, block):
+
+        n_samples = block.shape[0]
+
+        # only the newest samples of a block longer than the buffer are kept
+        if n_samples > self.capacity:
+            self.write_count += n_samples - self.capacity
+            block = block[n_samples - self.capacity : ]
+            n_samples = self.capacity
+
+        pos = self.write_count % self.capacity
+        block = block.T
+
+        # writing the block, then its mirror in the other half of the storage
+        self.data[ : , pos : pos + n_samples] = block
+        n_first = min(n_samples, self.capacity - pos)
+        self.data[ : , pos + self.capacity : pos + self.capacity + n_first] = block[ : , : n_first]
+        if n_samples > n_first:
+            self.data[ : , : n_samples - n_first] = block[ : , n_first : ]
+
+        self.write_count += n_samples
+        self.check_overrun()
+
+
+    # moves the reader ahead of the overwritten samples
+    def check_overrun(self):
+
+        n_unread = self.write_count - self.read_count
+        if n_unread > self.capacity:
+            self.n_overruns += n_unread - self.capacity
+            self.read_count = self.write_count - self.capacity
+
+
+    # returns a view (no copy) of the n oldest unread samples, shape (n_channels, n)
+    # the view stays valid until the writer wraps around it
+    def view(self, n=None):
+
+        if n is None : n = len(self)
+        elif n > len(self):
+            raise(ValueError("Not enough unread samples in the ring buffer."))
+
+        pos = self.read_count % self.capacity
+        return self.data[ : , pos : pos + n]
+
+
+    # marks the n oldest unread samples as read
+    def consume(self, n):
+        self.read_count += min(n, len(self))
+
+
+    # discards the n oldest unread samples (counted as dropped)
+    def drop(self, n):
+        n = min(n, len(self))
+        self.read_count += n
+        self.n_dropped += n
@@ -0,0 +1,90 @@
+import time
+import numpy as np
+
+# importing the raw data container
+from myo_read_raw.ring_buffer import EmgRingBuffer
+
+# defining the simulated acquisition
+pipeline_buff_size = 25
+n_channels = 8
+stream_duration = 30
+
+# rate at which the parent process takes a window (windows per second)
+parent_rate = 8
+
+
+# Simulated parent process, takes at most one window per period
+class SlowParent(object):
+
+    def __init__(self, rate):
+        self.period = 1 / rate
+        self.next_read = 0
+
+    def is_ready(self, t):
+        return t >= self.next_read
+
+    def take(self, t):
+        self.next_read = t + self.period
+
+
+# Former collector : the raw data buffer grows by one column per sample
+# Returns : number of windows transfered
+def legacy_collector(samples, sample_times):
+
+    parent = SlowParent(parent_rate)
+    raw_incoming_data = np.zeros((n_channels, 0))
+    n_windows = 0
+    for i in range(samples.shape[0]):
+        raw_incoming_data = np.c_[raw_incoming_data, list(samples[i])]
+        if(raw_incoming_data.shape[1] == pipeline_buff_size):
+            if parent.is_ready(sample_times[i]):
+                parent.take(sample_times[i])
+                window = raw_incoming_data.tolist()
+                raw_incoming_data = np.zeros((n_channels, 0))
+                n_windows += 1
+            else : raw_incoming_data = raw_incoming_data[ : , 5 : ]
+    return n_windows
+
+
+# Ring buffer collector, fed with the notification blocks (2 samples per notification)
+# Returns : number of windows transfered
+def ring_collector(samples, sample_times):
+
+    parent = SlowParent(parent_rate)
+    raw_incoming_data = EmgRingBuffer(4 * pipeline_buff_size, n_channels)
+    n_windows = 0
+    for i in range(0, samples.shape[0], 2):
+        raw_incoming_data.extend(samples[i : i + 2])
+        while(len(raw_incoming_data) >= pipeline_buff_size):
+            if parent.is_ready(sample_times[i]):
+                parent.take(sample_times[i])
+                window = raw_incoming_data.view(pipeline_buff_size).tolist()
+                raw_incoming_data.consume(pipeline_buff_size)
+                n_windows += 1
+            else :
+                raw_incoming_data.drop(len(raw_incoming_data) - pipeline_buff_size + 5)
+    return n_windows
+
+
+# Runs both collectors over a stream sampled at the specified rate
+def bench_rate(sample_rate):
+
+    n_samples = sample_rate * stream_duration
+    samples = np.random.randint(-128, 128, (n_samples, n_channels)).astype(np.int8)
+
+    sample_times = np.arange(n_samples) / sample_rate
+
+    print("emg stream at ", sample_rate, " Hz :")
+    for name, collector in (("np.c_ growth", legacy_collector), ("ring buffer", ring_collector)):
+        t0 = time.time()
+        n_windows = collector(samples, sample_times)
+        elapsed = time.time() - t0
+        print("    %-12s : %6.2f us/sample, %5.2f %% of a core, %d windows" %
+              (name, elapsed / n_samples * 1e6, elapsed / stream_duration * 100, n_windows))
+
+
+if __name__ == "__main__":
+
+    # nominal myo raw emg rate, then 10 times that rate
+    bench_rate(200)
+    bench_rate(2000)
@@ -1,48 +1,177 @@
 import numpy as np
 import json
+import os.path
 
 # pipeline utilities 
 from sklearn.pipeline import Pipeline
 from sklearn.base import BaseEstimator, TransformerMixin
 
 
+# number of emg electrodes of the Myo armband
+n_emgs = 8
+
+# compiled calibration plans, by (calibration file path, modification time)
+compiled_plans = {}
+
+# layouts of the calibrated data (see CalibrationPlan.apply) :
+#   "window" : windows of shape (n_channels, n_samples)
+#   "sequence" : sequence batches of shape (batch_size, n_steps, n_inputs)
+data_layouts = ("window", "sequence")
+
+
+# Reads a calibration file
+# The rest and max values can be one value for all electrodes or a list with one value per electrode :
+#   {"Rest_value_mean": [r0, ..., r7], "Max_effort_mean": [m0, ..., m7]}
+# Electrodes whose max value equals their rest value (flat, ex : dead or disconnected electrode) are
+# accepted, their data is calibrated to 0 (see CalibrationPlan)
+# Inputs :
+#   cal_file_path : path to the calibration json file
+#   n_channels : number of electrodes
+# Returns : rest values, max values (one value per electrode)
+def load_calibration_data(cal_file_path, n_channels=n_emgs):
+
+    try: cal_file = open(cal_file_path, 'r').read()
+    except: raise(ValueError("Failed to open specified calibration file."))
+
+    cal_data = json.loads(cal_file)
+    try:
+        rest_mean = np.array(cal_data["Rest_value_mean"], dtype=np.float64).flatten()
+        max_mean = np.array(cal_data["Max_effort_mean"], dtype=np.float64).flatten()
+    except KeyError: raise(ValueError("Invalid calibration file, missing calibration values."))
+
+    if rest_mean.shape[0] not in (1, n_channels) or max_mean.shape[0] not in (1, n_channels):
+        raise(ValueError("Calibration values have to be one value or one value per electrode."))
+    rest_mean = np.broadcast_to(rest_mean, n_channels).copy()
+    max_mean = np.broadcast_to(max_mean, n_channels).copy()
+    if np.all(max_mean == rest_mean):
+        raise(ValueError("Invalid calibration file, max and rest values are equal for all electrodes."))
+
+    return rest_mean, max_mean
+
+
+class CalibrationPlan():
+
+    '''
+    CalibrationPlan
+
+    - Transform compiled from a calibration file : x * scale + offset, clipped to [-1, 1]
+      (same as (x - rest) / (max - rest)), one scale and offset per electrode
+
+    - Flat electrodes (max value = rest value) have a scale and offset of 0 : their data is calibrated
+      to 0 instead of dividing by 0, they are listed in flat_channels
+
+    - The scale and offset vectors are read only, a plan loaded before the model processes 
+      are forked is shared by all of them
+
+    - The layout of the data is given by the caller (see data_layouts), it is not guessed from its shape
+      (any shape is accepted when all electrodes share the same values) :
+        "window" : windows of shape (n_channels, n_samples)
+        "sequence" : sequence batches of shape (batch_size, n_steps, n_inputs), n_inputs holding 
+                     the samples of each channel one after the other (as built by ModelBatchGenerator)
+
+    - Float32 inputs are transformed in place, other inputs are converted to float32
+    '''
+
+    # rest_mean, max_mean : calibration values, one value per electrode
+    def __init__(self, rest_mean, max_mean):
+
+        self.n_channels = rest_mean.shape[0]
+
+        # flat electrodes are calibrated to 0
+        flat = max_mean == rest_mean
+        self.flat_channels = np.flatnonzero(flat)
+        if len(self.flat_channels):
+            print("Flat calibrated electrodes (max value = rest value), calibrated to 0 : ", self.flat_channels.tolist())
+
+        self.scale = np.where(flat, 0, 1 / np.where(flat, 1, max_mean - rest_mean)).astype(np.float32)
+        self.offset = (-rest_mean * self.scale).astype(np.float32)
+        self.scale.flags.writeable = False
+        self.offset.flags.writeable = False
+
+        # vectors broadcast along the channels of each data layout
+        # (same values for all electrodes : any layout is accepted)
+        self.uniform_vects = None
+        if np.all(self.scale == self.scale[0]) and np.all(self.offset == self.offset[0]):
+            self.uniform_vects = (self.scale[0], self.offset[0])
+        self.window_vects = (self.scale[ : , np.newaxis], self.offset[ : , np.newaxis])
+        self.sequence_vects = {}
+
+
+    # returns : scale and offset vectors matching the layout of the data (see data_layouts)
+    def layout_vects(self, data, layout):
+
+        if layout not in data_layouts:
+            raise(ValueError("Unknown data layout : " + str(layout) + ", expected one of " + str(data_layouts)))
+
+        if self.uniform_vects is not None : 
+            return self.uniform_vects
+
+        if layout == "window":
+            if data.ndim != 2 or data.shape[0] != self.n_channels:
+                raise(ValueError("Windows have to be of shape (" + str(self.n_channels) + ", n_samples), got " 
+                                 + str(data.shape)))
+            return self.window_vects
+
+        if data.ndim != 3 or data.shape[2] % self.n_channels != 0:
+            raise(ValueError("Sequence batches have to be of shape (batch_size, n_steps, n_inputs) with n_inputs "
+                             "a multiple of " + str(self.n_channels) + ", got " + str(data.shape)))
+        chan_p_step = data.shape[2] // self.n_channels
+        if chan_p_step not in self.sequence_vects:
+            scale, offset = np.repeat(self.scale, chan_p_step), np.repeat(self.offset, chan_p_step)
+            scale.flags.writeable = False
+            offset.flags.writeable = False
+            self.sequence_vects[chan_p_step] = (scale, offset)
+        return self.sequence_vects[chan_p_step]
+
+
+    # X : data to calibrate
+    # layout : layout of the data, "window" or "sequence" (see data_layouts)
+    # returns : calibrated data, in interval [-1, 1]
+    def apply(self, X, layout):
+
+        if isinstance(X, np.ndarray) and X.dtype == np.float32 and X.flags.writeable : data = X
+        else : data = np.array(X, dtype=np.float32)
+
+        scale, offset = self.layout_vects(data, layout)
+        data *= scale
+        data += offset
+        return np.clip(data, -1, 1, out=data)
+
+
+# Returns the compiled plan of a calibration file
+# The file is only read again if it was modified since its plan was compiled
+def get_calibration_plan(cal_file_path):
+
+    plan_key = (os.path.abspath(cal_file_path), os.path.getmtime(cal_file_path) 
+                if os.path.exists(cal_file_path) else None)
+
+    if plan_key not in compiled_plans:
+        compiled_plans[plan_key] = CalibrationPlan(*load_calibration_data(cal_file_path))
+
+    return compiled_plans[plan_key]
+
+
 # Defining transformer for emg data
 # Normalizes the data to a value in interval [-1, 1]
 # The normalization is done sing the max value measured during calibration
+# layout : layout of the transformed data, "sequence" (training batches) or "window" (see data_layouts)
 class CalibrationTransformer(BaseEstimator, TransformerMixin):
 
-    def __init__(self, cal_file_path):
-        
-        # extracting data from the calibration file
-        try:
-            cal_file = open(cal_file_path, 'r').read()
-        except: raise(ValueError("Failed to open specified calibration file."))
-        cal_data = json.loads(cal_file)
-        self.rest_mean = cal_data["Rest_value_mean"]
-        self.max_mean = cal_data["Max_effort_mean"]
-
-        # defining the normalization operation
-        def normalize_funct(x): 
-            x = (x + self.rest_mean*-1)/(self.max_mean + self.rest_mean*-1)
-            if(x > 1): x = 1
-            elif(x < -1): x = -1
-            return x
-        
-        # vectorizing the main operation
-        self.normalize_vect = np.vectorize(normalize_funct)
-
-
-    def fit(self, X, y=None):
-        return self
+    # sequence batches of shape (batch_size, n_steps, n_inputs) are transformed as they are 
+    # (other transformers get one row per step, see ModelBatchGenerator.pipeline_transform)
+    accepts_sequence_batches = True
 
+    def __init__(self, cal_file_path, layout="sequence"):
+        self.cal_file_path = cal_file_path
+        self.layout = layout
+        self.plan = get_calibration_plan(cal_file_path)
 
-    def transform(self, X, y=None):
-        return self.normalize_vect(X)
+    def fit(self, X, y=None): return self
 
+    def transform(self, X, y=None): return self.plan.apply(X, self.layout)
 
 
-# defining processing pipe line
-def get_calibration_Pipeline(cal_file_path): 
+def get_calibration_Pipeline(cal_file_path, layout="sequence"): 
     return Pipeline([
-        ('calibration_transformer', CalibrationTransformer(cal_file_path))
-    ])
\ No newline at end of file
+        ('calibration_transformer', CalibrationTransformer(cal_file_path, layout))
+    ])
@@ -0,0 +1,80 @@
+import json
+import sys
+import time
+import numpy as np
+from Calibration_Pipeline.Calibration_Pipeline import get_calibration_Pipeline
+
+# Compares the vectorized calibration transform with the former element wise one (np.vectorize)
+# over a full training set, shape (n_files, n_steps, n_inputs), and over single (8, window) windows
+# A random training set is generated (use a training data size as argument : n_files)
+
+calibration_file = "Example_calibration_file.json"
+
+n_files = 1000
+n_steps = 20
+n_inputs = 400
+n_windows = 1000
+
+
+# former transform : python function called for each element
+# (output type fixed to float, np.vectorize takes it from the first output otherwise)
+def element_wise_transform(cal_file_path):
+
+    cal_data = json.loads(open(cal_file_path, 'r').read())
+    rest_mean = cal_data["Rest_value_mean"]
+    max_mean = cal_data["Max_effort_mean"]
+
+    def normalize_funct(x):
+        x = (x + rest_mean*-1)/(max_mean + rest_mean*-1)
+        if(x > 1): x = 1
+        elif(x < -1): x = -1
+        return x
+
+    return np.vectorize(normalize_funct, otypes=[np.float64])
+
+
+# returns : time taken by the transform (s), transformed data
+def time_transform(transform, data):
+    t0 = time.time()
+    transformed = transform(data)
+    return time.time() - t0, transformed
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 : n_files = int(sys.argv[1])
+
+    norm_pipeline = get_calibration_Pipeline(calibration_file)
+    normalize_vect = element_wise_transform(calibration_file)
+
+    # full training set, as built by ModelBatchGenerator (int32 emg values)
+    training_set = np.random.randint(-128, 128, (n_files, n_steps, n_inputs)).astype(np.int32)
+
+    vect_time, vect_data = time_transform(normalize_vect, training_set)
+    pipe_time, pipe_data = time_transform(norm_pipeline.fit_transform, training_set)
+    assert np.allclose(vect_data, pipe_data, atol=1e-6)
+
+    float_set = training_set.astype(np.float32)
+    inplace_time, _ = time_transform(norm_pipeline.fit_transform, float_set)
+
+    print("training set %s :" % (training_set.shape,))
+    print("    np.vectorize        : %8.3f s" % vect_time)
+    print("    vectorized          : %8.3f s (x%.0f)" % (pipe_time, vect_time / pipe_time))
+    print("    vectorized in place : %8.3f s (float32 input)" % inplace_time)
+
+    # single windows, as transformed by the inference processes
+    windows = np.random.randint(-128, 128, (n_windows, 8, n_inputs // 8)).astype(np.int32)
+    norm_pipeline = get_calibration_Pipeline(calibration_file, layout="window")
+    vect_time = sum(time_transform(normalize_vect, window)[0] for window in windows)
+    pipe_time = sum(time_transform(norm_pipeline.fit_transform, window)[0] for window in windows)
+    transformer = norm_pipeline.named_steps["calibration_transformer"]
+    trans_time = sum(time_transform(transformer.transform, window)[0] for window in windows)
+    print("windows (8, %d) :" % (n_inputs // 8))
+    print("    np.vectorize        : %8.3f ms per window" % (vect_time / n_windows * 1000))
+    print("    vectorized          : %8.3f ms per window (pipeline)" % (pipe_time / n_windows * 1000))
+    print("    vectorized          : %8.3f ms per window (transformer only)" % (trans_time / n_windows * 1000))
+
+    # loading the pipeline, the calibration plan is compiled on the first call only
+    t0 = time.time()
+    for _ in range(n_windows) : get_calibration_Pipeline(calibration_file)
+    print("pipeline loading        : %8.3f ms (cached calibration plan)" % ((time.time() - t0) / n_windows * 1000))
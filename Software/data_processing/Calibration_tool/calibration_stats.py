@@ -0,0 +1,73 @@
+import numpy as np
+
+# Sliding window statistics used to compute calibration values
+# The averages over all window positions are computed at once from cumulative sums (O(n_data) per channel)
+
+# number of data points averaged for the calibration values
+max_span = 1
+relax_span = 5
+
+
+# computes the average of every window of (span) consecutive data points, for each channel
+# input :
+#   X : ndaray of shape (n_sensors, n_data_points)
+#   span : number of data points in a window
+# returns : ndarray of shape (n_sensors, n_data_points - span + 1)
+def rolling_means(X, span):
+
+    if(span < 1):
+        raise(ValueError("The span has to be greater than 0"))
+    if(span > X.shape[1]):
+        raise(ValueError("Not enough data to fill specified span"))
+
+    cumsum = np.zeros((X.shape[0], X.shape[1] + 1), dtype=np.float64)
+    np.cumsum(X, axis=1, dtype=np.float64, out=cumsum[ : , 1 : ])
+
+    return (cumsum[ : , span : ] - cumsum[ : , : -span]) / span
+
+
+# computes the (absolute avg) of every window of (span) data points, for each channel
+# returns the avg of each channel according to the (specifier)
+# input :
+#   X : ndaray of shape (n_sensors, n_data_points)
+#   span : then span over which to calculate the average
+#   specifier :  specifies which avg value to return values : ("smallest", "biggest")
+#       - "biggest" : biggest absolute avg
+#       - "smallest" : avg (with its sign) of the window with the smallest absolute avg
+# returns : ndarray of shape (n_sensors)
+def get_channel_avgs(X, span, specifier):
+
+    X = np.asarray(X)
+    abs_avgs = rolling_means(np.absolute(X, dtype=np.float64), span)
+
+    if(specifier == "biggest"):
+        return abs_avgs.max(axis=1)
+
+    elif(specifier == "smallest"):
+        window_i = abs_avgs.argmin(axis=1)
+        return rolling_means(X, span)[np.arange(X.shape[0]), window_i]
+
+    raise(ValueError("Invalid specifier, values : (\"smallest\", \"biggest\")"))
+
+
+# computes the (absolute avg) for n data points in X
+# returns the avg according to the (specifier), over all channels
+# input :
+#   X : ndaray of shape (n_sensors, n_data_points)
+#   span : then span over which to calculate the average
+#   specifier :  specifies which avg value to return values : ("smallest", "biggest")
+#       - "biggest" : biggest absolute avg of all channels and windows
+#       - "smallest" : avg (with its sign) of the channel window with the smallest absolute avg
+def get_specified_avg(X, span, specifier):
+
+    X = np.asarray(X)
+    abs_avgs = rolling_means(np.absolute(X, dtype=np.float64), span)
+
+    if(specifier == "biggest"):
+        return abs_avgs.max()
+
+    elif(specifier == "smallest"):
+        channel_i, window_i = np.unravel_index(abs_avgs.argmin(), abs_avgs.shape)
+        return X[channel_i, window_i : window_i + span].mean()
+
+    raise(ValueError("Invalid specifier, values : (\"smallest\", \"biggest\")"))
@@ -0,0 +1,55 @@
+import time
+import numpy as np
+
+from calibration_stats import rolling_means, get_channel_avgs, get_specified_avg
+
+# Checks the sliding window statistics against a brute force reference (every window position
+# and channel averaged one at a time), then times them on a full rate recording
+# Does not require a Myo (random data)
+
+n_channels = 8
+n_checks = 200
+recording_len = 200 * 60 * 10 # 10 minutes at 200 Hz
+
+
+# brute force reference : average of every window, one window at a time
+def brute_force_means(X, span):
+    n_windows = X.shape[1] - span + 1
+    means = np.zeros((X.shape[0], n_windows))
+    for c in range(X.shape[0]):
+        for i in range(n_windows):
+            means[c, i] = X[c, i : i + span].mean()
+    return means
+
+
+if __name__ == "__main__":
+
+    for _ in range(n_checks):
+
+        n_data = np.random.randint(1, 80)
+        span = np.random.randint(1, n_data + 1)
+        X = np.random.randint(-128, 128, (n_channels, n_data)).astype(np.int8)
+
+        means = brute_force_means(X, span)
+        abs_means = brute_force_means(np.absolute(X.astype(np.int32)), span)
+        assert np.allclose(rolling_means(X, span), means)
+
+        # biggest absolute average
+        assert np.allclose(get_channel_avgs(X, span, "biggest"), abs_means.max(axis=1))
+        assert np.isclose(get_specified_avg(X, span, "biggest"), abs_means.max())
+
+        # average of the window with the smallest absolute average
+        smallest = get_channel_avgs(X, span, "smallest")
+        for c in range(n_channels):
+            assert np.any(np.isclose(means[c][np.isclose(abs_means[c], abs_means[c].min())], smallest[c]))
+        assert np.any(np.isclose(means[np.isclose(abs_means, abs_means.min())], get_specified_avg(X, span, "smallest")))
+
+    print("%d random buffers : same statistics as the brute force reference" % n_checks)
+
+    # full rate recording
+    recording = np.random.randint(-128, 128, (n_channels, recording_len)).astype(np.int8)
+    for span in (1, 5, 50):
+        t0 = time.time()
+        get_channel_avgs(recording, span, "biggest")
+        get_channel_avgs(recording, span, "smallest")
+        print("recording of %d points per channel, span %2d : %.3f s" % (recording_len, span, time.time() - t0))
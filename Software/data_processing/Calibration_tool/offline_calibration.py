@@ -0,0 +1,150 @@
+import json
+import os
+import sys
+import numpy as np
+
+from multiprocessing import Pool
+
+# importing calibration statistics
+from calibration_stats import get_channel_avgs, max_span, relax_span
+
+# Computes the calibration files of many users from their recorded sessions, without a Myo
+#   - sessions directory : one sub directory per user, holding the user's recordings
+#   - recordings : ".json" files ({"emg": {"data": [[8 values], ...]}}, as saved by the recording tools)
+#                  or ".npy" files (binary, int8 array of shape (n_acquisitions, 8))
+#   - the recordings are read one at a time, the statistics of Calibration_tool are taken over all of them :
+#       Max_effort_mean : biggest absolute avg (max_span points) of each electrode
+#       Rest_value_mean : avg of the window with the smallest absolute avg (relax_span points) of each electrode
+#   - the users are processed in parallel (process pool), one calibration file is written per user
+#
+# Usage : python3 offline_calibration.py sessions_dir [output_dir] [n_processes]
+
+recording_extensions = (".json", ".npy")
+json_file_name = "Calibration_out.json"
+n_channels = 8
+
+
+# checks that the samples of a recording are raw myo values (integers in the int8 range)
+# recordings that were already scaled are rejected, their values would wrap around once cast to int8
+# Inputs :
+#   emg_data : samples of the recording, any numeric dtype
+#   file_name : path of the recording (for the error message)
+# Returns : samples as int8
+def check_raw_samples(emg_data, file_name):
+
+    if emg_data.dtype == np.int8 : return emg_data
+
+    if emg_data.dtype.kind not in "iuf" or not np.array_equal(emg_data, np.round(emg_data)):
+        raise(ValueError("Recording samples are not raw myo values (integers) : " + file_name))
+    if emg_data.size > 0 and (emg_data.min() < -128 or emg_data.max() > 127):
+        raise(ValueError("Recording samples out of the int8 range [-128, 127] : " + file_name))
+
+    return emg_data.astype(np.int8)
+
+
+# loads a recording
+# Inputs :
+#   file_name : path to a ".json" or ".npy" recording
+# Returns : emg data of shape (n_emgs, n_acquisitions)
+def load_recording(file_name):
+
+    if file_name.endswith(".npy"):
+        emg_data = np.load(file_name, mmap_mode="r")
+    else :
+        json_data = json.loads(open(file_name, 'r').read())
+        emg_data = np.array(json_data["emg"]["data"])
+
+    if emg_data.ndim != 2 or emg_data.shape[1] != n_channels:
+        raise(ValueError("Invalid recording shape, expected (n_acquisitions, %d) : %s" % (n_channels, file_name)))
+
+    emg_data = check_raw_samples(emg_data, file_name)
+
+    return np.swapaxes(emg_data, 0, 1)
+
+
+# returns : sorted paths of the recordings found in the specified directory (calibration files excluded)
+def get_recording_files(user_dir):
+    return [os.path.join(user_dir, file) for file in sorted(os.listdir(user_dir))
+            if file.endswith(recording_extensions) and file != json_file_name]
+
+
+# Computes the calibration values of one user from its recordings
+# Inputs :
+#   user_dir : directory holding the user's recordings
+# Returns : calibration data (one value per electrode), number of recordings used
+def calibrate_user(user_dir):
+
+    max_effort_value = np.zeros(n_channels)
+    center_rest_value = np.full(n_channels, 1000.0)
+    n_recordings = 0
+
+    for file_name in get_recording_files(user_dir):
+
+        emg_data = load_recording(file_name)
+        if emg_data.shape[1] < relax_span : continue
+
+        max_effort_value = np.maximum(max_effort_value, get_channel_avgs(emg_data, max_span, "biggest"))
+        center_rest_value = np.minimum(center_rest_value, get_channel_avgs(emg_data, relax_span, "smallest"))
+        n_recordings += 1
+
+    if n_recordings == 0:
+        raise(ValueError("No usable recording in : " + user_dir))
+
+    return {"Rest_value_mean" : center_rest_value.tolist(), "Max_effort_mean" : max_effort_value.tolist()}, n_recordings
+
+
+# Calibrates one user and writes its calibration file (run by the process pool)
+# Inputs :
+#   user_dir : directory holding the user's recordings
+#   out_file : path of the calibration file to write
+# Returns : user directory, number of recordings used, error message (None on success)
+def write_user_calibration(user_dir, out_file):
+
+    try:
+        data, n_recordings = calibrate_user(user_dir)
+    except (ValueError, OSError, KeyError) as error:
+        return user_dir, 0, str(error)
+
+    with open(out_file, 'w') as outfile:
+        json.dump(data, outfile)
+
+    return user_dir, n_recordings, None
+
+
+# Calibrates all users of a sessions directory in parallel
+# Inputs :
+#   sessions_dir : directory with one sub directory of recordings per user
+#   output_dir : directory of the calibration files ("user name".json),
+#                if not specified, "Calibration_out.json" is written in each user directory
+#   n_processes : number of worker processes (number of cpus if not specified)
+# Returns : list of (user directory, number of recordings used, error message)
+def calibrate_sessions(sessions_dir, output_dir=None, n_processes=None):
+
+    user_names = [name for name in sorted(os.listdir(sessions_dir))
+                  if os.path.isdir(os.path.join(sessions_dir, name))]
+
+    jobs = []
+    for name in user_names:
+        if output_dir is None : out_file = os.path.join(sessions_dir, name, json_file_name)
+        else : out_file = os.path.join(output_dir, name + ".json")
+        jobs.append((os.path.join(sessions_dir, name), out_file))
+
+    if output_dir is not None and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    with Pool(n_processes) as pool:
+        return pool.starmap(write_user_calibration, jobs)
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) < 2:
+        print("Usage : python3 offline_calibration.py sessions_dir [output_dir] [n_processes]")
+        sys.exit(1)
+
+    output_dir = sys.argv[2] if len(sys.argv) >= 3 else None
+    n_processes = int(sys.argv[3]) if len(sys.argv) >= 4 else None
+
+    for user_dir, n_recordings, error in calibrate_sessions(sys.argv[1], output_dir, n_processes):
+        if error is None : print("%s : calibrated from %d recordings" % (user_dir, n_recordings))
+        else : print("%s : failed, %s" % (user_dir, error))
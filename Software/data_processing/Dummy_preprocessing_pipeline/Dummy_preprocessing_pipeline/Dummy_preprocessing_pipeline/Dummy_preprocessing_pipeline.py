@@ -5,29 +5,34 @@ from sklearn.pipeline import Pipeline
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.preprocessing import StandardScaler
 
+# importing the vectorized emg transforms
+from .emg_transformers import square
+
 # defining transformer for emg data
 # elevates each value in the input matrix to the power of two
 # expects a numpy array, or throws exception
+# the input is not modified (unless copy is False and the input is a float32 array)
 class DummyTransformer(BaseEstimator, TransformerMixin):
 
+    def __init__(self, copy=True):
+        self.copy = copy
+
     def fit(self, X, y=None):
         return self
 
     def transform(self, X, y=None):
 
         # raising every value to the power of 2
-        for x in range(X.shape[0]):
-            for y in range(X.shape[1]):
-                X[x][y] = X[x][y] * X[x][y]  
-
-        return X
+        if not self.copy and X.dtype == np.float32 and X.flags.writeable : return square(X, out=X)
+        return square(X)
 
 
 
 # defining processing pipe line
+# (the scaler works in place on the new array produced by the DummyTransformer)
 def get_Dummy_Pipeline(): 
     return Pipeline([
         ('dummyTransformer', DummyTransformer()),
-        ('std_scaler', StandardScaler())
+        ('std_scaler', StandardScaler(copy=False))
     ])
 
@@ -0,0 +1,189 @@
+import numpy as np
+
+# pipe line utilities
+from sklearn.base import BaseEstimator, TransformerMixin
+
+# Vectorized emg preprocessing, no python loop over the data
+#   - accepted inputs :
+#       2-D : windows of shape (n_channels, n_samples)
+#       3-D : sequence batches of shape (batch_size, n_steps, n_inputs), n_inputs holding
+#             the samples of each channel one after the other (as built by ModelBatchGenerator)
+#   - the windowed transforms (RMS, MAV, envelope) run along the time axis of each channel
+#     (across the steps of a sequence), the outputs have the same shape as the inputs
+#   - out : optional float32 buffer of the input shape receiving the result (can be the input itself)
+
+# number of emg electrodes of the Myo armband
+n_emgs = 8
+
+# emg sampling rate of the Myo armband (Hz)
+emg_sample_rate = 200
+
+
+# returns : float32 output buffer for the specified input
+def output_buffer(X, out=None):
+    if out is None : return np.empty(np.shape(X), dtype=np.float32)
+    if out.shape != np.shape(X) : raise(ValueError("The output buffer has to match the input shape."))
+    return out
+
+
+# returns : view of the data as time series of shape (..., n_channels, n_samples)
+def channel_series(X, n_channels=n_emgs):
+
+    X = np.asarray(X)
+    if X.ndim == 2 : return X
+    if X.ndim == 3 and X.shape[2] % n_channels == 0:
+        batch_size, n_steps, n_inputs = X.shape
+        series = X.reshape(batch_size, n_steps, n_channels, n_inputs // n_channels).transpose(0, 2, 1, 3)
+        return series.reshape(batch_size, n_channels, -1)
+
+    raise(ValueError("Data shape does not match the number of channels."))
+
+
+# writes time series of shape (..., n_channels, n_samples) back in the layout of out
+def from_channel_series(series, out):
+
+    if out.ndim == 2 :
+        out[...] = series
+    else :
+        batch_size, n_steps, n_inputs = out.shape
+        n_channels = series.shape[1]
+        out_view = out.reshape(batch_size, n_steps, n_channels, n_inputs // n_channels)
+        out_view[...] = series.reshape(batch_size, n_channels, n_steps, -1).transpose(0, 2, 1, 3)
+
+    return out
+
+
+# absolute value of the data
+def rectify(X, out=None):
+    return np.absolute(X, out=output_buffer(X, out), dtype=np.float32)
+
+
+# square of the data
+def square(X, out=None):
+    return np.square(X, out=output_buffer(X, out), dtype=np.float32)
+
+
+# mean of the last (window) samples of each channel, at every sample
+# (the first samples are averaged over the available samples)
+# inputs :
+#   series : time series of shape (..., n_samples)
+def causal_moving_mean(series, window):
+
+    if window < 1 : raise(ValueError("The window has to be greater than 0."))
+
+    n_samples = series.shape[-1]
+    cumsum = np.zeros(series.shape[ : -1] + (n_samples + 1,), dtype=np.float64)
+    np.cumsum(series, axis=-1, dtype=np.float64, out=cumsum[..., 1 : ])
+
+    counts = np.minimum(np.arange(1, n_samples + 1), window)
+    return (cumsum[..., 1 : ] - cumsum[..., np.arange(n_samples) + 1 - counts]) / counts
+
+
+# root mean square over the last (window) samples of each channel
+def moving_rms(X, window, n_channels=n_emgs, out=None):
+    out = output_buffer(X, out)
+    mean_squares = causal_moving_mean(np.square(channel_series(X, n_channels), dtype=np.float64), window)
+    return from_channel_series(np.sqrt(mean_squares), out)
+
+
+# mean absolute value over the last (window) samples of each channel
+def moving_mav(X, window, n_channels=n_emgs, out=None):
+    out = output_buffer(X, out)
+    mean_abs = causal_moving_mean(np.absolute(channel_series(X, n_channels), dtype=np.float64), window)
+    return from_channel_series(mean_abs, out)
+
+
+# returns : coefficients of a low pass FIR filter (windowed sinc, hamming window, unit gain)
+def fir_lowpass(cutoff, sample_rate=emg_sample_rate, n_taps=51):
+
+    if not 0 < cutoff < sample_rate / 2 :
+        raise(ValueError("The cutoff frequency has to be between 0 and half of the sample rate."))
+
+    n = np.arange(n_taps) - (n_taps - 1) / 2
+    taps = np.sinc(2 * cutoff / sample_rate * n) * np.hamming(n_taps)
+    return taps / taps.sum()
+
+
+# band limited envelope : rectified data filtered by a causal low pass FIR filter
+# (the convolution of all channels is done at once in the frequency domain)
+# inputs :
+#   cutoff : cutoff frequency of the low pass filter (Hz)
+#   sample_rate : emg sampling rate (Hz)
+#   n_taps : length of the filter
+def envelope(X, cutoff=5.0, sample_rate=emg_sample_rate, n_taps=51, n_channels=n_emgs, out=None):
+
+    out = output_buffer(X, out)
+    series = np.absolute(channel_series(X, n_channels), dtype=np.float64)
+    taps = fir_lowpass(cutoff, sample_rate, n_taps)
+
+    n_samples = series.shape[-1]
+    n_fft = 1 << int(np.ceil(np.log2(n_samples + n_taps - 1)))
+    spectrum = np.fft.rfft(series, n_fft, axis=-1) * np.fft.rfft(taps, n_fft)
+    filtered = np.fft.irfft(spectrum, n_fft, axis=-1)[..., : n_samples]
+
+    return from_channel_series(filtered, out)
+
+
+# Transformers (sklearn pipeline steps) for the functions above
+#   - copy : if False, float32 inputs are transformed in place
+
+class EmgTransformer(BaseEstimator, TransformerMixin):
+
+    def fit(self, X, y=None): return self
+
+    # returns : output buffer of the transform
+    def transform_out(self, X):
+        X = np.asarray(X)
+        if not getattr(self, "copy", True) and X.dtype == np.float32 and X.flags.writeable : return X
+        return None
+
+
+class RectifyTransformer(EmgTransformer):
+
+    def __init__(self, copy=True):
+        self.copy = copy
+
+    def transform(self, X, y=None): return rectify(X, out=self.transform_out(X))
+
+
+class SquareTransformer(EmgTransformer):
+
+    def __init__(self, copy=True):
+        self.copy = copy
+
+    def transform(self, X, y=None): return square(X, out=self.transform_out(X))
+
+
+class RmsTransformer(EmgTransformer):
+
+    def __init__(self, window=10, n_channels=n_emgs, copy=True):
+        self.window = window
+        self.n_channels = n_channels
+        self.copy = copy
+
+    def transform(self, X, y=None):
+        return moving_rms(X, self.window, self.n_channels, out=self.transform_out(X))
+
+
+class MavTransformer(EmgTransformer):
+
+    def __init__(self, window=10, n_channels=n_emgs, copy=True):
+        self.window = window
+        self.n_channels = n_channels
+        self.copy = copy
+
+    def transform(self, X, y=None):
+        return moving_mav(X, self.window, self.n_channels, out=self.transform_out(X))
+
+
+class EnvelopeTransformer(EmgTransformer):
+
+    def __init__(self, cutoff=5.0, sample_rate=emg_sample_rate, n_taps=51, n_channels=n_emgs, copy=True):
+        self.cutoff = cutoff
+        self.sample_rate = sample_rate
+        self.n_taps = n_taps
+        self.n_channels = n_channels
+        self.copy = copy
+
+    def transform(self, X, y=None):
+        return envelope(X, self.cutoff, self.sample_rate, self.n_taps, self.n_channels, out=self.transform_out(X))
@@ -0,0 +1,84 @@
+import sys
+import time
+import numpy as np
+from sklearn.pipeline import Pipeline
+from Dummy_preprocessing_pipeline.Dummy_preprocessing_pipeline import get_Dummy_Pipeline
+from Dummy_preprocessing_pipeline.emg_transformers import RectifyTransformer, SquareTransformer
+from Dummy_preprocessing_pipeline.emg_transformers import RmsTransformer, MavTransformer, EnvelopeTransformer
+from Dummy_preprocessing_pipeline.emg_transformers import channel_series, moving_rms, moving_mav
+
+# Times the vectorized emg transformers over a full training set, shape (n_files, n_steps, n_inputs),
+# and over single (8, window) windows, compares the squaring with the former python loop
+# Checks the windowed transforms against a per sample reference on a small batch
+# A random training set is generated (use a training data size as argument : n_files)
+
+n_files = 1000
+n_steps = 20
+n_inputs = 400
+n_windows = 1000
+window = 10
+
+
+# former DummyTransformer.transform : python loop, in place
+def loop_square(X):
+    for x in range(X.shape[0]):
+        for y in range(X.shape[1]):
+            X[x][y] = X[x][y] * X[x][y]
+    return X
+
+
+# reference : moving statistic computed one sample at a time
+def reference_moving(X, window, funct):
+    series = channel_series(X).astype(np.float64)
+    ref = np.zeros_like(series)
+    for i in range(series.shape[-1]):
+        ref[..., i] = funct(series[..., max(0, i + 1 - window) : i + 1])
+    return ref
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 : n_files = int(sys.argv[1])
+
+    # checking the windowed transforms
+    batch = np.random.randint(-128, 128, (3, n_steps, n_inputs)).astype(np.int8)
+    rms_ref = reference_moving(batch, window, lambda x : np.sqrt(np.mean(x ** 2, axis=-1)))
+    mav_ref = reference_moving(batch, window, lambda x : np.mean(np.absolute(x), axis=-1))
+    assert np.allclose(channel_series(moving_rms(batch, window)), rms_ref, atol=1e-3)
+    assert np.allclose(channel_series(moving_mav(batch, window)), mav_ref, atol=1e-3)
+    print("moving RMS and MAV : same values as the per sample reference")
+
+    # squaring, former loop against the vectorized DummyTransformer
+    training_set = np.random.randint(-128, 128, (n_files, n_steps * n_inputs)).astype(np.float32)
+    t0 = time.time()
+    loop_square(training_set[ : 10].copy())
+    loop_time = (time.time() - t0) / 10 * n_files
+    t0 = time.time()
+    squared = get_Dummy_Pipeline().fit_transform(training_set)
+    print("Dummy pipeline %s : python loop %.3f s (estimated), vectorized %.3f s" %
+          (training_set.shape, loop_time, time.time() - t0))
+
+    # emg transformers over a full training set and over single windows
+    training_set = np.random.randint(-128, 128, (n_files, n_steps, n_inputs)).astype(np.float32)
+    windows = np.random.randint(-128, 128, (n_windows, 8, n_inputs // 8)).astype(np.float32)
+    out = np.empty_like(training_set)
+
+    for transformer in (RectifyTransformer(), SquareTransformer(), RmsTransformer(window),
+                        MavTransformer(window), EnvelopeTransformer()):
+
+        t0 = time.time()
+        transformer.transform(training_set)
+        set_time = time.time() - t0
+
+        t0 = time.time()
+        for window_data in windows : transformer.transform(window_data)
+        window_time = (time.time() - t0) / n_windows * 1000
+
+        print("%-20s : training set %s %.3f s, %.3f ms per window" %
+              (type(transformer).__name__, training_set.shape, set_time, window_time))
+
+    # chained in place steps (the first step produces a new array, the next ones reuse it)
+    pipeline = Pipeline([("rectify", RectifyTransformer()), ("envelope", EnvelopeTransformer(copy=False))])
+    t0 = time.time()
+    pipeline.fit_transform(training_set)
+    print("rectify + envelope pipeline : %.3f s" % (time.time() - t0))
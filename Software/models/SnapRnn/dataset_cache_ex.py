@@ -0,0 +1,84 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+# importing model utilities
+from snaprnn.train import ModelBatchGenerator
+
+# Compares the time needed to load one epoch of recordings from the .json files and from the binary
+# dataset cache (ModelBatchGenerator with cache_dir), and checks that both give the same sequences
+# Random recordings are generated (use a number of recordings as argument)
+
+n_recordings = 3000
+movement_names = ["hand_close", "hand_open", "index_close", "middle_finger_close"]
+n_acquisitions = 1000
+n_inputs = 400
+n_steps = 20
+batch_size = 100
+
+
+# writes random recordings and the movement info file describing them
+# returns : path to the movement info file
+def generate_recordings(data_dir, n_recordings):
+
+    movement_info = []
+    for label, name in enumerate(movement_names):
+        movement_dir = os.path.join(data_dir, name)
+        os.makedirs(movement_dir)
+        movement_info.append({"name" : name, "directory_path" : movement_dir, "label" : str(label)})
+
+    for i in range(n_recordings):
+        name = movement_names[i % len(movement_names)]
+        emg_data = np.random.randint(-128, 128, (np.random.randint(n_acquisitions // 2, n_acquisitions), 8))
+        with open(os.path.join(data_dir, name, "%s_%d_1.json" % (name, i)), 'w') as outfile:
+            json.dump({"emg" : {"data" : emg_data.tolist()}}, outfile)
+
+    movement_info_f = os.path.join(data_dir, "Training_data.json")
+    with open(movement_info_f, 'w') as outfile:
+        json.dump({"movement_info" : movement_info}, outfile)
+
+    return movement_info_f
+
+
+# returns : time needed to pull all the batches of one epoch (s)
+def time_epoch(batch_gen):
+    n_batches = int(np.ceil(batch_gen.data_len / batch_gen.batch_size))
+    t0 = time.time()
+    for _ in range(n_batches) : batch_gen.next_batch()
+    return time.time() - t0
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 : n_recordings = int(sys.argv[1])
+
+    data_dir = tempfile.mkdtemp()
+    cache_dir = os.path.join(data_dir, "cache")
+    movement_info_f = generate_recordings(data_dir, n_recordings)
+
+    json_gen = ModelBatchGenerator(movement_info_f, batch_size, n_inputs, n_steps)
+    json_time = time_epoch(json_gen)
+
+    t0 = time.time()
+    cache_gen = ModelBatchGenerator(movement_info_f, batch_size, n_inputs, n_steps, cache_dir=cache_dir)
+    compile_time = time.time() - t0
+    cache_time = time_epoch(cache_gen)
+
+    # cache already compiled : only the index is loaded
+    t0 = time.time()
+    cache_gen = ModelBatchGenerator(movement_info_f, batch_size, n_inputs, n_steps, cache_dir=cache_dir)
+    load_time = time.time() - t0
+    assert not cache_gen.dataset_cache.compiled
+
+    # same sequences and labels
+    for file_name in json_gen.all_files[ : 100]:
+        assert np.array_equal(json_gen.build_sequence_data(file_name), cache_gen.build_sequence_data(file_name))
+        assert int(json_gen.get_label_for_file(file_name)) == cache_gen.dataset_cache.get_label(file_name)
+
+    print("%d recordings, batches of %d :" % (n_recordings, batch_size))
+    print("    .json files  : %7.2f s per epoch" % json_time)
+    print("    cache        : %7.2f s per epoch (compiled in %.2f s, loaded in %.3f s once compiled)" %
+          (cache_time, compile_time, load_time))
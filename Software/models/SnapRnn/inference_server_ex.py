@@ -0,0 +1,120 @@
+import resource
+import tempfile
+import time
+import numpy as np
+import tensorflow as tf
+
+from multiprocessing import get_context
+
+# importing model utilities
+from snaprnn.evaluate import restore_tf_session, zero_padd_sequence, stagger_model_window, ModelInference
+from snaprnn.model import generate_blank_model
+
+# Compares the former design (one restored graph per model, one run per model and window)
+# with the model server (one graph, one batched run per window) :
+#   - memory : peak RSS of a process restoring the model and running it
+#   - latency : time spent per window to evaluate all models
+#   - parity : predictions and probabilities of both designs match
+# A blank model is generated, the windows are random
+
+n_models = 20
+n_windows = 60
+
+
+# Former design : each model keeps its own sequence and runs it once per window
+# Returns : labels and probabilities of the last step for each active model, per window
+def run_per_model(session, windows):
+
+    X = tf.get_collection('X')[0]
+    seq_length = tf.get_collection('seq_length')[0]
+    training_model = tf.get_collection('training_model')[0]
+    predictions_op = tf.get_collection('class_ids')[0]
+    prob_op = tf.get_collection('probabilities')[0]
+    n_inputs = int(X.shape[2])
+    n_steps = int(X.shape[1])
+
+    movement_data = [np.zeros((0, n_inputs)) for _ in range(n_models)]
+    movement_lens = [0] * n_models
+    outputs = []
+    for window_i in range(len(windows)):
+        window_outputs = []
+        for model_i in range(min(window_i + 1, n_models)):
+
+            movement_lens[model_i] += 1
+            movement_data[model_i] = np.vstack([movement_data[model_i], windows[window_i]])
+            formatted_mov = np.expand_dims(zero_padd_sequence(movement_data[model_i], n_steps), axis=0)
+            feed_dict = {training_model:False, seq_length:[movement_lens[model_i]], X:formatted_mov}
+            predictions = session.run(predictions_op, feed_dict=feed_dict)
+            probabilities = session.run(prob_op, feed_dict=feed_dict)
+            window_outputs.append((predictions[0][movement_lens[model_i]-1], probabilities[0][movement_lens[model_i]-1]))
+
+            if movement_lens[model_i] >= n_steps:
+                movement_data[model_i] = np.zeros((0, n_inputs))
+                movement_lens[model_i] = 0
+        outputs.append(window_outputs)
+
+    return outputs
+
+
+# Model server : all sequences in one batch, one graph execution per window
+def run_batched(session, windows):
+
+    model = ModelInference(session)
+
+    movement_data = np.zeros((n_models, model.n_steps, model.n_inputs), dtype=np.float32)
+    movement_lens = np.zeros(n_models, dtype=np.int32)
+    outputs = []
+    for window_i in range(len(windows)):
+        n_active = stagger_model_window(movement_data, movement_lens, windows[window_i], window_i + 1)
+        predictions, probabilities, _ = model.run(movement_data[ : n_active], movement_lens[ : n_active], 
+                                                  last_step_only=True)
+        outputs.append([(predictions[i], probabilities[i]) for i in range(n_active)])
+
+    return outputs
+
+
+# Restores the model in a fresh process and times the selected design
+# Returns (through the queue) : peak RSS (MB), ms per window
+def measure_design(model_dir, windows, batched, queue):
+
+    restored_sess, _ = restore_tf_session(model_dir)
+    with restored_sess as session:
+        t0 = time.time()
+        if batched : run_batched(session, windows)
+        else : run_per_model(session, windows)
+        window_time = (time.time() - t0) / len(windows) * 1000
+
+    queue.put((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, window_time))
+
+
+if __name__ == "__main__":
+
+    model_dir = tempfile.mkdtemp()
+    generate_blank_model(model_dir)
+    tf.reset_default_graph()
+
+    restored_sess, _ = restore_tf_session(model_dir)
+    n_inputs = int(tf.get_collection('X')[0].shape[2])
+    windows = np.random.randn(n_windows, n_inputs).astype(np.float32)
+
+    # checking that both designs produce the same predictions
+    with restored_sess as session:
+        per_model = run_per_model(session, windows)
+        batched = run_batched(session, windows)
+    max_prob_diff = 0
+    for window_i in range(n_windows):
+        for (label, probs), (b_label, b_probs) in zip(per_model[window_i], batched[window_i]):
+            assert label == b_label
+            max_prob_diff = max(max_prob_diff, np.abs(probs - b_probs).max())
+    print("parity : same labels, max probability difference %.2e" % max_prob_diff)
+
+    # measuring each design in a fresh process (no memory shared with the current one)
+    ctx = get_context("spawn")
+    queue = ctx.Queue()
+    for name, is_batched, n_processes in (("process per model", False, n_models), ("model server", True, 1)):
+        p = ctx.Process(target=measure_design, args=(model_dir, windows, is_batched, queue))
+        p.start()
+        rss, window_time = queue.get()
+        p.join()
+        print("%-17s : %d process(es) x %6.1f MB = %7.1f MB, %7.2f ms per window (all models)" %
+              (name, n_processes, rss, rss * n_processes, window_time))
@@ -0,0 +1,92 @@
+import time
+import numpy as np
+import tensorflow as tf
+
+# importing model utilities
+from snaprnn.train import ModelBatchGenerator
+from snaprnn.evaluate import restore_tf_session, zero_padd_sequence, ModelInference
+
+# importing data processing/piepline utilities
+from Calibration_Pipeline.Calibration_Pipeline import get_calibration_Pipeline
+
+# Times the evaluation of a model fed one window at a time (as in eval_single_model),
+# over the recorded movements of the testing data :
+#   - two runs : labels then probabilities, each with its own graph execution (former code)
+#   - fused run : labels, probabilities and logits from one graph execution
+#   - fused run, last step : same, only the outputs of the last valid step are fetched
+#   - streaming : one step from the previous hidden state (models with the single step graph)
+
+# defining model information
+model_dir = "Model/"
+
+# defining calibration file for pipeline
+calibration_file = "Example_calibration_file.json"
+
+# defining recorded data info file
+testing_data_file = "Testing_data.json"
+
+
+# Feeds the movements window by window and returns the time spent per window (ms)
+def time_per_window(movements, eval_window):
+
+    n_windows = 0
+    t0 = time.time()
+    for movement in movements:
+        for step in range(1, movement.shape[0] + 1):
+            eval_window(movement, step)
+            n_windows += 1
+
+    return (time.time() - t0) / n_windows * 1000
+
+
+# restoring the model from the latest check point
+restored_sess, _ = restore_tf_session(model_dir)
+
+with restored_sess as session:
+
+    model = ModelInference(session)
+    predictions_op = tf.get_collection('class_ids')[0]
+    prob_op = tf.get_collection('probabilities')[0]
+
+    # loading the recorded movements
+    batch_gen = ModelBatchGenerator(movement_info_f=testing_data_file, batch_size="all",
+                                    n_inputs=model.n_inputs, n_steps=model.n_steps)
+    batch_gen.set_batch_pipeline(get_calibration_Pipeline(calibration_file))
+    movements, _, _ = batch_gen.next_batch()
+
+    def two_runs(movement, step):
+        formatted_mov = np.expand_dims(zero_padd_sequence(movement[ : step], model.n_steps), axis=0)
+        feed_dict = {model.training_model:False, model.seq_length:[step], model.X:formatted_mov}
+        predictions = session.run(predictions_op, feed_dict=feed_dict)
+        probabilities = session.run(prob_op, feed_dict=feed_dict)
+        return predictions[0][step-1], probabilities[0][step-1]
+
+    def fused_run(movement, step):
+        formatted_mov = np.expand_dims(zero_padd_sequence(movement[ : step], model.n_steps), axis=0)
+        predictions, probabilities, _ = model.run(formatted_mov, [step])
+        return predictions[0][step-1], probabilities[0][step-1]
+
+    def fused_last_step(movement, step):
+        formatted_mov = np.expand_dims(zero_padd_sequence(movement[ : step], model.n_steps), axis=0)
+        predictions, probabilities, _ = model.run(formatted_mov, [step], last_step_only=True)
+        return predictions[0], probabilities[0]
+
+    # checking that all modes give the same outputs
+    for movement in movements[ : 5]:
+        for step in range(1, model.n_steps + 1):
+            label, probs = two_runs(movement, step)
+            for mode in (fused_run, fused_last_step):
+                mode_label, mode_probs = mode(movement, step)
+                assert label == mode_label and np.allclose(probs, mode_probs, atol=1e-6)
+
+    print("%d recorded movements, %d windows each :" % (len(movements), model.n_steps))
+    for name, mode in (("two runs", two_runs), ("fused run", fused_run), ("fused, last step", fused_last_step)):
+        print("    %-16s : %6.2f ms per window" % (name, time_per_window(movements, mode)))
+
+    if model.has_step_ops():
+        states = [None]
+        def streaming(movement, step):
+            if step == 1 : states[0] = model.zero_states(1)
+            predictions, probabilities, _, states[0] = model.run_step(movement[step-1 : step], states[0])
+            return predictions[0], probabilities[0]
+        print("    %-16s : %6.2f ms per window" % ("streaming", time_per_window(movements, streaming)))
@@ -0,0 +1,133 @@
+import os
+import sys
+import shutil
+import tempfile
+import time
+import tensorflow as tf
+
+# importing model utilities
+from snaprnn.train import generate_random_params
+from snaprnn.evaluate import restore_tf_session
+from snaprnn.model import generate_blank_model, ModelFactory
+
+# Times the setup of a model for each configuration of a parameter search (before the first training step) :
+#   - former setup : generate_blank_model (graph built, checkpoint written) then restore_tf_session
+#     (graph imported, variables restored from the checkpoint)
+#   - model factory : graph built in memory, cached by shape, new random weights in the cached session
+# And the setup of a training segment resumed from a checkpoint (successive halving rungs) :
+#   - former resume : restore_tf_session (graph imported from the .meta file, variables restored)
+#   - model factory : variables restored in the cached graph of the shape
+# The segments still write one checkpoint each (the survivors of a rung are only known once the rung
+# is done, and the worker processes do not keep a model between two tasks)
+# Two sets of configurations : same shape (only learning_rate and keep_prob vary), random shapes
+# Use the number of configurations as argument
+
+n_configs = 20
+
+static_params = {
+    "n_inputs" : 400,
+    "n_outputs" : 7,
+    "n_steps" : 20,
+    "starting_step" : 15,
+}
+shape_params = {
+    "n_state_neurons" : 50,
+    "n_hidden1" : 200,
+    "n_hidden2" : 50,
+}
+hyper_params = {
+    "learning_rate" : 0.001,
+    "keep_prob" : 0.5
+}
+
+
+# returns : mean setup time of the former setup (ms per configuration)
+def time_blank_model_setup(model_params):
+
+    model_dir = tempfile.mkdtemp()
+    t0 = time.time()
+    for config_i, model_param in enumerate(model_params):
+        config_dir = os.path.join(model_dir, "config_" + str(config_i))
+        os.makedirs(config_dir)
+        generate_blank_model(config_dir, m_params=model_param)
+        session, _ = restore_tf_session(config_dir)
+        session.close()
+    setup_time = (time.time() - t0) / len(model_params) * 1000
+    shutil.rmtree(model_dir)
+
+    return setup_time
+
+
+# returns : mean setup time with the model factory (ms per configuration), number of graphs built
+def time_factory_setup(model_params):
+
+    model_factory = ModelFactory()
+    t0 = time.time()
+    for model_param in model_params:
+        model_factory.new_model(model_param)
+    setup_time = (time.time() - t0) / len(model_params) * 1000
+    n_built = model_factory.n_built
+    model_factory.close()
+
+    return setup_time, n_built
+
+
+# returns : mean resume time of the former resume and of the model factory (ms per configuration)
+def time_resume_setup(model_params):
+
+    # writing one checkpoint per configuration, as a search segment does
+    model_dir = tempfile.mkdtemp()
+    model_factory = ModelFactory()
+    checkpoint_paths = []
+    for config_i, model_param in enumerate(model_params):
+        config_dir = os.path.join(model_dir, "config_" + str(config_i))
+        os.makedirs(config_dir)
+        model = model_factory.new_model(model_param)
+        checkpoint_paths.append(model.save(os.path.join(config_dir, "cortex_rnn"), global_step=10))
+
+    t0 = time.time()
+    for checkpoint_path in checkpoint_paths:
+        tf.reset_default_graph()
+        session, _ = restore_tf_session(os.path.dirname(checkpoint_path), cp_file_in=checkpoint_path)
+        session.close()
+    restore_time = (time.time() - t0) / len(model_params) * 1000
+
+    t0 = time.time()
+    for model_param, checkpoint_path in zip(model_params, checkpoint_paths):
+        model_factory.restore_model(model_param, checkpoint_path)
+    factory_time = (time.time() - t0) / len(model_params) * 1000
+
+    model_factory.close()
+    shutil.rmtree(model_dir)
+
+    return restore_time, factory_time
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 : n_configs = int(sys.argv[1])
+
+    # same shape : the shape parameters are static
+    same_shape_static = dict(static_params)
+    same_shape_static.update(shape_params)
+    same_shape_params = generate_random_params(hyper_params, n_configs, static_params=same_shape_static)
+
+    # random shapes
+    random_anchors = dict(shape_params)
+    random_anchors.update(hyper_params)
+    random_shape_params = generate_random_params(random_anchors, n_configs, static_params=static_params)
+
+    for name, model_params in (("same shape", same_shape_params), ("random shapes", random_shape_params)):
+
+        blank_time = time_blank_model_setup(model_params)
+        factory_time, n_built = time_factory_setup(model_params)
+
+        print("%d configurations, %s :" % (n_configs, name))
+        print("    generate_blank_model + restore_tf_session : %8.1f ms per configuration" % blank_time)
+        print("    model factory (%2d graphs built)           : %8.1f ms per configuration (x%.1f)" %
+              (n_built, factory_time, blank_time / factory_time))
+
+        restore_time, factory_resume_time = time_resume_setup(model_params)
+        print("    resumed segment, restore_tf_session       : %8.1f ms per configuration" % restore_time)
+        print("    resumed segment, model factory            : %8.1f ms per configuration (x%.1f)" %
+              (factory_resume_time, restore_time / factory_resume_time))
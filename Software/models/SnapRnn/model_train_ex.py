@@ -8,6 +8,7 @@ from datetime import datetime
 from snaprnn.train import ModelBatchGenerator
 from snaprnn.evaluate import restore_tf_session 
 from snaprnn.model import generate_blank_model
+from snaprnn.prefetch import PrefetchBatchIterator
 
 # importing data processing/piepline utilities
 from Calibration_Pipeline.Calibration_Pipeline import get_calibration_Pipeline
@@ -26,10 +27,16 @@ calibration_file = "Example_calibration_file.json"
 training_data_file = "Training_data.json"
 testing_data_file = "Testing_data.json"
 
+# defining the directory of the binary dataset cache (compiled on the first run)
+dataset_cache_dir = "Dataset_cache/"
+
 # defining training parameters
 n_epochs = 300
 training_batch_size = 50
 
+# defining the number of training batches built ahead of time
+n_prefetch = 4
+
 # if no previous graph definitions, start from scratch
 checkpoint_path = tf.train.latest_checkpoint(model_dir)
 if checkpoint_path is None : 
@@ -63,34 +70,36 @@ with restored_sess as session:
     n_steps = int(X.shape[1])
     starting_step = n_steps - int(target_logits.shape[1])
     
-    # creating batch generators for training data and testing data
-    train_batch_gen = ModelBatchGenerator(movement_info_f=training_data_file, batch_size="all", 
-                                           n_inputs=n_inputs, n_steps=n_steps, starting_step=starting_step)
+    # creating batch generators for training data (minibatches) and testing data
+    train_batch_gen = ModelBatchGenerator(movement_info_f=training_data_file, batch_size=training_batch_size, 
+                                           n_inputs=n_inputs, n_steps=n_steps, starting_step=starting_step,
+                                           cache_dir=dataset_cache_dir)
     test_batch_gen = ModelBatchGenerator(movement_info_f=testing_data_file, batch_size="all", 
-                                           n_inputs=n_inputs, n_steps=n_steps, starting_step=starting_step)
+                                           n_inputs=n_inputs, n_steps=n_steps, starting_step=starting_step,
+                                           cache_dir=dataset_cache_dir)
     
     # setting a calibration pipeline for the batch generators
     cal_pipeline = get_calibration_Pipeline(calibration_file)
     train_batch_gen.set_batch_pipeline(cal_pipeline)
     test_batch_gen.set_batch_pipeline(cal_pipeline)
 
-    # loading training and testing data
-    X_train, y_train, seq_len_train = train_batch_gen.next_batch()
+    # loading testing data, the training batches are built in the background while training
     X_test, y_test, seq_len_test = test_batch_gen.next_batch()
+    train_batches = PrefetchBatchIterator(train_batch_gen, n_prefetch=n_prefetch)
     
     # keeping track of best test accuracy score
     checkpoint_accuracy = 0
 
-    # training the model
-    for epoch in range(n_epochs):
+    # training the model (the training files are shuffled at every epoch)
+    for epoch, batch_i, X_train, y_train, seq_len_train in train_batches.batches(n_epochs):
                 
         session.run(training_op, feed_dict={X:X_train, y:y_train,
                                     training_model:True, seq_length:seq_len_train})
 
-        # logging the costs (training and testing) and accuracy (testing)
-        if(epoch % 10 == 0):
+        # logging the costs (training and testing) and accuracy (testing), after the last batch of the epoch
+        if(epoch % 10 == 0 and batch_i == train_batches.n_batches - 1):
             
-            # accuracy on training batch
+            # accuracy on training batch (last batch of the epoch)
             train_acc_string = train_acc_summary.eval(feed_dict={X: X_train, y: y_train, 
                                             training_model:False, seq_length:seq_len_train})
 
@@ -114,5 +123,6 @@ with restored_sess as session:
             # printing progress update
             print("epoch : ", epoch, " / ", n_epochs)
             
+    train_batches.close()
     file_writer.close()
     
\ No newline at end of file
@@ -0,0 +1,98 @@
+import json
+import os.path
+import subprocess
+import sys
+import tempfile
+import numpy as np
+import tensorflow as tf
+
+# importing model utilities
+from snaprnn.evaluate import restore_tf_session, export_numpy_model, ModelInference
+from snaprnn.inference import SnapRnnInference
+from snaprnn.model import generate_blank_model
+
+# Exports a model to a .npz file and compares the NumPy inference engine with TensorFlow :
+#   - parity : labels and probabilities match for sequences and single steps
+#   - import time, RSS and latency per window, each engine measured in a fresh process
+# A blank model is generated (use a trained model directory as argument to export it instead)
+
+n_sequences = 20
+n_windows = 200
+
+# code run in a fresh interpreter, prints : import time (s), RSS (MB), ms per window
+engine_bench = {
+    "tensorflow" : """
+import time, resource, numpy as np
+t0 = time.time()
+from snaprnn.evaluate import restore_tf_session, ModelInference
+session, _ = restore_tf_session(MODEL_DIR)
+model = ModelInference(session)
+load_time = time.time() - t0
+""",
+    "numpy" : """
+import time, resource, numpy as np
+t0 = time.time()
+from snaprnn.inference import SnapRnnInference
+model = SnapRnnInference(MODEL_FILE)
+load_time = time.time() - t0
+"""}
+
+window_bench = """
+windows = np.random.randn(N_WINDOWS, 1, model.n_inputs).astype(np.float32)
+sequence = np.zeros((1, model.n_steps, model.n_inputs), dtype=np.float32)
+state = model.zero_states(1) if model.has_step_ops() else None
+t0 = time.time()
+for window in windows:
+    if state is not None : _, _, _, state = model.run_step(window, state)
+    else : model.run(sequence, [model.n_steps], last_step_only=True)
+window_time = (time.time() - t0) / N_WINDOWS * 1000
+print(json.dumps([load_time, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, window_time]))
+"""
+
+
+if __name__ == "__main__":
+
+    # exporting a trained model or a blank one
+    if len(sys.argv) >= 2 : model_dir = sys.argv[1]
+    else :
+        model_dir = tempfile.mkdtemp()
+        generate_blank_model(model_dir)
+        tf.reset_default_graph()
+    model_file = os.path.join(model_dir, "snaprnn_model.npz")
+    export_numpy_model(model_dir, model_file)
+    print("exported model : %s (%.1f kB)" % (model_file, os.path.getsize(model_file) / 1024))
+
+    # checking the parity of both engines
+    np_model = SnapRnnInference(model_file)
+    restored_sess, _ = restore_tf_session(model_dir)
+    with restored_sess as session:
+
+        tf_model = ModelInference(session)
+        data = np.random.randn(n_sequences, tf_model.n_steps, tf_model.n_inputs).astype(np.float32)
+        seq_lens = np.random.randint(1, tf_model.n_steps + 1, n_sequences)
+
+        for last_step_only in (False, True):
+            tf_labels, tf_probs, tf_logits = tf_model.run(data, seq_lens, last_step_only)
+            np_labels, np_probs, np_logits = np_model.run(data, seq_lens, last_step_only)
+            assert np.array_equal(tf_labels, np_labels)
+            assert np.allclose(tf_probs, np_probs, atol=1e-5)
+            print("sequences (last_step_only=%s) : same labels, max probability difference %.2e" %
+                  (last_step_only, np.abs(tf_probs - np_probs).max()))
+
+        if tf_model.has_step_ops():
+            tf_states = tf_model.zero_states(n_sequences)
+            np_states = np_model.zero_states(n_sequences)
+            for step in range(tf_model.n_steps):
+                tf_labels, tf_probs, _, tf_states = tf_model.run_step(data[ : , step], tf_states)
+                np_labels, np_probs, _, np_states = np_model.run_step(data[ : , step], np_states)
+                assert np.array_equal(tf_labels, np_labels)
+                assert np.allclose(tf_probs, np_probs, atol=1e-5)
+            print("streaming : same labels for all steps")
+
+    # measuring each engine in a fresh interpreter
+    for name in ("tensorflow", "numpy"):
+        code = ("import json\nMODEL_DIR = %r\nMODEL_FILE = %r\nN_WINDOWS = %d\n" % (model_dir, model_file, n_windows)
+                + engine_bench[name] + window_bench)
+        load_time, rss, window_time = json.loads(subprocess.check_output([sys.executable, "-c", code]).splitlines()[-1])
+        print("%-10s : import + load %6.2f s, RSS %7.1f MB, %6.3f ms per window (one step)" %
+              (name, load_time, rss, window_time))
@@ -1,18 +1,14 @@
 import numpy as np
-import tensorflow as tf
 
-import os.path
-from datetime import datetime
+import os
 
 # importing model utilities
-from snaprnn.train import ModelBatchGenerator, generate_random_params, log_config_performances
-from snaprnn.evaluate import restore_tf_session
-from snaprnn.model import generate_blank_model
+from snaprnn.train import ModelBatchGenerator, run_hyperband_search
 
 # importing data processing/piepline utilities
 from Calibration_Pipeline.Calibration_Pipeline import get_calibration_Pipeline
 
-# defining model directory
+# defining model directory (the model of each configuration is generated in Model/config_(i))
 model_dir = "Model/"
 
 # defining calibration file for pipeline
@@ -22,11 +18,34 @@ calibration_file = "Example_calibration_file.json"
 training_data_file = "Training_data.json"
 testing_data_file = "Testing_data.json"
 
-# defining random search parameters
+# defining the search journal : the search resumes from it when it exists (delete it to start a new search)
+journal_file = os.path.join(model_dir, "search_journal.jsonl")
+
+# defining the directory of the binary dataset cache (compiled on the first run)
+dataset_cache_dir = "Dataset_cache/"
+
+# defining the search schedule (hyperband) : the random configurations are evaluated at the rungs of
+# successive halving brackets, only the best 1/eta of them are trained further, up to n_epochs
+# (see search_schedule_ex.py for the number of configurations and epochs of each bracket)
 n_epochs = 300
-n_configs = 30
+min_epochs = 10
+eta = 3
+
+# defining the minibatches : each worker trains on minibatches of training_batch_size sequences, reshuffled
+# at every epoch, the shared training data is loaded n_prefetch batches ahead (see load_shared_batches)
+training_batch_size = 50
+n_prefetch = 4
+
+# stopping a configuration when its test accuracy did not improve during the last (patience) epochs
+patience = 100
 
-# randomly generating model params
+# defining the parallel search : n_workers configurations are trained at the same time,
+# each with intra_op_threads threads (n_workers * intra_op_threads ~ number of cores)
+n_cores = os.cpu_count() or 1
+intra_op_threads = 2
+n_workers = max(n_cores // intra_op_threads, 1)
+
+# defining the anchors of the random model params
 static_params = {
     "n_inputs" : 400,
     "n_outputs" : 7,
@@ -40,82 +59,37 @@ variable_params = {
     "learning_rate" : 0.001,
     "keep_prob" : 0.5
 }
-random_model_params = generate_random_params(variable_params, n_configs, variation=0.5, 
-                                            static_params=static_params)
-
-# creating batch generators for training data and testing data
-train_batch_gen = ModelBatchGenerator(movement_info_f=training_data_file, batch_size="all", 
-                                        n_inputs=static_params["n_inputs"], n_steps=static_params["n_steps"], 
-                                        starting_step=static_params["starting_step"])
-test_batch_gen = ModelBatchGenerator(movement_info_f=testing_data_file, batch_size="all", 
-                                        n_inputs=static_params["n_inputs"], n_steps=static_params["n_steps"], 
-                                        starting_step=static_params["starting_step"])
-
-# setting a calibration pipeline for the batch generators
-cal_pipeline = get_calibration_Pipeline(calibration_file)
-train_batch_gen.set_batch_pipeline(cal_pipeline)
-test_batch_gen.set_batch_pipeline(cal_pipeline)
-
-# loading training and testing data
-X_train, y_train, seq_len_train = train_batch_gen.next_batch()
-X_test, y_test, seq_len_test = test_batch_gen.next_batch()
-
-# defining logging parameters
-config_i = 1
-config_performances = []
-
-for model_param in random_model_params:
-
-    print("Training with configuration #", config_i)
-    config_i += 1
-
-    # creating the model with the new params and restoring
-    try : 
-        generate_blank_model(model_dir, m_params=model_param)
-        restored_sess, saver = restore_tf_session(model_dir)
-    except : 
-        print("Configuration #", config_i, " failed to build.")    
-        continue
-
-    max_accuracy = 0
-    epoch_at_max = 0
-
-    with restored_sess as session:
-
-        # fetching place holders
-        X = tf.get_collection('X')[0]
-        y = tf.get_collection('y')[0]
-        seq_length = tf.get_collection('seq_length')[0]
-        training_model = tf.get_collection('training_model')[0]
-        
-        # fetching training ops
-        target_logits = tf.get_collection('target_logits')[0]
-        training_op = tf.get_collection('training_op')[0]
-
-        # fetching logging ops
-        accuracy = tf.get_collection('accuracy')[0]
-        test_acc_summary = tf.get_collection('test_acc_summary')[0]
-        train_acc_summary = tf.get_collection('train_acc_summary')[0]
-
-        # training the model
-        for epoch in range(n_epochs):
-                   
-            session.run(training_op, feed_dict={X:X_train, y:y_train,
-                                     training_model:True, seq_length:seq_len_train})
-
-            # keeping track of peak accuracy
-            if(epoch % 10 == 0):
-                
-                acc_val = accuracy.eval(feed_dict={X: X_test, y: y_test, training_model:False, seq_length:seq_len_test})
-                if acc_val > max_accuracy : 
-                    max_accuracy = acc_val
-                    epoch_at_max = epoch
-                
-                print("epoch : ", epoch, " / ", n_epochs)
-
-        # saving the model performance
-        model_param["max_accuracy"] = max_accuracy
-        model_param["epoch_at_max"] = epoch_at_max
-        config_performances.append(model_param)
-
-log_config_performances(config_performances)
\ No newline at end of file
+
+
+# the workers are spawned processes which import this file : the search only runs in the main process
+if __name__ == "__main__":
+
+    # creating batch generators for training data and testing data
+    train_batch_gen = ModelBatchGenerator(movement_info_f=training_data_file, batch_size=training_batch_size, 
+                                            n_inputs=static_params["n_inputs"], n_steps=static_params["n_steps"], 
+                                            starting_step=static_params["starting_step"], cache_dir=dataset_cache_dir)
+    test_batch_gen = ModelBatchGenerator(movement_info_f=testing_data_file, batch_size="all", 
+                                            n_inputs=static_params["n_inputs"], n_steps=static_params["n_steps"], 
+                                            starting_step=static_params["starting_step"], cache_dir=dataset_cache_dir)
+
+    # setting a calibration pipeline for the batch generators
+    cal_pipeline = get_calibration_Pipeline(calibration_file)
+    train_batch_gen.set_batch_pipeline(cal_pipeline)
+    test_batch_gen.set_batch_pipeline(cal_pipeline)
+
+    # loading the testing data, the training data is loaded in shared memory batch by batch by the search
+    # (a single copy for all workers)
+    X_test, y_test, seq_len_test = test_batch_gen.next_batch()
+
+    # randomly generating and training the configurations in parallel, logging their performances
+    # and the compute saved compared to training every configuration for n_epochs
+    config_performances, summary = run_hyperband_search(variable_params, train_batch_gen, 
+                                                        (X_test, y_test, seq_len_test), min_epochs, n_epochs, 
+                                                        model_dir, eta=eta, variation=0.5, 
+                                                        static_params=static_params, n_workers=n_workers, 
+                                                        intra_op_threads=intra_op_threads, patience=patience,
+                                                        journal_f=journal_file, 
+                                                        training_batch_size=training_batch_size, 
+                                                        n_prefetch=n_prefetch)
+
+    print("Trained ", len(config_performances), " configurations")
@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+# importing model utilities
+from snaprnn.train import ModelBatchGenerator
+from snaprnn.prefetch import PrefetchBatchIterator
+
+# importing the recording generation of the dataset cache example
+from dataset_cache_ex import generate_recordings
+
+# Compares minibatch training loops where the batches are built on the training thread (next_batch)
+# and built in the background (PrefetchBatchIterator), the training step is simulated (sleep)
+# Checks that every epoch covers all recordings once, in a new order
+# Random recordings are generated (use a number of recordings as argument)
+
+n_recordings = 1000
+n_inputs = 400
+n_steps = 20
+batch_size = 50
+n_epochs = 3
+
+# simulated time of one training step (s)
+train_step_time = 0.02
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 : n_recordings = int(sys.argv[1])
+
+    data_dir = tempfile.mkdtemp()
+    movement_info_f = generate_recordings(data_dir, n_recordings)
+
+    for cache_dir in (None, os.path.join(data_dir, "cache")):
+
+        batch_gen = ModelBatchGenerator(movement_info_f, batch_size, n_inputs, n_steps, cache_dir=cache_dir)
+        n_batches = batch_gen.count_batches()
+        source = ".json files" if cache_dir is None else "cache"
+
+        # batches built on the training thread
+        t0 = time.time()
+        for epoch in range(n_epochs):
+            for batch_i in range(n_batches):
+                batch_gen.next_batch()
+                time.sleep(train_step_time)
+        sync_time = time.time() - t0
+
+        # batches built in the background
+        prefetcher = PrefetchBatchIterator(batch_gen, n_prefetch=4, n_workers=2, use_processes=cache_dir is None)
+        epoch_labels = [[] for _ in range(n_epochs)]
+        t0 = time.time()
+        for epoch, batch_i, X_batch, y_batch, seq_len_batch in prefetcher.batches(n_epochs):
+            epoch_labels[epoch].append(y_batch)
+            time.sleep(train_step_time)
+        prefetch_time = time.time() - t0
+        prefetcher.close()
+
+        # every epoch holds all recordings, shuffled again
+        labels = [np.concatenate(y) for y in epoch_labels]
+        assert all(np.array_equal(np.sort(y), np.sort(labels[0])) for y in labels)
+        assert len(labels[0]) == n_recordings * (n_steps - batch_gen.starting_step)
+        assert not np.array_equal(labels[0], labels[1])
+
+        print("%s, %d epochs of %d batches (training step of %d ms) :" %
+              (source, n_epochs, n_batches, train_step_time * 1000))
+        print("    next_batch on the training thread : %6.2f s" % sync_time)
+        print("    prefetched batches                : %6.2f s (training alone : %.2f s)" %
+              (prefetch_time, n_epochs * n_batches * train_step_time))
@@ -0,0 +1,93 @@
+import os.path
+import time
+import numpy as np
+
+# importing model utilities
+from snaprnn.train import ModelBatchGenerator
+from snaprnn.evaluate import export_numpy_model
+from snaprnn.inference import SnapRnnInference, QuantizedSnapRnnInference
+
+# importing data processing/piepline utilities
+from Calibration_Pipeline.Calibration_Pipeline import get_calibration_Pipeline
+
+# Compares the float32 and the int8 quantized NumPy inference engines on a trained model :
+#   - accuracy on the testing data (steps from starting_step), and agreement of the labels
+#   - memory held by the weights and time per window (one streaming step, fastest of n_repeats passes),
+#     for the int8 engine converting its kernels per product and for the one holding their float32 operands
+# The int8 products are done in float32 (BLAS), exact since the accumulations stay below 2^24
+# The quantization scales are calibrated on the training data
+
+# defining model information
+model_dir = "Model/"
+model_file = os.path.join(model_dir, "snaprnn_model.npz")
+
+# defining calibration file for pipeline
+calibration_file = "Example_calibration_file.json"
+
+# defining training and testing config files
+training_data_file = "Training_data.json"
+testing_data_file = "Testing_data.json"
+
+# defining the step at which to start evaluating the outputs
+starting_step = 15
+
+n_windows = 500
+n_repeats = 5
+
+
+# loads all movements described in the specified data file
+def load_movements(data_file, n_inputs, n_steps):
+    batch_gen = ModelBatchGenerator(movement_info_f=data_file, batch_size="all", n_inputs=n_inputs,
+                                    n_steps=n_steps, starting_step=starting_step)
+    batch_gen.set_batch_pipeline(get_calibration_Pipeline(calibration_file))
+    return batch_gen.next_batch()
+
+
+# returns : ms per window when the model is fed one step at a time (fastest of n_repeats passes)
+def time_per_window(model, windows):
+    window_time = None
+    for _ in range(n_repeats):
+        state = model.zero_states(1)
+        t0 = time.time()
+        for window in windows:
+            _, _, _, state = model.run_step(window, state)
+        elapsed = (time.time() - t0) / len(windows) * 1000
+        if window_time is None or elapsed < window_time : window_time = elapsed
+    return window_time
+
+
+if __name__ == "__main__":
+
+    export_numpy_model(model_dir, model_file)
+    float_model = SnapRnnInference(model_file)
+
+    # calibrating the quantized model on the training data
+    X_train, _, seq_len_train = load_movements(training_data_file, float_model.n_inputs, float_model.n_steps)
+    int8_model = QuantizedSnapRnnInference(model_file, X_train, seq_len_train)
+    held_model = QuantizedSnapRnnInference(model_file, X_train, seq_len_train, hold_operands=True)
+
+    # evaluating both models on the testing data
+    X_test, y_test, seq_len_test = load_movements(testing_data_file, float_model.n_inputs, float_model.n_steps)
+    float_labels, _, _ = float_model.run(X_test, seq_len_test)
+    int8_labels, _, _ = int8_model.run(X_test, seq_len_test)
+    float_labels = float_labels[ : , starting_step : ].flatten()
+    int8_labels = int8_labels[ : , starting_step : ].flatten()
+
+    float_accuracy = np.mean(float_labels == y_test)
+    int8_accuracy = np.mean(int8_labels == y_test)
+    print("accuracy : float32 %.4f, int8 %.4f (delta %+.4f), labels agreement %.4f" %
+          (float_accuracy, int8_accuracy, int8_accuracy - float_accuracy, np.mean(float_labels == int8_labels)))
+
+    # memory and speed
+    int8_bytes, float_bytes = int8_model.weight_bytes()
+    held_bytes, _ = held_model.weight_bytes()
+    print("weights  : float32 %.1f kB, int8 %.1f kB held (x%.1f smaller, %.1f kB temporary operand per product), "
+          "int8 with held operands %.1f kB" % (float_bytes / 1024, int8_bytes / 1024, float_bytes / int8_bytes,
+          int8_model.temporary_operand_bytes() / 1024, held_bytes / 1024))
+
+    windows = np.random.randn(n_windows, 1, float_model.n_inputs).astype(np.float32)
+    float_time = time_per_window(float_model, windows)
+    int8_time = time_per_window(int8_model, windows)
+    held_time = time_per_window(held_model, windows)
+    print("speed    : float32 %.3f ms per window, int8 %.3f ms (x%.1f), int8 with held operands %.3f ms (x%.1f)" %
+          (float_time, int8_time, int8_time / float_time, held_time, held_time / float_time))
@@ -0,0 +1,28 @@
+import sys
+
+# importing model utilities
+from snaprnn.search_journal import SearchJournal
+from snaprnn.train import config_performance_to_string
+
+# Lists the best configurations of a parameter search (see param_search_ex.py) and the checkpoint of
+# their model, from the search journal (no training, the search can still be running)
+# Use the journal file and the number of configurations as arguments
+
+journal_file = "Model/search_journal.jsonl"
+n_best = 3
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 : journal_file = sys.argv[1]
+    if len(sys.argv) >= 3 : n_best = int(sys.argv[2])
+
+    journal = SearchJournal(journal_file)
+    config_states = journal.config_states()
+    n_trained = len([state for state in config_states.values() if state["epochs_trained"] > 0])
+
+    print("%d configurations in the journal, %d trained" % (len(config_states), n_trained))
+    for rank, model_perf in enumerate(journal.best_configs(n_best), 1):
+        print("Rank #%d, configuration #%d, checkpoint : %s" % (rank, model_perf.pop("config_i"), 
+                                                                model_perf.pop("checkpoint_path")))
+        print(config_performance_to_string(model_perf))
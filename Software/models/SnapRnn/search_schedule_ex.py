@@ -0,0 +1,36 @@
+import sys
+
+# importing model utilities
+from snaprnn.train import hyperband_brackets, successive_halving_rungs, search_compute_summary
+
+# Details the schedule of a hyperband parameter search (see param_search_ex.py) : for each bracket, the
+# number of configurations trained up to the epoch of each rung, and the epochs trained compared to
+# an exhaustive search (every configuration trained for max_epochs), before early stopping
+# Use min_epochs, max_epochs and eta as arguments
+
+min_epochs = 10
+max_epochs = 300
+eta = 3
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 4 : min_epochs, max_epochs, eta = [int(arg) for arg in sys.argv[1 : 4]]
+
+    epochs_trained = 0
+    exhaustive_epochs = 0
+
+    for bracket_i, (n_configs, bracket_min_epochs) in enumerate(hyperband_brackets(min_epochs, max_epochs, eta)):
+
+        print("Bracket #%d : %d configurations" % (bracket_i, n_configs))
+
+        # the configurations of a rung resume from the epoch of the previous rung
+        previous_epoch = 0
+        for n_rung, rung_epoch in successive_halving_rungs(n_configs, bracket_min_epochs, max_epochs, eta):
+            print("    %3d configurations trained up to epoch %3d" % (n_rung, rung_epoch))
+            epochs_trained += n_rung * (rung_epoch - previous_epoch)
+            previous_epoch = rung_epoch
+
+        exhaustive_epochs += n_configs * max_epochs
+
+    print(search_compute_summary(epochs_trained, exhaustive_epochs))
@@ -0,0 +1,73 @@
+import sys
+import time
+import numpy as np
+
+# importing model utilities
+from snaprnn.sequences import build_sequences, window_step_data
+from snaprnn.evaluate import zero_padd_sequence
+
+# Checks that the batched sequence builder (snaprnn.sequences) produces the same layout as :
+#   - the former per step construction of ModelBatchGenerator.build_sequence_data (np.vstack per step)
+#   - the live inference, where each pipeline buffer (n_emgs, emg_chan_p_step) becomes one step
+# Then times both constructions. Random recordings are generated (use a number of recordings as argument)
+
+n_recordings = 2000
+n_emgs = 8
+n_inputs = 400
+n_steps = 20
+
+
+# former construction of a sequence, one step at a time, then padded one zero row at a time
+def legacy_sequence_data(emg_data, n_steps, n_inputs):
+
+    emg_chan_p_step = n_inputs // emg_data.shape[0]
+    seq_limit = min(emg_data.shape[1] // emg_chan_p_step, n_steps)
+
+    start_i = 0
+    sequence_data = np.zeros((0, n_inputs), dtype=np.dtype(np.int32))
+    for i in range(seq_limit):
+        current_step_data = emg_data[ : , start_i : start_i + emg_chan_p_step].flatten()
+        sequence_data = np.vstack([sequence_data, current_step_data])
+        start_i += emg_chan_p_step
+
+    for i in range(n_steps - seq_limit):
+        sequence_data = np.vstack([sequence_data, np.zeros(n_inputs)])
+
+    return sequence_data
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) >= 2 : n_recordings = int(sys.argv[1])
+
+    # recordings longer and shorter than a sequence (down to less than one step)
+    emg_chan_p_step = n_inputs // n_emgs
+    recordings = [np.random.randint(-128, 128, (n_emgs, np.random.randint(0, 2 * n_steps * emg_chan_p_step)))
+                  for _ in range(n_recordings)]
+
+    t0 = time.time()
+    legacy = np.array([legacy_sequence_data(emg_data, n_steps, n_inputs) for emg_data in recordings])
+    legacy_time = time.time() - t0
+
+    t0 = time.time()
+    sequences, seq_limits = build_sequences(recordings, n_steps, n_inputs)
+    batched_time = time.time() - t0
+
+    # same layout as the former construction
+    assert np.array_equal(legacy, sequences)
+
+    # same layout as the live inference, fed one pipeline buffer at a time
+    for emg_data, sequence, seq_limit in zip(recordings[ : 100], sequences, seq_limits):
+        for step in range(seq_limit):
+            window_data = emg_data[ : , step * emg_chan_p_step : (step + 1) * emg_chan_p_step]
+            assert np.array_equal(window_step_data(window_data, n_inputs), sequence[step])
+
+    # padding of partial sequences
+    for seq_limit in range(n_steps + 1):
+        padded = zero_padd_sequence(sequences[0, : seq_limit], n_steps)
+        assert padded.shape == (n_steps, n_inputs) and np.array_equal(padded[ : seq_limit], sequences[0, : seq_limit])
+        assert not padded[seq_limit : ].any()
+
+    print("%d recordings : same sequences as the former construction and as the live windows" % n_recordings)
+    print("    former construction : %.3f s" % legacy_time)
+    print("    batched builder     : %.3f s (x%.0f)" % (batched_time, legacy_time / batched_time))
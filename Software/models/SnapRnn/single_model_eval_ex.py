@@ -6,10 +6,10 @@ import tensorflow as tf
 from myo_read_raw.pipeline_buffer import launch_myo_comm, reset_pipeline_buff_flags
 
 # importing data processing/pipeline utilities
-from Calibration_Pipeline.Calibration_Pipeline import get_calibration_Pipeline
+from Calibration_Pipeline.Calibration_Pipeline import get_calibration_plan
 
 # importing model utilities
-from snaprnn.evaluate import restore_tf_session, zero_padd_sequence
+from snaprnn.evaluate import restore_tf_session, zero_padd_sequence, ModelInference
 
 pipeline_buffer_size = 50
 calibration_file = "Example_calibration_file.json"
@@ -30,8 +30,8 @@ if __name__ == "__main__":
     # starting the buffer maintenance process
     r_server, buffer_maintenance_p = launch_myo_comm(pipeline_buffer_size)
 
-    # defining the calibration pipeline
-    cal_pipeline = get_calibration_Pipeline(calibration_file)
+    # fetching the compiled calibration plan
+    cal_plan = get_calibration_plan(calibration_file)
 
     # fetching the session where the model was defined
     restored_sess, _ = restore_tf_session(model_dir)
@@ -39,17 +39,12 @@ if __name__ == "__main__":
     # using the restored model session
     with restored_sess as session:
 
-        # fetching the necessary operations and place holders for training
-        X = tf.get_collection('X')[0]
-        seq_length = tf.get_collection('seq_length')[0]
-        training_model = tf.get_collection('training_model')[0]
-        logits_op = tf.get_collection('logits_op')[0]
-        predictions_op = tf.get_collection('class_ids')[0]
-        prob_op = tf.get_collection('probabilities')[0]
+        # fetching the inference operations
+        model = ModelInference(session)
 
         # pulling model input dimensions
-        n_inputs = int(X.shape[2])
-        n_steps = int(X.shape[1])
+        n_inputs = model.n_inputs
+        n_steps = model.n_steps
 
         # defining input container for the model
         movement_data = np.zeros((0, n_inputs))
@@ -68,7 +63,7 @@ if __name__ == "__main__":
 
                     # adding buffer content to the movement data
                     pipeline_buff = np.array(json.loads(r_server.get("pipeline_buff")))
-                    pipeline_buff = cal_pipeline.fit_transform(pipeline_buff)
+                    pipeline_buff = cal_plan.apply(pipeline_buff, "window")
                     movement_data = np.vstack([movement_data, 
                                     np.reshape(pipeline_buff, n_inputs)])
                     
@@ -82,15 +77,12 @@ if __name__ == "__main__":
                     # formatting the curr movement length
                     formatted_seq_len = np.array([movement_len])
 
-                    # evaluating the model with the movement data
-                    probabilities = session.run(prob_op, 
-                                    feed_dict={training_model:False, seq_length:formatted_seq_len, X:formatted_mov})
-                    predictions = session.run(predictions_op, 
-                                    feed_dict={training_model:False, seq_length:formatted_seq_len, X:formatted_mov})
+                    # evaluating the model with the movement data (outputs of the last step)
+                    predictions, probabilities, _ = model.run(formatted_mov, formatted_seq_len, last_step_only=True)
 
                     # pairing the prediction and the probability
-                    curr_step_pred = predictions[0][movement_len-1]
-                    current_prob = probabilities[0][movement_len-1][curr_step_pred]
+                    curr_step_pred = predictions[0]
+                    current_prob = probabilities[0][curr_step_pred]
                     print(movement_names[str(curr_step_pred)], " - ", str(current_prob), " - ", str(movement_len), "\n")
 
                     # managing the size of the movement
@@ -0,0 +1,133 @@
+import json
+import numpy as np
+
+# importting os utilities
+import os
+import os.path
+
+# Binary cache of the recorded movements used by ModelBatchGenerator
+# The .json recordings are compiled once into two files :
+#   - (name)_samples.npy : emg samples of all recordings, int8, shape (n_acquisitions, n_emgs), memory mapped
+#   - (name)_index.npz : file index (name, modification time, size), label, offset and length of each recording
+# The cache is compiled again when a recording is added, removed or modified
+
+
+# returns : paths of the cache files, for the specified movement info file
+def cache_file_names(cache_dir, movement_info_f):
+    name = os.path.splitext(os.path.basename(movement_info_f))[0]
+    return os.path.join(cache_dir, name + "_samples.npy"), os.path.join(cache_dir, name + "_index.npz")
+
+
+# returns : modification time and size of each file (used to invalidate the cache)
+def file_stamps(file_names):
+    stats = [os.stat(file_name) for file_name in file_names]
+    return np.array([stat.st_mtime for stat in stats]), np.array([stat.st_size for stat in stats])
+
+
+# Decodes a .json recording
+# Inputs :
+#   file_name : path of the .json recording
+# Returns : emg samples, int8, shape (n_acquisitions, n_emgs)
+def read_recording(file_name, n_emgs=8):
+
+    json_data = json.loads(open(file_name, 'r').read())
+    emg_data = np.array(json_data["emg"]["data"], dtype=np.int32).reshape(-1, n_emgs)
+    if emg_data.size and (emg_data.min() < -128 or emg_data.max() > 127):
+        raise(ValueError("Emg values out of the int8 range in : " + file_name))
+    return emg_data.astype(np.int8)
+
+
+# Compiles the specified recordings into the cache files
+# Only one recording is held in memory at a time : the lengths are collected in a first pass,
+# then each recording is written at its offset in the preallocated (memory mapped) samples file
+# Inputs :
+#   file_names : paths of the .json recordings
+#   labels : label of each recording
+#   samples_file, index_file : paths of the cache files (see cache_file_names)
+def compile_dataset(file_names, labels, samples_file, index_file, n_emgs=8):
+
+    mtimes, sizes = file_stamps(file_names)
+    lengths = np.array([read_recording(file_name, n_emgs).shape[0] for file_name in file_names], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)[ : -1]]).astype(np.int64)
+
+    # writing the samples first, the index marks a complete cache
+    if os.path.dirname(samples_file) and not os.path.exists(os.path.dirname(samples_file)):
+        os.makedirs(os.path.dirname(samples_file))
+    if os.path.exists(index_file) : os.remove(index_file)
+
+    samples = np.lib.format.open_memmap(samples_file, mode="w+", dtype=np.int8, 
+                                        shape=(int(lengths.sum()), n_emgs))
+    for i in range(len(file_names)):
+        emg_data = read_recording(file_names[i], n_emgs)
+        if emg_data.shape[0] != lengths[i]:
+            raise(ValueError("Recording modified while the cache was compiled : " + file_names[i]))
+        samples[offsets[i] : offsets[i] + lengths[i]] = emg_data
+    samples.flush()
+    del samples
+
+    np.savez(index_file, file_names=np.array(file_names), labels=np.array(labels, dtype=np.int32),
+             offsets=offsets, lengths=lengths, mtimes=mtimes, sizes=sizes)
+
+
+class DatasetCache():
+
+    '''
+    DatasetCache
+
+    - Recordings of a movement info file, read from the memory mapped cache files
+
+    - The cache is compiled if missing or out of date (recordings added, removed or modified)
+
+    - get_emg_data returns the same data as the .json recording, shape (n_emgs, n_acquisitions)
+    '''
+
+    # file_names : paths of the .json recordings
+    # labels : label of each recording
+    # cache_dir : directory of the cache files
+    # movement_info_f : path to the movement info json file (names the cache files)
+    def __init__(self, file_names, labels, cache_dir, movement_info_f, n_emgs=8):
+
+        self.samples_file, self.index_file = cache_file_names(cache_dir, movement_info_f)
+
+        # sorted names : the cache does not depend on the order of the files
+        order = np.argsort(file_names)
+        file_names = [file_names[i] for i in order]
+        labels = [labels[i] for i in order]
+
+        self.compiled = False
+        if not self.is_valid(file_names):
+            compile_dataset(file_names, labels, self.samples_file, self.index_file, n_emgs)
+            self.compiled = True
+
+        index = np.load(self.index_file)
+        self.labels = index["labels"]
+        self.offsets = index["offsets"]
+        self.lengths = index["lengths"]
+        self.file_indexes = {file_name : i for i, file_name in enumerate(index["file_names"].tolist())}
+
+        self.samples = np.load(self.samples_file, mmap_mode="r")
+
+
+    # checks if the cache files hold the specified recordings, unmodified
+    def is_valid(self, file_names):
+
+        if not (os.path.exists(self.samples_file) and os.path.exists(self.index_file)):
+            return False
+
+        index = np.load(self.index_file)
+        if index["file_names"].tolist() != file_names:
+            return False
+
+        mtimes, sizes = file_stamps(file_names)
+        return np.array_equal(index["mtimes"], mtimes) and np.array_equal(index["sizes"], sizes)
+
+
+    # returns : emg data of the recording, shape (n_emgs, n_acquisitions)
+    def get_emg_data(self, file_name):
+        i = self.file_indexes[file_name]
+        return np.swapaxes(self.samples[self.offsets[i] : self.offsets[i] + self.lengths[i]], 0, 1)
+
+
+    # returns : label of the recording
+    def get_label(self, file_name):
+        return self.labels[self.file_indexes[file_name]]
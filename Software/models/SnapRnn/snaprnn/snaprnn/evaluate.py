@@ -12,9 +12,19 @@ from os import listdir
 
 # importing myo communication utilities
 from myo_read_multi.pipeline_buffer import launch_myo_comm, reset_pipeline_buff_flags, write_model_prediction, wait_for_start_time
+from myo_read_multi.pipeline_buffer import read_pipeline_buff, wait_for_pipeline_buff, wait_for_event
+from myo_read_multi.pipeline_buffer import attach_pipeline_transport
 
 # importing data processing/piepline utilities
-from Calibration_Pipeline.Calibration_Pipeline import get_calibration_Pipeline
+from Calibration_Pipeline.Calibration_Pipeline import get_calibration_plan
+
+# importing the model serving utilities (shared with the NumPy inference engine)
+from .serving import stagger_model_window, stagger_model_states, serve_staggered_models
+from .serving import eval_model_predictions, model_prediction_score
+from .inference import model_arrays
+
+# importing the model input layout (shared with the training)
+from .sequences import window_step_data
 
 
 # function to add zero padding to a sequence
@@ -27,11 +37,13 @@ def zero_padd_sequence(data, target_seq_length):
     n_current_sequences = data.shape[0]
     n_inputs = data.shape[1]
 
-    # adding the necessary padding
-    for i in range(target_seq_length - n_current_sequences): 
-        data = np.vstack([data, np.zeros(n_inputs)])
+    if n_current_sequences >= target_seq_length : return data
+
+    # copying the data in a preallocated zero array (padding is in float, as the zero rows)
+    padded_data = np.zeros((target_seq_length, n_inputs), dtype=np.result_type(data, np.float64))
+    padded_data[ : n_current_sequences] = data
 
-    return data
+    return padded_data
     
 
 # fetches the latest graph definition from specified directory
@@ -58,8 +70,9 @@ def fetch_latest_graph(model_dir):
 # inputs : 
     # model_dir : path to the model is defined (folder contains .meta file)
     # cp_file_in : path to the model meta file (optional)
+    # session_config : tf.ConfigProto of the session (optional, ex : thread budget)
 # returns : the session where the trained model is defined 
-def restore_tf_session(model_dir, cp_file_in=None):
+def restore_tf_session(model_dir, cp_file_in=None, session_config=None):
 
     cp_file = ""
 
@@ -77,12 +90,116 @@ def restore_tf_session(model_dir, cp_file_in=None):
     saver = tf.train.import_meta_graph(meta_file)
 
     # restoring the saved model from the proper cp file
-    session = tf.Session()
+    session = tf.Session(config=session_config)
     saver.restore(session, cp_file)
 
     return session, saver
 
 
+# fetches the single step operations of the restored model (streaming inference)
+# the hidden state is fed back at each step, so a step costs one GRU evaluation
+# returns : 
+#   dict with "X_step", "state_in", "state_out", "class_ids", "probabilities"
+#   None if the model was generated without the single step graph (full sequence runs are used)
+def fetch_step_ops():
+
+    if not tf.get_collection('state_out') : return None
+
+    return {"X_step" : tf.get_collection('X_step')[0],
+            "state_in" : tf.get_collection('state_in')[0],
+            "state_out" : tf.get_collection('state_out')[0],
+            "class_ids" : tf.get_collection('step_class_ids')[0],
+            "probabilities" : tf.get_collection('step_probabilities')[0],
+            "logits" : tf.get_collection('step_logits')[0]}
+
+
+class ModelInference():
+
+    '''
+    ModelInference
+
+    - Inference API on a restored model (the graph of the provided session)
+
+    - Labels, probabilities and logits are fetched with a single graph execution
+      (the training/dropout flag is always off)
+
+    - last_step_only : 
+        Only the outputs of the last valid step of each sequence are returned,
+        shapes become (batch_size) and (batch_size, n_outputs) 
+
+    - The single step operations (streaming) are available for models generated with them
+    '''
+
+    # session : session where the model was restored (see restore_tf_session)
+    def __init__(self, session):
+
+        self.session = session
+
+        with session.graph.as_default():
+
+            # fetching the place holders
+            self.X = tf.get_collection('X')[0]
+            self.seq_length = tf.get_collection('seq_length')[0]
+            self.training_model = tf.get_collection('training_model')[0]
+
+            # fetching the outputs for all steps
+            self.outputs = [tf.get_collection('class_ids')[0], 
+                            tf.get_collection('probabilities')[0],
+                            tf.get_collection('logits_op')[0]]
+
+            # gathering the outputs of the last valid step of each sequence
+            last_step_i = tf.stack([tf.range(tf.shape(self.seq_length)[0]), self.seq_length - 1], axis=1)
+            self.last_step_outputs = [tf.gather_nd(output, last_step_i) for output in self.outputs]
+
+            # fetching the single step operations
+            self.step_ops = fetch_step_ops()
+
+        # model dimensions
+        self.n_steps = int(self.X.shape[1])
+        self.n_inputs = int(self.X.shape[2])
+        if self.step_ops is not None : self.n_state_neurons = int(self.step_ops["state_in"].shape[1])
+
+
+    # evaluates the model on zero padded sequences
+    # inputs : 
+    #   data : sequences of shape (batch_size, n_steps, n_inputs)
+    #   seq_lens : valid length of each sequence, shape (batch_size)
+    #   last_step_only : only return the outputs of the last valid step of each sequence
+    # returns : labels, probabilities, logits 
+    def run(self, data, seq_lens, last_step_only=False):
+
+        fetches = self.last_step_outputs if last_step_only else self.outputs
+        labels, probabilities, logits = self.session.run(fetches, 
+                    feed_dict={self.training_model:False, self.seq_length:seq_lens, self.X:data})
+
+        return labels, probabilities, logits
+
+
+    # checks if the model can be evaluated one step at a time 
+    def has_step_ops(self):
+        return self.step_ops is not None
+
+
+    # returns : blank hidden states for the specified number of sequences
+    def zero_states(self, batch_size):
+        return np.zeros((batch_size, self.n_state_neurons), dtype=np.float32)
+
+
+    # evaluates one step of several sequences, from their previous hidden states
+    # inputs : 
+    #   data : inputs of the step, shape (batch_size, n_inputs)
+    #   states : hidden states after the previous step, shape (batch_size, n_state_neurons)
+    # returns : labels, probabilities, logits, new hidden states 
+    def run_step(self, data, states):
+
+        labels, probabilities, logits, states = self.session.run(
+                    [self.step_ops["class_ids"], self.step_ops["probabilities"], 
+                     self.step_ops["logits"], self.step_ops["state_out"]],
+                    feed_dict={self.step_ops["X_step"]:data, self.step_ops["state_in"]:states})
+
+        return labels, probabilities, logits, states
+
+
 # Runs an RNN which pulls its input data from a redis server
 # The model is ment to be ran along side other rnn models
 # The model uses the calibation pipeline to preprocess input data
@@ -91,11 +208,11 @@ def restore_tf_session(model_dir, cp_file_in=None):
 #   client_index : creation index for the model
 #   calibration_file : path to json file containing calibration information
 #   model_dir : path to the directory containing the model files
-#   check_delay : time between data availability checks (in seconds)
+#   check_delay : max time between data availability checks (in seconds)
 def eval_single_model(r_server, client_index, calibration_file, model_dir, check_delay=0.1):
 
-    # defining the calibration pipeline
-    cal_pipeline = get_calibration_Pipeline(calibration_file)
+    # fetching the compiled calibration plan (one fused operation per window)
+    cal_plan = get_calibration_plan(calibration_file)
 
     # fetching the session where the model was defined
     restored_sess, _ = restore_tf_session(model_dir)
@@ -103,34 +220,34 @@ def eval_single_model(r_server, client_index, calibration_file, model_dir, check
     # using the restored model session
     with restored_sess as session:
 
-        # fetching the necessary operations and place holders for training
-        X = tf.get_collection('X')[0]
-        seq_length = tf.get_collection('seq_length')[0]
-        training_model = tf.get_collection('training_model')[0]
-        predictions_op = tf.get_collection('class_ids')[0]
-        prob_op = tf.get_collection('probabilities')[0]
+        # fetching the inference operations
+        model = ModelInference(session)
 
         # pulling model input dimensions
-        n_inputs = int(X.shape[2])
-        n_steps = int(X.shape[1])
+        n_inputs = model.n_inputs
+        n_steps = model.n_steps
+
+        # the single step operations are missing for older models
+        use_step_ops = model.has_step_ops()
+        if use_step_ops : state = model.zero_states(1)
 
-        # defining input container for the model
-        movement_data = np.zeros((0, n_inputs))
+        # defining input container for the model (zero padded sequence)
+        movement_data = np.zeros((1, n_steps, n_inputs), dtype=np.float32)
         movement_len = 0
 
         # defining activation flag
         model_activated = False
 
+        # attaching the process to the pipeline buffer transport
+        transport = attach_pipeline_transport(r_server)
+
         try :
 
             # while the incoming buffer is maintained
             while(r_server.get("buffer_maintained") == "1"):
                 
-                # once the model is activated, reduce resource consumption
-                if model_activated : sleep(check_delay)
-
-                # pipeline buffer is ready to be read
-                if(r_server.lindex("client_read_data", client_index) == "1"):
+                # pipeline buffer is ready to be read (waits for the buffer to be published)
+                if(wait_for_pipeline_buff(r_server, transport, client_index, check_delay)):
 
                     # check if model activation time is reached
                     if not model_activated :
@@ -141,37 +258,41 @@ def eval_single_model(r_server, client_index, calibration_file, model_dir, check
                         # adding to the movement length
                         movement_len += 1
 
-                        # adding buffer content to the movement data
-                        pipeline_buff = np.array(json.loads(r_server.get("pipeline_buff")))
-                        pipeline_buff = cal_pipeline.fit_transform(pipeline_buff)
-                        movement_data = np.vstack([movement_data, 
-                                        np.reshape(pipeline_buff, n_inputs)])
+                        # reading the buffer content
+                        pipeline_buff = read_pipeline_buff(r_server, transport, client_index)
+                        pipeline_buff = cal_plan.apply(pipeline_buff, "window")
+                        window = window_step_data(pipeline_buff, n_inputs)
                         
                         # marking buffer as read (by this client)
-                        reset_pipeline_buff_flags(r_server, client_index)
+                        reset_pipeline_buff_flags(r_server, transport, client_index)
+
+                        # evaluating the model for the new step only, from the previous hidden state
+                        if use_step_ops:
+                            predictions, probabilities, _, state = model.run_step(np.expand_dims(window, axis=0), state)
 
-                        # formatting the movement data
-                        formatted_mov = zero_padd_sequence(movement_data, n_steps)
-                        formatted_mov = np.expand_dims(formatted_mov, axis=0)
+                        # evaluating the model with the whole movement data
+                        else:
+                            movement_data[0, movement_len - 1] = window
 
-                        # formatting the curr movement length
-                        formatted_seq_len = np.array([movement_len])
+                            # formatting the curr movement length
+                            formatted_seq_len = np.array([movement_len])
 
-                        # evaluating the model with the movement data
-                        predictions = session.run(predictions_op, 
-                                    feed_dict={training_model:False, seq_length:formatted_seq_len, X:formatted_mov})
-                        probabilities = session.run(prob_op, 
-                                    feed_dict={training_model:False, seq_length:formatted_seq_len, X:formatted_mov})
+                            # evaluating the model with the movement data (outputs of the last step)
+                            predictions, probabilities, _ = model.run(movement_data, formatted_seq_len, last_step_only=True)
 
                         # storing the prediction
-                        curr_step_pred = str(predictions[0][movement_len-1])
-                        pred_probs = list(probabilities[0][movement_len-1])
+                        curr_step_pred = str(predictions[0])
+                        pred_probs = list(probabilities[0])
                         write_model_prediction(r_server, client_index, curr_step_pred, pred_probs, str(movement_len))
 
                         # managing the size of the movement
                         if movement_len >= n_steps:
-                            movement_data = np.zeros((0, n_inputs))
+                            movement_data[ : ] = 0
                             movement_len = 0
+                            if use_step_ops : state[ : ] = 0
+
+                    # activation is checked again when the next buffer is published
+                    else : wait_for_event(r_server, "pipeline_buff", check_delay)
         
         except:
             # unsetting continuation flag for acquisition process
@@ -179,89 +300,67 @@ def eval_single_model(r_server, client_index, calibration_file, model_dir, check
             print("Model with index : ", client_index, " has failed.")
 
 
-# Monitors the predictions of all parallel models via the redis server
-# Defines the selected ouput for the whole system
-# This function is ment to be ran as a seperate process
-# Inputs : 
+# Runs all models of the pipeline in a single session, as one batch per window
+# Replaces the "n_models" processes of launch_model_instances (same predictions), the graph is loaded once
+# Inputs :
 #   r_server : redis server connection instance
-#   n_outputs : number of outputs for the model/client (model is a classifier)
-#   n_models : 
-#      - number of rnns to activate simultaneously
-#      - should match the number of steps in a single model
-#   check_delay : time between data availability checks (in seconds)
-def eval_model_predictions(r_server, n_outputs, n_models, check_delay=0.1):
-
-    last_data_count = 0
-    prev_pred_probs = None
+#   n_models : number of staggered models to evaluate
+#   calibration_file : path to json file containing calibration information
+#   model_dir : path to the directory containing the model files
+#   check_delay : max time between data availability checks (in seconds)
+def eval_model_server(r_server, n_models, calibration_file, model_dir, check_delay=0.1):
 
-    while(True):  
+    # fetching the compiled calibration plan (one fused operation per window)
+    cal_plan = get_calibration_plan(calibration_file)
 
-        # giving time for new data to arrive
-        sleep(check_delay)
-        
-        # waiting for all models to produce predictions
-        data_count = int(r_server.get("data_count"))
-        if(last_data_count < data_count and data_count > (n_models+1)):
-
-            # pulling prediction data for all models
-            predictions = r_server.lrange("model_predictions", 0, n_models-1)
-            pred_steps = r_server.lrange("prediction_step", 0, n_models-1)
-            
-            # pulling the prediction probabilities for all models
-            pred_probs = []
-            for model_i in range(n_models):
-                list_name = "output_probs_" + str(model_i)
-                pred_probs.append(r_server.lrange(list_name, 0, n_outputs-1))
-        
-            if(prev_pred_probs is not None):
-
-                # foreach model compute a score for the current prediction
-                prediction_scores = []
-                for model_i in range(n_models):
-
-                    # getting prediction data for current model
-                    curr_step = int(pred_steps[model_i]) 
-                    curr_pred = int(predictions[model_i])
-                    curr_probs = pred_probs[model_i]
-
-                    # getting previous probabilities for current model
-                    curr_prev_probs = prev_pred_probs[model_i]
-                    
-                    # getting previous probability for the currently predicted class
-                    # at step 0, all classes have the same output probability (1/outputs)
-                    if curr_step == 1 : curr_prev_prob = 1/n_outputs
-                    else : curr_prev_prob = float(curr_prev_probs[curr_pred])
-
-                    # calculating the score for the current model
-                    prob_diff = float(curr_probs[curr_pred]) - curr_prev_prob
-                    prediction_scores.append(model_prediction_score(prob_diff, curr_step))
-
-                # fetching the winning prediction
-                max_pred_score = max(prediction_scores)
-                selected_model_i = prediction_scores.index(max_pred_score)
-                selected_label = predictions[selected_model_i]
-                
-                # ouput selection logic goes here ... (ex)
-                print("Selected output : ", selected_label)
+    # fetching the session where the model was defined
+    restored_sess, _ = restore_tf_session(model_dir)
 
-            # keeping track of previous prediction probabilities
-            prev_pred_probs = pred_probs
-            last_data_count = data_count
+    with restored_sess as session:
+        serve_staggered_models(r_server, ModelInference(session), n_models, cal_plan, check_delay)
 
 
-# Produces score for provided prediction info, score is intended for comparison
+# Exports the weights of a trained model to a .npz file, for the NumPy inference engine
+# (see inference.SnapRnnInference, which does not require TensorFlow)
 # Inputs :
-#   prob_diff : the difference in probability, for the last two steps, of the selected class
-#   step : the step at which the provided prediction was made    
-def model_prediction_score(prob_diff, step): 
-    
-    # no points for a probability drop
-    if prob_diff < 0 : return 0
-
-    # computing score for provided prediction
-    score = prob_diff * (-0.028*step**2+0.28*step+0.3)
-    if score > 0 : return score
-    else : return 0
+#   model_dir : path to the directory containing the model files
+#   model_file : path of the output .npz file
+#   cp_file_in : path to the checkpoint to export (latest checkpoint if not specified)
+def export_numpy_model(model_dir, model_file, cp_file_in=None):
+
+    cp_file = cp_file_in if cp_file_in is not None else tf.train.latest_checkpoint(model_dir)
+    if cp_file is None : 
+        raise(ValueError("No check point file was found in specified folder"))
+
+    # variables are matched on the end of their names (the enclosing scopes may vary)
+    reader = tf.train.load_checkpoint(cp_file)
+    variable_suffixes = {
+        "gates_kernel" : "gru_cell/gates/kernel",
+        "gates_bias" : "gru_cell/gates/bias",
+        "candidate_kernel" : "gru_cell/candidate/kernel",
+        "candidate_bias" : "gru_cell/candidate/bias",
+        "hidden1_weights" : "hidden1_out/weights",
+        "hidden1_biases" : "hidden1_out/biases",
+        "hidden2_weights" : "hidden2_out/weights",
+        "hidden2_biases" : "hidden2_out/biases",
+        "out_weights" : "stacked_out/weights",
+        "out_biases" : "stacked_out/biases"
+    }
+    weights = {}
+    var_names = reader.get_variable_to_shape_map().keys()
+    for name, suffix in variable_suffixes.items():
+        matches = [var for var in var_names if var.endswith(suffix)]
+        if len(matches) != 1:
+            raise(ValueError("Could not find the variable " + suffix + " in the checkpoint"))
+        weights[name] = reader.get_tensor(matches[0]).astype(np.float32)
+
+    # the number of steps is read from the graph definition
+    with tf.Graph().as_default():
+        tf.train.import_meta_graph(fetch_latest_graph(model_dir))
+        weights["n_steps"] = np.array(int(tf.get_collection('X')[0].shape[1]))
+
+    np.savez_compressed(model_file, **{name : weights[name] for name in model_arrays})
+    return model_file
 
 
 # Launches multiple RNN models in parallel
@@ -274,12 +373,18 @@ def model_prediction_score(prob_diff, step):
 #      - should match the number of steps in a single model
 #   calibration_file : path to json file containing calibration information
 #   model_dir : path to the directory containing the model files
-#   check_delay : time between data availability checks (in seconds)
-def launch_model_instances(pipeline_buffer_size, n_outputs, n_models, calibration_file, model_dir, check_delay=0.1):
+#   check_delay : max time between data availability checks (in seconds)
+#   backend : transport for the pipeline buffer content, "redis", "shm" (shared memory) or "stream" (redis stream)
+def launch_model_instances(pipeline_buffer_size, n_outputs, n_models, calibration_file, model_dir, check_delay=0.1,
+                           backend="redis"):
 
     # starting the buffer maintenance process
     r_server, buffer_maintenance_p = launch_myo_comm(pipeline_buffer_size, n_outputs=n_outputs, 
-                                                     n_clients=n_models, check_delay=check_delay)
+                                                     n_clients=n_models, check_delay=check_delay,
+                                                     backend=backend)
+
+    # compiling the calibration plan once, the model processes inherit it (read only)
+    get_calibration_plan(calibration_file)
 
     # lauching "n_models" model in "n_models" different processes
     model_processes = []
@@ -305,4 +410,42 @@ def launch_model_instances(pipeline_buffer_size, n_outputs, n_models, calibratio
     for p in model_processes:
         p.join()
     pred_eval_p.join()
-    buffer_maintenance_p.join()
\ No newline at end of file
+    buffer_maintenance_p.join()
+
+
+# Launches the model server, which evaluates all RNN models in one process (single graph, batched)
+# Drop-in replacement for launch_model_instances
+# Inputs :
+#   pipeline_buffer_size : number of points per chanel for 1 step
+#   n_outputs : number of outputs for the model/client (model is a classifier)
+#   n_models : 
+#      - number of staggered sequences to evaluate simultaneously
+#      - should match the number of steps in a single model
+#   calibration_file : path to json file containing calibration information
+#   model_dir : path to the directory containing the model files
+#   check_delay : max time between data availability checks (in seconds)
+#   backend : transport for the pipeline buffer content, "redis", "shm" (shared memory) or "stream" (redis stream)
+def launch_inference_server(pipeline_buffer_size, n_outputs, n_models, calibration_file, model_dir, check_delay=0.1,
+                            backend="redis"):
+
+    # starting the buffer maintenance process (the server is the only client)
+    r_server, buffer_maintenance_p = launch_myo_comm(pipeline_buffer_size, n_outputs=n_outputs, 
+                                                     n_clients=1, check_delay=check_delay,
+                                                     backend=backend)
+
+    # lauching the model server
+    server_p = Process(target=eval_model_server, args=(r_server, n_models, calibration_file, model_dir, check_delay))
+    server_p.start()
+
+    # lauching the process for prediction evaluation
+    pred_eval_p = Process(target=eval_model_predictions, args=(r_server, n_outputs, n_models, check_delay))
+    pred_eval_p.start()
+
+    # waiting for confirmation that myo is connected (data  is received)
+    buffer_maintenance_p.start()
+    while(r_server.get("buffer_ready") != "1"): sleep(0.05)
+
+    # waiting for the processes to finish
+    server_p.join()
+    pred_eval_p.join()
+    buffer_maintenance_p.join()
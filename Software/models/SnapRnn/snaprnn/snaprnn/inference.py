@@ -0,0 +1,265 @@
+import numpy as np
+
+# Forward pass of the SnapRnn model (model.generate_blank_model) implemented with NumPy only
+# The weights are exported from a checkpoint with evaluate.export_numpy_model
+# This module does not import TensorFlow
+
+
+# names of the arrays stored in an exported model file
+model_arrays = ("gates_kernel", "gates_bias", "candidate_kernel", "candidate_bias",
+                "hidden1_weights", "hidden1_biases", "hidden2_weights", "hidden2_biases",
+                "out_weights", "out_biases", "n_steps")
+
+
+class SnapRnnInference():
+
+    '''
+    SnapRnnInference
+
+    - Same interface as evaluate.ModelInference (run, run_step, zero_states), without TensorFlow
+
+    - Eval mode only (no dropout), the computations are done in float32
+
+    - Outputs past the valid length of a sequence are computed from a zero GRU output,
+      as done by the dynamic rnn of the TensorFlow graph
+    '''
+
+    # model_file : .npz file produced by evaluate.export_numpy_model
+    def __init__(self, model_file):
+
+        weights = np.load(model_file)
+        for name in model_arrays:
+            if name not in weights:
+                raise(ValueError("Missing array in the model file : " + name))
+
+        # GRU cell weights, inputs are concatenated as [x, h]
+        self.gates_kernel = weights["gates_kernel"].astype(np.float32)
+        self.gates_bias = weights["gates_bias"].astype(np.float32)
+        self.candidate_kernel = weights["candidate_kernel"].astype(np.float32)
+        self.candidate_bias = weights["candidate_bias"].astype(np.float32)
+
+        # fully connected head
+        self.fc_biases = [weights["hidden1_biases"].astype(np.float32), weights["hidden2_biases"].astype(np.float32),
+                          weights["out_biases"].astype(np.float32)]
+
+        # model dimensions
+        self.n_steps = int(weights["n_steps"])
+        self.n_state_neurons = self.gates_kernel.shape[1] // 2
+        self.n_inputs = self.gates_kernel.shape[0] - self.n_state_neurons
+        self.n_outputs = self.fc_biases[-1].shape[0]
+
+        # matrix products of the forward pass, by name (see layer_dot)
+        # the GRU kernels are split in their input and state parts (no concatenation per step)
+        self.kernels = {
+            "gates_x" : self.gates_kernel[ : self.n_inputs],
+            "gates_h" : self.gates_kernel[self.n_inputs : ],
+            "candidate_x" : self.candidate_kernel[ : self.n_inputs],
+            "candidate_h" : self.candidate_kernel[self.n_inputs : ],
+            "hidden1" : weights["hidden1_weights"].astype(np.float32),
+            "hidden2" : weights["hidden2_weights"].astype(np.float32),
+            "out" : weights["out_weights"].astype(np.float32)
+        }
+
+
+    # matrix product of the inputs with the specified kernel (see self.kernels)
+    def layer_dot(self, name, x):
+        return np.dot(x, self.kernels[name])
+
+
+    # returns : blank hidden states for the specified number of sequences
+    def zero_states(self, batch_size):
+        return np.zeros((batch_size, self.n_state_neurons), dtype=np.float32)
+
+
+    # one GRU step
+    # inputs :
+    #   data : inputs of the step, shape (batch_size, n_inputs)
+    #   states : hidden states, shape (batch_size, n_state_neurons)
+    # returns : new hidden states (which are also the GRU outputs)
+    def gru_step(self, data, states):
+
+        gates = sigmoid(self.layer_dot("gates_x", data) + self.layer_dot("gates_h", states) + self.gates_bias)
+        reset = gates[ : , : self.n_state_neurons]
+        update = gates[ : , self.n_state_neurons : ]
+
+        candidate = np.tanh(self.layer_dot("candidate_x", data) + self.layer_dot("candidate_h", reset * states)
+                            + self.candidate_bias)
+
+        return update * states + (1 - update) * candidate
+
+
+    # fully connected head
+    # inputs :
+    #   rnn_outputs : GRU outputs, shape (n, n_state_neurons)
+    # returns : labels, probabilities, logits
+    def head(self, rnn_outputs):
+
+        hidden1 = np.maximum(self.layer_dot("hidden1", rnn_outputs) + self.fc_biases[0], 0)
+        hidden2 = np.maximum(self.layer_dot("hidden2", hidden1) + self.fc_biases[1], 0)
+        logits = self.layer_dot("out", hidden2) + self.fc_biases[2]
+
+        return np.argmax(logits, axis=-1), softmax(logits), logits
+
+
+    # evaluates the model on zero padded sequences
+    # inputs :
+    #   data : sequences of shape (batch_size, n_steps, n_inputs)
+    #   seq_lens : valid length of each sequence, shape (batch_size)
+    #   last_step_only : only return the outputs of the last valid step of each sequence
+    # returns : labels, probabilities, logits
+    def run(self, data, seq_lens, last_step_only=False):
+
+        data = np.asarray(data, dtype=np.float32)
+        seq_lens = np.asarray(seq_lens)
+        batch_size = data.shape[0]
+
+        # running the GRU over the valid steps, outputs are zero past the sequence lengths
+        rnn_outputs = np.zeros((batch_size, self.n_steps, self.n_state_neurons), dtype=np.float32)
+        states = self.zero_states(batch_size)
+        for step in range(int(seq_lens.max())):
+            valid = seq_lens > step
+            states[valid] = self.gru_step(data[valid, step], states[valid])
+            rnn_outputs[valid, step] = states[valid]
+
+        if last_step_only:
+            rnn_outputs = rnn_outputs[np.arange(batch_size), seq_lens - 1]
+            return self.head(rnn_outputs)
+
+        labels, probabilities, logits = self.head(rnn_outputs.reshape(-1, self.n_state_neurons))
+        return (labels.reshape(batch_size, self.n_steps),
+                probabilities.reshape(batch_size, self.n_steps, self.n_outputs),
+                logits.reshape(batch_size, self.n_steps, self.n_outputs))
+
+
+    # checks if the model can be evaluated one step at a time (always true)
+    def has_step_ops(self):
+        return True
+
+
+    # evaluates one step of several sequences, from their previous hidden states
+    # inputs :
+    #   data : inputs of the step, shape (batch_size, n_inputs)
+    #   states : hidden states after the previous step, shape (batch_size, n_state_neurons)
+    # returns : labels, probabilities, logits, new hidden states
+    def run_step(self, data, states):
+
+        states = self.gru_step(np.asarray(data, dtype=np.float32), states)
+        labels, probabilities, logits = self.head(states)
+
+        return labels, probabilities, logits, states
+
+
+
+class QuantizedSnapRnnInference(SnapRnnInference):
+
+    '''
+    QuantizedSnapRnnInference
+
+    - Post-training int8 quantization of the matrix products of SnapRnnInference
+      (GRU gates and candidate, fully connected layers), biases and activations stay in float32
+
+    - Weights : symmetric int8, one scale per output neuron
+
+    - Layer inputs : symmetric int8, one scale per layer, calibrated on representative data
+      (max absolute value of the layer input over the calibration sequences)
+
+    - The products are done on the int8 values in float32 (BLAS), then rescaled : the accumulations
+      stay below 2^24 (127 * 127 * rows of the kernel) so they are exact, as an int32 accumulation
+      (float64 for the kernels with too many rows, see exact_operand_dtype)
+
+    - Once calibrated, the float32 kernels are released, see weight_bytes for the memory held :
+        - hold_operands False : only the int8 kernels and their scales are held, each product
+          converts its int8 kernel to a temporary float32 operand
+        - hold_operands True : the float32 operands are built once (memory of the float32 kernels),
+          no conversion per product
+    '''
+
+    # model_file : .npz file produced by evaluate.export_numpy_model
+    # calibration_data : sequences of shape (n_sequences, n_steps, n_inputs), preprocessed as for inference
+    # calibration_lens : valid length of each sequence (full sequences if not specified)
+    # hold_operands : keep the float32 operands of the int8 kernels instead of converting them per product
+    def __init__(self, model_file, calibration_data, calibration_lens=None, hold_operands=False):
+
+        super(QuantizedSnapRnnInference, self).__init__(model_file)
+
+        # quantizing the weights per output neuron
+        self.q_kernels = {}
+        self.weight_scales = {}
+        for name, kernel in self.kernels.items():
+            scales = np.abs(kernel).max(axis=0) / 127
+            scales[scales == 0] = 1
+            self.q_kernels[name] = np.round(kernel / scales).astype(np.int8)
+            self.weight_scales[name] = scales.astype(np.float32)
+        self.operand_dtypes = {name : exact_operand_dtype(q_kernel.shape[0])
+                               for name, q_kernel in self.q_kernels.items()}
+
+        # calibrating the layer input scales with the float model
+        if calibration_lens is None : calibration_lens = np.full(len(calibration_data), self.n_steps)
+        self.input_ranges = {name : 0 for name in self.kernels}
+        self.input_scales = None
+        self.run(calibration_data, calibration_lens)
+        self.input_scales = {name : np.float32(max(input_range, 1e-8) / 127) 
+                             for name, input_range in self.input_ranges.items()}
+
+        # releasing the float32 kernels (only used by the calibration)
+        self.kernels = None
+        self.gates_kernel = None
+        self.candidate_kernel = None
+
+        # exact operands of the int8 kernels, built once
+        self.operands = None
+        if hold_operands:
+            self.operands = {name : q_kernel.astype(self.operand_dtypes[name])
+                             for name, q_kernel in self.q_kernels.items()}
+            self.q_kernels = None
+
+
+    # int8 matrix product of the inputs with the specified kernel, exact accumulation in float32
+    # (float32 product of the float kernels while the input ranges are calibrated)
+    def layer_dot(self, name, x):
+
+        if self.input_scales is None:
+            self.input_ranges[name] = max(self.input_ranges[name], float(np.abs(x).max()) if x.size else 0)
+            return np.dot(x, self.kernels[name])
+
+        operand_dtype = self.operand_dtypes[name]
+        x_scale = self.input_scales[name]
+        q_x = np.rint(x * (1 / x_scale), dtype=operand_dtype)
+        np.clip(q_x, -127, 127, out=q_x)
+        if self.operands is not None : operand = self.operands[name]
+        else : operand = self.q_kernels[name].astype(operand_dtype)
+
+        return np.dot(q_x, operand).astype(np.float32) * (x_scale * self.weight_scales[name])
+
+
+    # returns : memory held by the weights of the matrix products (bytes) : int8 kernels (or their operands)
+    #           and their scales, and the memory of the same kernels in float32 (float model)
+    def weight_bytes(self):
+        kernels = self.operands if self.operands is not None else self.q_kernels
+        return (sum(kernel.nbytes + self.weight_scales[name].nbytes for name, kernel in kernels.items()),
+                sum(kernel.size * np.dtype(np.float32).itemsize for kernel in kernels.values()))
+
+
+    # returns : memory of the largest temporary operand built by a product (bytes), 0 when the operands are held
+    def temporary_operand_bytes(self):
+        if self.operands is not None : return 0
+        return max(q_kernel.size * np.dtype(self.operand_dtypes[name]).itemsize
+                   for name, q_kernel in self.q_kernels.items())
+
+
+
+# returns : dtype in which the products of int8 values with a kernel of n_rows rows are exact
+#           (float32 while 127 * 127 * n_rows stays below 2^24, float64 otherwise)
+def exact_operand_dtype(n_rows):
+    if 127 * 127 * n_rows < 2 ** 24 : return np.float32
+    return np.float64
+
+
+
+def sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+def softmax(logits):
+    exp_logits = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp_logits / exp_logits.sum(axis=-1, keepdims=True)
@@ -7,6 +7,9 @@ from . import evaluate
 # importing os navigation utilities
 import os.path
 
+# importing the graph cache container
+from collections import OrderedDict
+
 # importing RNN utilities
 from tensorflow.contrib.layers import fully_connected, dropout, variance_scaling_initializer
 
@@ -25,30 +28,21 @@ model_params = {
 }
 
 
-# generates RNN model graph with newly initialized values
-# inputs : 
-#   m_params : model parameters specifying graph shape and characteristics
-#   model_dir : directory where model information shoukd be stored  
-#   checkpoint_out : the checkpoint file name for the genarated graph (default if not specified)
-def generate_blank_model(model_dir, m_params=None, checkpoint_out=None):
+# defining the parameters which change the shape of the graph (see model_shape_key)
+# the other parameters (learning_rate, keep_prob) are held by variables of the graph
+shape_param_names = ["n_inputs", "n_outputs", "n_state_neurons", "n_steps", "starting_step", "n_hidden1", "n_hidden2"]
 
-    # defining name of ouput checkpoint file
-    checkpoint_path = ""
-    if checkpoint_out is None:
-        # trying to get the latest cp file
-        checkpoint_path = tf.train.latest_checkpoint(model_dir)
-        # defining a new cp file
-        if checkpoint_path is None:
-            checkpoint_path = os.path.join(model_dir, "cortex_rnn")
-            
-    # using the cp file defined by the user
-    else : checkpoint_path = checkpoint_out
 
-    # defining the model parameters
-    if m_params is None : m_params = model_params
+# returns : key of the graph shape of a model configuration (models with the same key share their graph)
+def model_shape_key(m_params):
+    return tuple(int(m_params[name]) for name in shape_param_names)
 
-    # resetting the global default graph
-    tf.reset_default_graph()
+
+# builds the RNN model graph in the current default graph
+# the fetchable nodes are added to the graph collections (see restore_tf_session, fetch_step_ops)
+# inputs : 
+#   m_params : model parameters specifying graph shape and characteristics
+def build_model_graph(m_params):
 
     # placeholders for input data
     X = tf.placeholder(tf.float32, [None, m_params["n_steps"], m_params["n_inputs"]], name='X')
@@ -56,6 +50,14 @@ def generate_blank_model(model_dir, m_params=None, checkpoint_out=None):
     y = tf.placeholder(tf.int32, [None], name='y')
     training_model = tf.placeholder(tf.bool, shape=(), name='training_model')
 
+    # training hyper parameters : the values are held by variables (saved with the model) and can be
+    # overridden by feeding the placeholders, they do not change the graph (see model_shape_key)
+    with tf.name_scope("Hyper_params"):
+        learning_rate_value = tf.Variable(float(m_params["learning_rate"]), trainable=False, name="learning_rate_value")
+        keep_prob_value = tf.Variable(float(m_params["keep_prob"]), trainable=False, name="keep_prob_value")
+        learning_rate = tf.placeholder_with_default(learning_rate_value, shape=(), name="learning_rate")
+        keep_prob = tf.placeholder_with_default(keep_prob_value, shape=(), name="keep_prob")
+
     # defining the RNN with GRU cells
     with tf.name_scope("RNN"):
         with tf.variable_scope("rnn", initializer=variance_scaling_initializer()):
@@ -66,24 +68,37 @@ def generate_blank_model(model_dir, m_params=None, checkpoint_out=None):
     with tf.name_scope("Output_FC"):
         with tf.contrib.framework.arg_scope([fully_connected]):
             stacked_rnn_outputs = tf.reshape(rnn_outputs, [-1, m_params["n_state_neurons"]])
-            input_drop = dropout(stacked_rnn_outputs, m_params["keep_prob"], is_training=training_model)
+            input_drop = dropout(stacked_rnn_outputs, keep_prob, is_training=training_model)
             hidden1 = fully_connected(input_drop, m_params["n_hidden1"], scope="hidden1_out")
-            hidden1_drop = dropout(hidden1, m_params["keep_prob"], is_training=training_model)
+            hidden1_drop = dropout(hidden1, keep_prob, is_training=training_model)
             hidden2 = fully_connected(hidden1_drop, m_params["n_hidden2"], scope="hidden2_out")
-            hidden2_drop = dropout(hidden2, m_params["keep_prob"], is_training=training_model)
+            hidden2_drop = dropout(hidden2, keep_prob, is_training=training_model)
             stacked_outputs = fully_connected(hidden2_drop, m_params["n_outputs"], scope="stacked_out", activation_fn=None)
             stacked_predictions = tf.argmax(stacked_outputs, 1)
             # logits and prediction outputs
             logits_op = tf.reshape(stacked_outputs, [-1, m_params["n_steps"], m_params["n_outputs"]], name="logits_op")
             labels_op = tf.reshape(stacked_predictions, [-1, m_params["n_steps"]], name="labels_op")
 
+    # defining the single step graph (streaming inference, no dropout)
+    # the GRU cell and the fully connected layers share their weights with the sequence graph
+    with tf.name_scope("Step"):
+        X_step = tf.placeholder(tf.float32, [None, m_params["n_inputs"]], name='X_step')
+        state_in = tf.placeholder_with_default(tf.zeros([tf.shape(X_step)[0], m_params["n_state_neurons"]]), 
+                                               [None, m_params["n_state_neurons"]], name='state_in')
+        step_output, state_out = gru_cell(X_step, state_in)
+        step_hidden1 = fully_connected(step_output, m_params["n_hidden1"], scope="hidden1_out", reuse=True)
+        step_hidden2 = fully_connected(step_hidden1, m_params["n_hidden2"], scope="hidden2_out", reuse=True)
+        step_logits = fully_connected(step_hidden2, m_params["n_outputs"], scope="stacked_out", 
+                                      activation_fn=None, reuse=True)
+        step_labels = tf.argmax(step_logits, 1, name="step_labels")
+
     with tf.name_scope("Train"):
         # back prop done for outputs "Y(t)" [starting_step : n_steps]
         target_logits = logits_op[ : , m_params["starting_step"] : m_params["n_steps"] , : ]
         logits_reshaped = tf.manip.reshape(target_logits, [tf.shape(target_logits)[0]*tf.shape(target_logits)[1], tf.shape(target_logits)[2]])
         xentropy = tf.nn.sparse_softmax_cross_entropy_with_logits(labels=y, logits=logits_reshaped, name="xentropy")
         loss = tf.reduce_mean(xentropy, name="loss")
-        optimizer = tf.train.AdamOptimizer(learning_rate=m_params["learning_rate"])
+        optimizer = tf.train.AdamOptimizer(learning_rate=learning_rate)
         training_op = optimizer.minimize(loss, name="training_op")
 
     # defining nodes for performance evaluation
@@ -101,21 +116,62 @@ def generate_blank_model(model_dir, m_params=None, checkpoint_out=None):
     tf.add_to_collection('y', y)
     tf.add_to_collection('seq_length', seq_length)
     tf.add_to_collection('training_model', training_model)
+    tf.add_to_collection('learning_rate', learning_rate)
+    tf.add_to_collection('keep_prob', keep_prob)
     
     # making prediction nodes fetchable
     tf.add_to_collection('class_ids', labels_op)
     tf.add_to_collection('probabilities', tf.nn.softmax(logits_op))
     tf.add_to_collection('logits_op', logits_op)
 
+    # making single step nodes fetchable (streaming inference)
+    tf.add_to_collection('X_step', X_step)
+    tf.add_to_collection('state_in', state_in)
+    tf.add_to_collection('state_out', state_out)
+    tf.add_to_collection('step_class_ids', step_labels)
+    tf.add_to_collection('step_probabilities', tf.nn.softmax(step_logits))
+    tf.add_to_collection('step_logits', step_logits)
+
     # making training nodes fetchable
     tf.add_to_collection('target_logits', target_logits)
     tf.add_to_collection('training_op', training_op)
 
+    # making hyper parameter variables fetchable (see ModelTemplate.load_hyper_params)
+    tf.add_to_collection('learning_rate_value', learning_rate_value)
+    tf.add_to_collection('keep_prob_value', keep_prob_value)
+
     # making logging nodes fetchable
     tf.add_to_collection('accuracy', accuracy)
     tf.add_to_collection('test_acc_summary', test_acc_summary)
     tf.add_to_collection('train_acc_summary', train_acc_summary)
 
+
+# generates RNN model graph with newly initialized values
+# inputs : 
+#   m_params : model parameters specifying graph shape and characteristics
+#   model_dir : directory where model information shoukd be stored  
+#   checkpoint_out : the checkpoint file name for the genarated graph (default if not specified)
+def generate_blank_model(model_dir, m_params=None, checkpoint_out=None):
+
+    # defining name of ouput checkpoint file
+    checkpoint_path = ""
+    if checkpoint_out is None:
+        # trying to get the latest cp file
+        checkpoint_path = tf.train.latest_checkpoint(model_dir)
+        # defining a new cp file
+        if checkpoint_path is None:
+            checkpoint_path = os.path.join(model_dir, "cortex_rnn")
+            
+    # using the cp file defined by the user
+    else : checkpoint_path = checkpoint_out
+
+    # defining the model parameters
+    if m_params is None : m_params = model_params
+
+    # resetting the global default graph
+    tf.reset_default_graph()
+    build_model_graph(m_params)
+
     # initializer to initialize variables at zero
     init = tf.global_variables_initializer()
     saver_op = tf.train.Saver()
@@ -125,4 +181,163 @@ def generate_blank_model(model_dir, m_params=None, checkpoint_out=None):
         init.run()
         save_path = saver_op.save(sess, checkpoint_path)
 
-    return checkpoint_path
\ No newline at end of file
+    return checkpoint_path
+
+
+# Graph of a model shape, built once, with its session (see ModelFactory)
+class ModelTemplate():
+
+    '''
+    ModelTemplate
+
+    - Graph of a model shape (see model_shape_key), finalized, with its initializer, saver and session,
+      ops holds the nodes of the graph collections (ex : ops["X"], ops["training_op"])
+
+    - initialize resets the variables for a new configuration of the same shape (new random weights,
+      new optimizer state, learning_rate and keep_prob of the configuration), the graph is not built again
+
+    - Nothing is written on disk until save is called, the saver keeps every checkpoint it writes
+      (the template is shared by several model directories, the caller removes the checkpoints)
+
+    - snapshot / load_snapshot copy the variables in memory (ex : weights at the best evaluation,
+      saved later)
+    '''
+
+    # collections of the graph fetched in ops (see build_model_graph)
+    op_names = ["X", "y", "seq_length", "training_model", "learning_rate", "keep_prob", "class_ids", "probabilities",
+                "logits_op", "X_step", "state_in", "state_out", "step_class_ids", "step_probabilities", "step_logits",
+                "target_logits", "training_op", "accuracy", "test_acc_summary", "train_acc_summary"]
+
+    # m_params : model parameters (the shape parameters define the graph)
+    # session_config : tf.ConfigProto of the session (optional, ex : thread budget)
+    def __init__(self, m_params, session_config=None):
+
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            build_model_graph(m_params)
+            self.ops = {name : tf.get_collection(name)[0] for name in self.op_names}
+            self.hyper_variables = {"learning_rate" : tf.get_collection('learning_rate_value')[0],
+                                    "keep_prob" : tf.get_collection('keep_prob_value')[0]}
+            self.variables = tf.global_variables()
+            self.init = tf.global_variables_initializer()
+            self.saver = tf.train.Saver(max_to_keep=None)
+        self.graph.finalize()
+
+        self.session = tf.Session(graph=self.graph, config=session_config)
+
+
+    # sets new random weights and the hyper parameters of the specified configuration
+    def initialize(self, m_params):
+        self.session.run(self.init)
+        self.load_hyper_params(m_params)
+
+
+    # sets the learning rate and the keep probability of the specified configuration
+    def load_hyper_params(self, m_params):
+        for name, value_variable in self.hyper_variables.items():
+            value_variable.load(float(m_params[name]), self.session)
+
+
+    # returns : values of all variables (weights, optimizer state, hyper parameters)
+    def snapshot(self):
+        return self.session.run(self.variables)
+
+
+    # sets the variables to the values of a snapshot
+    def load_snapshot(self, values):
+        for variable, value in zip(self.variables, values):
+            variable.load(value, self.session)
+
+
+    # restores the variables of a checkpoint of the same shape (written by save or generate_blank_model)
+    def restore(self, checkpoint_path):
+        self.saver.restore(self.session, checkpoint_path)
+
+
+    # writes the variables in a checkpoint
+    # inputs :
+    #   checkpoint_path : path of the checkpoint (see generate_blank_model)
+    #   global_step : appended to the checkpoint name (optional)
+    #   write_meta_graph : writes the graph definition (required by restore_tf_session, once per model directory)
+    # returns : path to the written checkpoint
+    def save(self, checkpoint_path, global_step=None, write_meta_graph=True):
+        return self.saver.save(self.session, checkpoint_path, global_step=global_step, write_meta_graph=write_meta_graph)
+
+
+    # closes the session
+    def close(self):
+        self.session.close()
+
+
+# In memory model factory : returns ready sessions without the save / restore round trip of
+# generate_blank_model and restore_tf_session
+class ModelFactory():
+
+    '''
+    ModelFactory
+
+    - new_model returns the template of the configuration shape (see ModelTemplate), with new random
+      weights, its session is ready to train. The graphs are cached by shape (see model_shape_key) :
+      configurations which only differ by learning_rate or keep_prob share their graph and session
+
+    - restore_model does the same from a checkpoint of the configuration (resumed training)
+
+    - A template is reused by the next configuration of the same shape : the previous model is lost
+      unless it was saved (ModelTemplate.save)
+
+    - max_templates : number of cached graphs, the least recently used template is closed when the
+      cache is full
+    '''
+
+    # session_config : tf.ConfigProto of the sessions (optional, ex : thread budget)
+    # max_templates : number of graphs kept in the cache
+    def __init__(self, session_config=None, max_templates=8):
+
+        self.session_config = session_config
+        self.max_templates = max(max_templates, 1)
+        self.templates = OrderedDict()
+        self.n_built = 0
+
+
+    # returns : the cached template of the configuration shape (built if needed)
+    def get_template(self, m_params):
+
+        shape_key = model_shape_key(m_params)
+
+        if shape_key in self.templates:
+            self.templates.move_to_end(shape_key)
+            return self.templates[shape_key]
+
+        if len(self.templates) >= self.max_templates:
+            _, lru_template = self.templates.popitem(last=False)
+            lru_template.close()
+
+        template = ModelTemplate(m_params, self.session_config)
+        self.templates[shape_key] = template
+        self.n_built += 1
+
+        return template
+
+
+    # returns : template of the configuration, with new random weights and the configuration hyper parameters
+    def new_model(self, m_params):
+
+        template = self.get_template(m_params)
+        template.initialize(m_params)
+
+        return template
+
+
+    # returns : template of the configuration, with the variables of the specified checkpoint
+    def restore_model(self, m_params, checkpoint_path):
+
+        template = self.get_template(m_params)
+        template.restore(checkpoint_path)
+
+        return template
+
+
+    # closes the sessions of the cached templates
+    def close(self):
+        for template in self.templates.values() : template.close()
+        self.templates.clear()
@@ -0,0 +1,103 @@
+import numpy as np
+
+from collections import deque
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+
+# Minibatches of a ModelBatchGenerator built ahead of time by worker threads (or processes)
+# while the model trains on the current batch
+# This module does not import TensorFlow
+
+
+# batch generator used by the workers (set once per worker, see PrefetchBatchIterator)
+worker_batch_gen = None
+
+
+def init_worker(batch_gen):
+    global worker_batch_gen
+    worker_batch_gen = batch_gen
+
+
+# builds the batch data of the specified files in a worker
+def build_worker_batch(file_names):
+    return worker_batch_gen.build_batch(file_names)
+
+
+class PrefetchBatchIterator():
+
+    '''
+    PrefetchBatchIterator
+
+    - Iterates over the minibatches of a ModelBatchGenerator for several epochs, the next
+      (n_prefetch) batches are read, built and transformed by the workers in the background
+
+    - The file list of the generator is shuffled again at every epoch (the data directories
+      are not listed again), the batch size is the one of the generator
+
+    - Only (n_prefetch + 1) batches are held in memory : datasets that do not fit in memory
+      can be used (with a dataset cache, see ModelBatchGenerator.cache_dir, the workers only
+      read the memory mapped samples)
+
+    - use_processes :
+        The workers are threads by default (the batches of a dataset cache are built with numpy,
+        which releases the GIL). Processes can be used to parse .json recordings, the generator
+        is then copied once in each worker process
+    '''
+
+    # batch_gen : ModelBatchGenerator with the data files, batch size and pipeline
+    # n_prefetch : number of batches to build ahead of time
+    # n_workers : number of worker threads (or processes)
+    # seed : seed of the epoch shuffling
+    def __init__(self, batch_gen, n_prefetch=4, n_workers=2, use_processes=False, seed=None):
+
+        self.batch_gen = batch_gen
+        self.n_prefetch = max(n_prefetch, 1)
+        self.random_state = np.random.RandomState(seed)
+
+        self.batch_size = batch_gen.batch_size
+        self.n_batches = int(np.ceil(batch_gen.data_len / self.batch_size))
+
+        pool_type = Pool if use_processes else ThreadPool
+        self.pool = pool_type(n_workers, initializer=init_worker, initargs=(batch_gen,))
+
+
+    # returns : file names of each batch of a new (shuffled) epoch
+    def epoch_batch_files(self):
+
+        order = self.random_state.permutation(self.batch_gen.data_len)
+        all_files = [self.batch_gen.all_files[i] for i in order]
+
+        return [all_files[i : i + self.batch_size] for i in range(0, len(all_files), self.batch_size)]
+
+
+    # iterates over the batches of the specified number of epochs
+    # the batches of the next epoch are prefetched during the end of the current one
+    # yields : epoch index, batch index, sequences, labels, sequence lengths
+    def batches(self, n_epochs):
+
+        # batch files of all epochs, shuffled when the epoch is reached
+        def all_batch_files():
+            for epoch in range(n_epochs):
+                for batch_i, file_names in enumerate(self.epoch_batch_files()):
+                    yield epoch, batch_i, file_names
+
+        pending = deque()
+        batch_files = all_batch_files()
+
+        for epoch, batch_i, file_names in batch_files:
+
+            pending.append((epoch, batch_i, self.pool.apply_async(build_worker_batch, (file_names,))))
+            if len(pending) <= self.n_prefetch : continue
+
+            epoch_done, batch_done, result = pending.popleft()
+            yield (epoch_done, batch_done) + tuple(result.get())
+
+        while pending:
+            epoch_done, batch_done, result = pending.popleft()
+            yield (epoch_done, batch_done) + tuple(result.get())
+
+
+    # stops the workers
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
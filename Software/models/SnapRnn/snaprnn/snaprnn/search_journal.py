@@ -0,0 +1,204 @@
+import json
+import numpy as np
+
+# importting os utilities
+import os
+import os.path
+from datetime import datetime
+
+# Journal of a parameter search (see ParallelSearch in train.py), one json record per line, append only :
+#   - {"event" : "config", "config_i", "model_param", "bracket"} : configuration added to the search
+#   - {"event" : "segment", "config_i", "epochs_trained", "stopped", "failed", "checkpoint_path",
+#     "best_checkpoint_path"} : training segment of a configuration, written as soon as the segment is done,
+#     with the checkpoint at the end of the segment and the checkpoint of its best evaluation (if it improved)
+#   - {"event" : "evaluation", "config_i", "epoch", "accuracy", "checkpoint_path"} : test accuracy evaluated
+#     during a segment, and the checkpoint holding the model of that evaluation (None if it was not saved)
+#   - {"event" : "checkpoints_deleted", "config_i", "checkpoint_paths"} : checkpoints removed by the search
+#     (configurations eliminated by successive halving, checkpoints replaced by newer ones)
+# A search resumes from its journal, and the best models can be found without training again
+# This module does not import TensorFlow
+
+
+# returns : state of a configuration that was not trained yet
+def new_config_state(model_param, bracket=None):
+    return {"model_param" : model_param, "bracket" : bracket, "evaluations" : [], "epochs_trained" : 0,
+            "max_accuracy" : 0, "epoch_at_max" : 0, "stopped" : False, "failed" : False, "checkpoint_path" : None,
+            "best_checkpoint_path" : None}
+
+
+# merges the result of a training segment (see train_search_config) in the state of its configuration
+# best_checkpoint_path is the checkpoint of the evaluation at epoch_at_max
+# returns : number of epochs trained during the segment
+def merge_segment_result(state, result):
+
+    epochs_trained = result["epochs_trained"] - state["epochs_trained"]
+
+    state["failed"] = result["checkpoint_path"] is None
+    state["stopped"] = result["stopped"]
+    state["epochs_trained"] = result["epochs_trained"]
+    state["evaluations"] += [tuple(evaluation) for evaluation in result["evaluations"]]
+    state["checkpoint_path"] = result["checkpoint_path"]
+    for epoch, acc_val in result["evaluations"]:
+        if acc_val > state["max_accuracy"] :
+            state["max_accuracy"] = acc_val
+            state["epoch_at_max"] = epoch
+    if result["best_checkpoint_path"] is not None : state["best_checkpoint_path"] = result["best_checkpoint_path"]
+
+    return epochs_trained
+
+
+# removes the deleted checkpoints from the state of a configuration
+def forget_checkpoints(state, checkpoint_paths):
+
+    deleted = [os.path.normpath(path) for path in checkpoint_paths]
+    for key in ("checkpoint_path", "best_checkpoint_path"):
+        if state[key] is not None and os.path.normpath(state[key]) in deleted : state[key] = None
+
+
+# returns : configuration with its "max_accuracy", "epoch_at_max" and "epochs_trained" entries
+#           (see log_config_performances), None if it was not trained
+def config_performance(state):
+
+    if state["failed"] or state["epochs_trained"] == 0 : return None
+
+    model_perf = dict(state["model_param"])
+    model_perf["max_accuracy"] = state["max_accuracy"]
+    model_perf["epoch_at_max"] = state["epoch_at_max"]
+    model_perf["epochs_trained"] = state["epochs_trained"]
+
+    return model_perf
+
+
+# converts the numpy values of the configurations (see generate_random_params) to python values
+def json_value(value):
+    if isinstance(value, np.generic) : return value.item()
+    raise(TypeError("Value not serializable : " + repr(value)))
+
+
+class SearchJournal():
+
+    '''
+    SearchJournal
+
+    - Append only json lines file of a parameter search : every configuration, every training
+      segment and every evaluation (accuracy, checkpoint path) is written when it is known,
+      so that nothing is lost when the search stops
+
+    - config_states replays the journal : the state of each configuration is the one used by
+      ParallelSearch, which resumes from it (trained configurations are skipped, the others resume
+      from their last checkpoint)
+
+    - best_configs finds the best configurations and their checkpoint, without training again (the
+      checkpoint is None when the configuration was eliminated and its checkpoints deleted)
+    '''
+
+    # journal_f : path to the journal file (created on the first record)
+    def __init__(self, journal_f):
+
+        self.journal_f = journal_f
+        if os.path.dirname(journal_f) and not os.path.exists(os.path.dirname(journal_f)):
+            os.makedirs(os.path.dirname(journal_f))
+
+
+    # appends a record to the journal
+    def append(self, event, **record):
+
+        record["event"] = event
+        record["time"] = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+
+        with open(self.journal_f, 'a') as journal:
+            journal.write(json.dumps(record, default=json_value) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+
+
+    # returns : the records of the journal (a line cut by a stopped search is ignored)
+    def records(self):
+
+        if not os.path.exists(self.journal_f) : return []
+
+        records = []
+        with open(self.journal_f, 'r') as journal:
+            for line in journal:
+                try : records.append(json.loads(line))
+                except ValueError : continue
+
+        return records
+
+
+    # records a configuration added to the search
+    def record_config(self, config_i, model_param, bracket=None):
+        self.append("config", config_i=config_i, model_param=model_param, bracket=bracket)
+
+
+    # records a training segment (see train_search_config) and its evaluations
+    def record_segment(self, result):
+
+        # checkpoint of each evaluation : best evaluation of the segment and last evaluation
+        for eval_i, (epoch, accuracy) in enumerate(result["evaluations"]):
+            checkpoint_path = None
+            if result["best_checkpoint_path"] is not None and epoch == result["epoch_at_max"]:
+                checkpoint_path = result["best_checkpoint_path"]
+            elif eval_i == len(result["evaluations"]) - 1:
+                checkpoint_path = result["checkpoint_path"]
+            self.append("evaluation", config_i=result["config_i"], epoch=epoch, accuracy=accuracy,
+                        checkpoint_path=checkpoint_path)
+
+        self.append("segment", config_i=result["config_i"], epochs_trained=result["epochs_trained"],
+                    stopped=result["stopped"], failed=result["checkpoint_path"] is None,
+                    checkpoint_path=result["checkpoint_path"], best_checkpoint_path=result["best_checkpoint_path"])
+
+
+    # records the checkpoints removed from a configuration directory
+    def record_deleted(self, config_i, checkpoint_paths):
+        self.append("checkpoints_deleted", config_i=config_i, checkpoint_paths=checkpoint_paths)
+
+
+    # replays the journal
+    # returns : dictionary of the configuration states (see new_config_state), by configuration index
+    def config_states(self):
+
+        config_states = {}
+        evaluations = {}
+
+        for record in self.records():
+
+            config_i = record["config_i"]
+
+            if record["event"] == "config":
+                config_states[config_i] = new_config_state(record["model_param"], record["bracket"])
+                evaluations[config_i] = []
+
+            elif record["event"] == "evaluation":
+                evaluations[config_i].append((record["epoch"], record["accuracy"]))
+
+            # the evaluations of a segment are merged when the segment is complete
+            elif record["event"] == "segment":
+                merge_segment_result(config_states[config_i], {"evaluations" : evaluations[config_i],
+                                     "epochs_trained" : record["epochs_trained"], "stopped" : record["stopped"],
+                                     "checkpoint_path" : record["checkpoint_path"], 
+                                     "best_checkpoint_path" : record["best_checkpoint_path"]})
+                evaluations[config_i] = []
+
+            elif record["event"] == "checkpoints_deleted":
+                forget_checkpoints(config_states[config_i], record["checkpoint_paths"])
+
+        return config_states
+
+
+    # returns : list of the n best configurations (see config_performance) with the added "config_i" and
+    #           "checkpoint_path" entries (sorted, best first), the checkpoint holds the model evaluated at
+    #           epoch_at_max
+    def best_configs(self, n=1):
+
+        config_perfs = []
+        for config_i, state in self.config_states().items():
+            model_perf = config_performance(state)
+            if model_perf is None : continue
+            model_perf["config_i"] = config_i
+            model_perf["checkpoint_path"] = state["best_checkpoint_path"]
+            config_perfs.append(model_perf)
+
+        config_perfs.sort(key=lambda x: x["max_accuracy"], reverse=True)
+
+        return config_perfs[ : n]
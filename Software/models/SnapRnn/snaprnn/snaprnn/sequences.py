@@ -0,0 +1,60 @@
+import numpy as np
+
+# Layout of the model inputs, shared by the training (train.py) and the live inference (evaluate.py, serving.py)
+# A step holds (emg_chan_p_step) consecutive samples of each emg channel, channel after channel :
+#   step_data = [chan_0 samples, chan_1 samples, ..., chan_7 samples], shape (n_inputs)
+# This module does not import TensorFlow
+
+
+# Formats the content of the pipeline buffer as the inputs of one step
+# Inputs :
+#   window_data : emg data of shape (n_emgs, emg_chan_p_step)
+#   n_inputs : number of inputs of a step (n_emgs * emg_chan_p_step)
+# Returns : step data of shape (n_inputs)
+def window_step_data(window_data, n_inputs):
+    return np.reshape(window_data, n_inputs)
+
+
+# Formats a recording as a sequence of steps
+# Inputs :
+#   emg_data : recording of shape (n_emgs, n_acquisitions)
+#   n_steps : number of steps in a sequence (the exceeding data is ignored)
+#   n_inputs : number of inputs of a step
+#   out : buffer receiving the sequence, shape (n_steps, n_inputs), the steps after
+#         the end of the recording are set to zero
+# Returns : number of steps filled with data
+def fill_sequence(emg_data, n_steps, n_inputs, out):
+
+    n_emgs = emg_data.shape[0]
+    emg_chan_p_step = n_inputs // n_emgs
+
+    # defining the number of steps to be filled with data
+    seq_limit = min(emg_data.shape[1] // emg_chan_p_step, n_steps)
+
+    # (n_emgs, seq_limit * chan_p_step) -> (seq_limit, n_emgs, chan_p_step) -> (seq_limit, n_inputs)
+    steps = emg_data[ : , : seq_limit * emg_chan_p_step].reshape(n_emgs, seq_limit, emg_chan_p_step)
+    out[ : seq_limit] = steps.transpose(1, 0, 2).reshape(seq_limit, n_inputs)
+    out[seq_limit : ] = 0
+
+    return seq_limit
+
+
+# Formats several recordings as a batch of zero padded sequences
+# Inputs :
+#   recordings : list of recordings of shape (n_emgs, n_acquisitions)
+#   n_steps : number of steps in a sequence
+#   n_inputs : number of inputs of a step
+#   out : buffer receiving the sequences, shape (n_recordings, n_steps, n_inputs) (allocated if not specified)
+#   dtype : type of the allocated buffer
+# Returns : sequences of shape (n_recordings, n_steps, n_inputs), number of steps filled for each recording
+def build_sequences(recordings, n_steps, n_inputs, out=None, dtype=np.int32):
+
+    if out is None : out = np.empty((len(recordings), n_steps, n_inputs), dtype=dtype)
+    if out.shape != (len(recordings), n_steps, n_inputs):
+        raise(ValueError("The output buffer has to be of shape (n_recordings, n_steps, n_inputs)."))
+
+    seq_limits = np.zeros(len(recordings), dtype=np.int32)
+    for i, emg_data in enumerate(recordings):
+        seq_limits[i] = fill_sequence(emg_data, n_steps, n_inputs, out[i])
+
+    return out, seq_limits
@@ -0,0 +1,276 @@
+import numpy as np
+
+from multiprocessing import Process
+from time import sleep
+
+# importing myo communication utilities
+from myo_read_multi.pipeline_buffer import launch_myo_comm, reset_pipeline_buff_flags, wait_for_start_time
+from myo_read_multi.pipeline_buffer import read_pipeline_buff, wait_for_pipeline_buff, wait_for_event
+from myo_read_multi.pipeline_buffer import attach_pipeline_transport
+from myo_read_multi.pipeline_buffer import read_model_predictions, write_model_predictions
+
+# importing data processing/piepline utilities
+from Calibration_Pipeline.Calibration_Pipeline import get_calibration_plan
+
+# importing the NumPy inference engine
+from .inference import SnapRnnInference
+
+# importing the model input layout (shared with the training)
+from .sequences import window_step_data
+
+# Serving of the staggered models of the pipeline, independent from the inference engine
+# This module does not import TensorFlow (see evaluate.py for the TensorFlow models)
+
+
+# Adds a window to the staggered sequences of the models (in place)
+# Model i receives its first window at window i+1 and restarts its sequence every n_steps windows,
+# as the models launched by launch_model_instances
+# Inputs :
+#   movement_data : sequences of all models, shape (n_models, n_steps, n_inputs), zero padded
+#   movement_lens : current length of the sequences, shape (n_models)
+#   window : input data for one step, shape (n_inputs)
+#   window_count : number of windows received (including the current one)
+# Returns : number of active models (the active models are the first ones)
+def stagger_model_window(movement_data, movement_lens, window, window_count):
+
+    n_models = movement_data.shape[0]
+    n_steps = movement_data.shape[1]
+
+    # restarting the complete sequences
+    complete = movement_lens >= n_steps
+    movement_data[complete] = 0
+    movement_lens[complete] = 0
+
+    # adding the window at the end of the active sequences
+    n_active = min(window_count, n_models)
+    movement_data[np.arange(n_active), movement_lens[ : n_active]] = window
+    movement_lens[ : n_active] += 1
+
+    return n_active
+
+
+# Advances the staggered sequences of the models for the streaming inference (in place)
+# Same activation and restart rules as stagger_model_window, the hidden state replaces the sequence
+# Inputs :
+#   states : hidden states of all models, shape (n_models, n_state_neurons)
+#   movement_lens : current length of the sequences, shape (n_models)
+#   n_steps : number of steps in a sequence
+#   window_count : number of windows received (including the current one)
+# Returns : number of active models (the active models are the first ones)
+def stagger_model_states(states, movement_lens, n_steps, window_count):
+
+    # restarting the complete sequences from a blank state
+    complete = movement_lens >= n_steps
+    states[complete] = 0
+    movement_lens[complete] = 0
+
+    n_active = min(window_count, states.shape[0])
+    movement_lens[ : n_active] += 1
+
+    return n_active
+
+
+# Evaluates all staggered models of the pipeline as one batch per window
+# The server is the only client of the pipeline buffer
+# Inputs :
+#   r_server : redis server connection instance
+#   model : inference engine (evaluate.ModelInference or inference.SnapRnnInference)
+#   n_models : number of staggered models to evaluate
+#   cal_plan : calibration plan applied to the buffer content (see get_calibration_plan)
+#   check_delay : max time between data availability checks (in seconds)
+def serve_staggered_models(r_server, model, n_models, cal_plan, check_delay=0.1):
+
+    # pulling model input dimensions
+    n_inputs = model.n_inputs
+    n_steps = model.n_steps
+
+    # defining input containers for all models
+    # (hidden states with the single step operations, whole sequences for older models)
+    use_step_ops = model.has_step_ops()
+    if use_step_ops:
+        states = model.zero_states(n_models)
+    else:
+        movement_data = np.zeros((n_models, n_steps, n_inputs), dtype=np.float32)
+    movement_lens = np.zeros(n_models, dtype=np.int32)
+    window_count = 0
+
+    # the server is the only client of the pipeline
+    server_activated = False
+    transport = attach_pipeline_transport(r_server)
+
+    try :
+
+        # while the incoming buffer is maintained
+        while(r_server.get("buffer_maintained") == "1"):
+
+            # pipeline buffer is ready to be read (waits for the buffer to be published)
+            if(wait_for_pipeline_buff(r_server, transport, 0, check_delay)):
+
+                if not server_activated :
+                    server_activated = wait_for_start_time(r_server, 0)
+                if not server_activated :
+                    wait_for_event(r_server, "pipeline_buff", check_delay)
+                    continue
+
+                # preprocessing the buffer content once for all models
+                pipeline_buff = cal_plan.apply(read_pipeline_buff(r_server, transport, 0), "window")
+                window = window_step_data(pipeline_buff, n_inputs)
+                reset_pipeline_buff_flags(r_server, transport, 0)
+
+                window_count += 1
+                active_i = np.arange(min(window_count, n_models))
+
+                # evaluating the new step of all active models, from their hidden states
+                if use_step_ops:
+                    n_active = stagger_model_states(states, movement_lens, n_steps, window_count)
+                    step_predictions, step_probabilities, _, states[ : n_active] = model.run_step(
+                                np.tile(window, (n_active, 1)), states[ : n_active])
+
+                # evaluating the whole sequences of all active models with one execution
+                else:
+                    n_active = stagger_model_window(movement_data, movement_lens, window, window_count)
+                    step_predictions, step_probabilities, _ = model.run(movement_data[ : n_active], 
+                                                movement_lens[ : n_active], last_step_only=True)
+
+                # storing the predictions of all active models
+                write_model_predictions(r_server, active_i, step_predictions, step_probabilities,
+                                        movement_lens[ : n_active])
+
+    except:
+        # unsetting continuation flag for acquisition process
+        r_server.set("incoming_data", "0")
+        print("Model server has failed.")
+
+
+# Runs all models of the pipeline with the NumPy inference engine (no TensorFlow in the process)
+# Inputs :
+#   r_server : redis server connection instance
+#   n_models : number of staggered models to evaluate
+#   calibration_file : path to json file containing calibration information
+#   model_file : .npz model file (see evaluate.export_numpy_model)
+#   check_delay : max time between data availability checks (in seconds)
+def eval_numpy_model_server(r_server, n_models, calibration_file, model_file, check_delay=0.1):
+
+    cal_plan = get_calibration_plan(calibration_file)
+    model = SnapRnnInference(model_file)
+    serve_staggered_models(r_server, model, n_models, cal_plan, check_delay)
+
+
+# Monitors the predictions of all parallel models via the redis server
+# Defines the selected ouput for the whole system
+# This function is ment to be ran as a seperate process
+# Inputs : 
+#   r_server : redis server connection instance
+#   n_outputs : number of outputs for the model/client (model is a classifier)
+#   n_models : 
+#      - number of rnns to activate simultaneously
+#      - should match the number of steps in a single model
+#   check_delay : max time between data availability checks (in seconds)
+def eval_model_predictions(r_server, n_outputs, n_models, check_delay=0.1):
+
+    last_data_count = 0
+    last_prediction_count = 0
+    prev_pred_probs = None
+
+    while(True):  
+
+        # waiting for new predictions to arrive
+        wait_for_event(r_server, "model_predictions", check_delay)
+        
+        # waiting for all models to produce predictions
+        data_count = int(r_server.get("data_count"))
+        prediction_count = int(r_server.get("prediction_count"))
+        if(last_data_count < data_count and data_count > (n_models+1) and 
+           prediction_count >= last_prediction_count + n_models):
+
+            # pulling prediction data and probabilities for all models
+            predictions, pred_steps, pred_probs = read_model_predictions(r_server, n_models)
+        
+            if(prev_pred_probs is not None):
+
+                # foreach model compute a score for the current prediction
+                prediction_scores = []
+                for model_i in range(n_models):
+
+                    # getting prediction data for current model
+                    curr_step = pred_steps[model_i]
+                    curr_pred = predictions[model_i]
+                    curr_probs = pred_probs[model_i]
+
+                    # getting previous probabilities for current model
+                    curr_prev_probs = prev_pred_probs[model_i]
+                    
+                    # getting previous probability for the currently predicted class
+                    # at step 0, all classes have the same output probability (1/outputs)
+                    if curr_step == 1 : curr_prev_prob = 1/n_outputs
+                    else : curr_prev_prob = curr_prev_probs[curr_pred]
+
+                    # calculating the score for the current model
+                    prob_diff = curr_probs[curr_pred] - curr_prev_prob
+                    prediction_scores.append(model_prediction_score(prob_diff, curr_step))
+
+                # fetching the winning prediction
+                max_pred_score = max(prediction_scores)
+                selected_model_i = prediction_scores.index(max_pred_score)
+                selected_label = predictions[selected_model_i]
+                
+                # ouput selection logic goes here ... (ex)
+                print("Selected output : ", selected_label)
+
+            # keeping track of previous prediction probabilities
+            prev_pred_probs = pred_probs
+            last_data_count = data_count
+            last_prediction_count = prediction_count
+
+
+# Produces score for provided prediction info, score is intended for comparison
+# Inputs :
+#   prob_diff : the difference in probability, for the last two steps, of the selected class
+#   step : the step at which the provided prediction was made    
+def model_prediction_score(prob_diff, step): 
+    
+    # no points for a probability drop
+    if prob_diff < 0 : return 0
+
+    # computing score for provided prediction
+    score = prob_diff * (-0.028*step**2+0.28*step+0.3)
+    if score > 0 : return score
+    else : return 0
+
+
+# Launches the model server with the NumPy inference engine (no TensorFlow in any process)
+# Inputs :
+#   pipeline_buffer_size : number of points per chanel for 1 step
+#   n_outputs : number of outputs for the model/client (model is a classifier)
+#   n_models : 
+#      - number of staggered sequences to evaluate simultaneously
+#      - should match the number of steps in a single model
+#   calibration_file : path to json file containing calibration information
+#   model_file : .npz model file (see evaluate.export_numpy_model)
+#   check_delay : max time between data availability checks (in seconds)
+#   backend : transport for the pipeline buffer content, "redis", "shm" (shared memory) or "stream" (redis stream)
+def launch_numpy_inference_server(pipeline_buffer_size, n_outputs, n_models, calibration_file, model_file,
+                                  check_delay=0.1, backend="redis"):
+
+    # starting the buffer maintenance process (the server is the only client)
+    r_server, buffer_maintenance_p = launch_myo_comm(pipeline_buffer_size, n_outputs=n_outputs, 
+                                                     n_clients=1, check_delay=check_delay,
+                                                     backend=backend)
+
+    # lauching the model server
+    server_p = Process(target=eval_numpy_model_server, 
+                       args=(r_server, n_models, calibration_file, model_file, check_delay))
+    server_p.start()
+
+    # lauching the process for prediction evaluation
+    pred_eval_p = Process(target=eval_model_predictions, args=(r_server, n_outputs, n_models, check_delay))
+    pred_eval_p.start()
+
+    # waiting for confirmation that myo is connected (data  is received)
+    buffer_maintenance_p.start()
+    while(r_server.get("buffer_ready") != "1"): sleep(0.05)
+
+    # waiting for the processes to finish
+    server_p.join()
+    pred_eval_p.join()
+    buffer_maintenance_p.join()
@@ -12,15 +12,37 @@ import itertools
 from datetime import datetime 
 
 # importting os utilities
+import os
+import glob
+import shutil
 from os import listdir
 from os.path import isfile, join
 
+# importing multiprocessing utilities (parallel parameter search, python >= 3.8 for shared memory)
+from multiprocessing import get_context, shared_memory
+
 # importing shuffling utilities
 from random import shuffle
 
 # importing evaluation utilities
 from . import evaluate
 
+# importing the in memory model factory
+from .model import ModelFactory
+
+# importing the dataset cache
+from .dataset_cache import DatasetCache
+
+# importing the search journal
+from .search_journal import SearchJournal, new_config_state, merge_segment_result, config_performance, json_value
+from .search_journal import forget_checkpoints
+
+# importing the sequence layout utilities
+from .sequences import build_sequences
+
+# importing the minibatch prefetching (filling of the shared training data)
+from .prefetch import PrefetchBatchIterator
+
 # various sklearn tools 
 from sklearn.metrics import confusion_matrix
 
@@ -54,11 +76,16 @@ class ModelBatchGenerator():
     - starting_step : 
         Index of the step where the back propagation starts. 
         Number of labels per sequence = n_steps - starting_step
+
+    - cache_dir : 
+        If specified, the recordings are compiled once in a binary cache (see dataset_cache.py)
+        and read from it (memory mapped) instead of the .json files
     '''
 
     # movement_info_f : path to the movement info json file   
     # batch_size : number of labeled movements to include in a batch
-    def __init__(self, movement_info_f, batch_size, n_inputs, n_steps, n_emgs=8, starting_step=0):
+    # cache_dir : directory of the binary dataset cache (no cache if not specified)
+    def __init__(self, movement_info_f, batch_size, n_inputs, n_steps, n_emgs=8, starting_step=0, cache_dir=None):
         
         # loading the training file names
         self.all_files  = get_training_files(movement_info_f) 
@@ -67,6 +94,12 @@ class ModelBatchGenerator():
         # loading the movement lookup dir
         self.movement_labels = get_movement_labels(movement_info_f)
         self.num_classes = len(self.movement_labels.keys())       
+
+        # loading (or compiling) the dataset cache
+        self.dataset_cache = None
+        if cache_dir is not None:
+            labels = [self.get_label_for_file(file_name) for file_name in self.all_files]
+            self.dataset_cache = DatasetCache(self.all_files, labels, cache_dir, movement_info_f, n_emgs)
         
         # setting the trainng batch size
         if not batch_size == "all": self.batch_size = batch_size
@@ -130,22 +163,22 @@ class ModelBatchGenerator():
             raise(ValueError("\"n_emgs\" has to be greater than 0."))
 
 
-    # apply the pipeline transform to the provided data
+    # apply the pipeline transform to the provided data, shape (batch_size, n_steps, n_inputs)
+    # pipelines accepting sequence batches (see accepts_sequence_batches) get the 3-D batch, the others
+    # (ex : sklearn scalers) get one row per step, shape (batch_size * n_steps, n_inputs)
     def pipeline_transform(self, batch_data):
-        return self.batch_pipeline.transform(batch_data)
+
+        if accepts_sequence_batches(self.batch_pipeline): 
+            return self.batch_pipeline.transform(batch_data)
+
+        step_data = np.asarray(self.batch_pipeline.transform(batch_data.reshape(-1, batch_data.shape[2])))
+        return step_data.reshape(batch_data.shape[ : 2] + (-1, ))
 
 
     # extracs movement name (following naming convention)
     # returns label for extracted movement name 
     def get_label_for_file(self, file_name):
         
-        # getting index of first digit
-        digit_i = 0
-        for i, char in enumerate(file_name):
-            if(char.isdigit()):
-                digit_i = i
-                break
-        
         # getting index of last slash
         slash_i = 0
         while(True):
@@ -153,6 +186,13 @@ class ModelBatchGenerator():
             if(index != -1): slash_i  = index
             else: break
         
+        # getting index of first digit (in the file name, the directories may hold digits)
+        digit_i = 0
+        for i, char in enumerate(file_name[slash_i : ]):
+            if(char.isdigit()):
+                digit_i = slash_i + i
+                break
+        
         movement_name = file_name[slash_i+1 : digit_i-1]
         return self.movement_labels[movement_name]  
 
@@ -181,39 +221,56 @@ class ModelBatchGenerator():
 
 
     # file_name : Specified data file name
-    # returns the data in the specified file with shape (n_steps, n_inputs)
-    def build_sequence_data(self, file_name):
+    # returns the emg data of the file with shape (n_emgs, n_acquisitions)
+    def load_emg_data(self, file_name):
+
+        # reading from the dataset cache, if one is defined (int8, memory mapped)
+        if self.dataset_cache is not None: 
+            return self.dataset_cache.get_emg_data(file_name)
 
-        # loading data from file with shape : (n_emgs, n_acquisitions)
         json_data = json.loads(open(file_name, 'r').read())
-        emg_data = np.swapaxes(np.array(json_data["emg"]["data"], dtype=np.dtype(np.int32)), 0,1)
+        return np.swapaxes(np.array(json_data["emg"]["data"], dtype=np.dtype(np.int32)), 0,1)
 
-        # amt of data to be collected for 1 emg chanel per step
-        emg_chan_p_step = int(self.emg_chan_p_step())
 
-        # defining the number of steps to be filled with data
-        seq_limit = emg_data.shape[1] // emg_chan_p_step
-        if (seq_limit > self.n_steps) : seq_limit = self.n_steps
+    # file_name : Specified data file name
+    # returns the data in the specified file with shape (n_steps, n_inputs)
+    def build_sequence_data(self, file_name):
+        return self.build_batch_data([file_name])[0]
 
-        start_i = 0
-        sequence_data = np.zeros((0, self.n_inputs), dtype=np.dtype(np.int32))
-        for i in range(seq_limit):
 
-            # stacking the data in slices of shape (1, n_emgs * emg_chan_p_step = n_inputs)
-            current_step_data = emg_data[ : , start_i : start_i + emg_chan_p_step].flatten()                
-            sequence_data = np.vstack([sequence_data, current_step_data])
+    # file_names : Specified data file names
+    # returns the data in the specified files with shape (n_files, n_steps, n_inputs)
+    # (zero padded sequences, built in one preallocated array, see sequences.py)
+    def build_batch_data(self, file_names):
 
-            start_i += emg_chan_p_step
-        
-        # zero padd the sequence if it is to short
-        if(seq_limit < self.n_steps):
-            sequence_data = evaluate.zero_padd_sequence(sequence_data, self.n_steps)
+        # loading data from files with shape : (n_emgs, n_acquisitions)
+        recordings = [self.load_emg_data(file_name) for file_name in file_names]
+        batch_data, _ = build_sequences(recordings, self.n_steps, self.n_inputs)
 
-        # applying pipeline transform, if one is defined
+        # applying pipeline transform to the whole batch, if one is defined
         if self.batch_pipeline is not None: 
-            sequence_data = self.batch_pipeline.transform(sequence_data)
+            batch_data = self.pipeline_transform(batch_data)
+
+        return batch_data
+
+
+    # file_names : Specified data file names
+    # returns the labels of the specified files for the steps from starting_step, shape (n_files * n_labeled_steps)
+    def build_batch_labels(self, file_names):
+
+        file_labels = np.array([self.get_label_for_file(file_name) for file_name in file_names], 
+                               dtype=np.dtype(np.int32))
+        return np.repeat(file_labels, self.n_steps - self.starting_step)
 
-        return sequence_data
+
+    # file_names : Specified data file names
+    # returns the batch data of the specified files : sequences, labels, sequence lengths
+    # (does not change the state of the generator, can be called from worker threads)
+    def build_batch(self, file_names):
+
+        # all sequences have a length of n_steps
+        return (self.build_batch_data(file_names), self.build_batch_labels(file_names),
+                np.full(len(file_names), self.n_steps))
 
 
     # fetches the data necessary for the net training batch
@@ -228,28 +285,8 @@ class ModelBatchGenerator():
         # getting the file names for the current batch
         batch_file_names = self.get_batch_file_names()
 
-        # going through all training files for the batch
-        data_seq_container = []
-        label_container = []
-        seq_len_container = []
-
-        for file_name in batch_file_names:        
-
-            # building sequence from movement data and stacking it
-            data_seq_container.append(self.build_sequence_data(file_name))
-    
-            # building the labels for the sequence
-            label_array = np.empty((self.n_steps - self.starting_step), dtype=np.dtype(np.int32))
-            label_array.fill(self.get_label_for_file(file_name))
-            label_container.append(label_array)
-
-            # stacking the sequence length for the sequence
-            seq_len_container.append(self.n_steps)
-
-        # setting values for batch data
-        self.data_seq_container = np.array(data_seq_container)
-        self.label_container = np.array(label_container).flatten()
-        self.seq_len_container = np.array(seq_len_container)
+        # building the sequences, labels and lengths of all training files for the batch
+        self.data_seq_container, self.label_container, self.seq_len_container = self.build_batch(batch_file_names)
 
         # caching the batch data if we loaded all the data
         if not self.batch_data_cached and self.batch_size == self.data_len:
@@ -264,6 +301,14 @@ class ModelBatchGenerator():
 
 
 
+# pipeline : sklearn pipeline
+# returns : True if every transformer of the pipeline accepts sequence batches of shape (batch_size, n_steps, n_inputs)
+#           (transformers with a True "accepts_sequence_batches" attribute, ex : CalibrationTransformer)
+def accepts_sequence_batches(pipeline):
+    return all(transformer in (None, "passthrough") or getattr(transformer, "accepts_sequence_batches", False)
+               for _, transformer in pipeline.steps)
+
+
 # movement_info_f : .json file name specifying the training data location
 # returns shuffled list of all training json files
 def get_training_files(movement_info_f):
@@ -408,7 +453,8 @@ def generate_random_params(anchor_values, n_sets, variation=0.5, static_params=N
 # inputs : 
 #   model_perf : "model performances", list of configurations dictionaries with an appended "max_accuracy" entry
 #   log_name : name for the output log .txt file
-def log_config_performances(model_perfs, log_name=None):
+#   summary : text written after the header (optional, ex : compute saved by the search)
+def log_config_performances(model_perfs, log_name=None, summary=None):
 
     # grabbing info
     current_time_str = datetime.utcnow().strftime("%Y%m%d%H%M%S")
@@ -426,6 +472,7 @@ def log_config_performances(model_perfs, log_name=None):
     f = open(f_name, "w")
     f.write("Total of : " + str(n_configurations) + " evaluated during the parameter search.\n")
     f.write("Log date : " + current_time_str + ".\n\n")
+    if summary is not None : f.write(summary + "\n")
     
     # first place config
     f.write("Best configuration : \n\n")
@@ -445,16 +492,630 @@ def log_config_performances(model_perfs, log_name=None):
 #   model_config : configuration dictionary containing the added performance entries : 
 #       - max_accuracy
 #       - epoch_at_max
+#       - epochs_trained (optional, configurations stopped by the search)
 # returns string to be written in global search log file
 def config_performance_to_string(model_config):
 
     log_str = "Performance : \n"
     log_str += "max_accuracy : " + str(model_config["max_accuracy"]) + "\n"
     log_str += "epoch_at_max : " + str(model_config["epoch_at_max"]) + "\n"
+    if "epochs_trained" in model_config:
+        log_str += "epochs_trained : " + str(model_config["epochs_trained"]) + "\n"
     log_str += "Configuration : \n"
     for key, value in model_config.items():
-        if not (key == "max_accuracy" or key == "epoch_at_max"):
+        if not (key == "max_accuracy" or key == "epoch_at_max" or key == "epochs_trained"):
             log_str += key + " : " + str(value) + "\n"
     log_str += "\n"
 
-    return log_str
\ No newline at end of file
+    return log_str
+
+
+
+# Arrays held in shared memory, for the worker processes of the parameter search
+# The workers attach to the segments by name, the arrays are not pickled or copied
+class SharedArrays(object):
+
+    # arrays : list of ndarrays to copy in shared memory (None : attach to the segments of the descriptor)
+    # descriptor : list of (segment name, shape, dtype) of existing segments
+    def __init__(self, arrays=None, descriptor=None):
+
+        self.segments = []
+        self.arrays = []
+
+        if arrays is not None:
+            for array in arrays:
+                array = np.ascontiguousarray(array)
+                self.new_array(array.shape, array.dtype)[...] = array
+        elif descriptor is not None:
+            for name, shape, dtype in descriptor:
+                shm = shared_memory.SharedMemory(name=name)
+                self.segments.append(shm)
+                self.arrays.append(np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+
+    # creates a new (uninitialized) array in shared memory
+    # returns : the shared array
+    def new_array(self, shape, dtype):
+
+        shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+        shared = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        self.segments.append(shm)
+        self.arrays.append(shared)
+
+        return shared
+
+
+    # returns : (segment name, shape, dtype) of each array (picklable, see __init__)
+    def descriptor(self):
+        return [(shm.name, array.shape, array.dtype.str) for shm, array in zip(self.segments, self.arrays)]
+
+
+    # detaches the current process from the segments
+    def close(self):
+        self.arrays = []
+        for shm in self.segments : shm.close()
+
+
+    # destroys the segments (call once, from the process which created them)
+    def unlink(self):
+        for shm in self.segments : shm.unlink()
+
+
+
+# loads the training data of a batch generator in shared memory, minibatch by minibatch (the batches are
+# built in the background, see PrefetchBatchIterator) : only the shared arrays and (n_prefetch + 1)
+# batches are held, the whole training set is never built in a single batch
+# inputs :
+#   batch_gen : ModelBatchGenerator of the training data (batch size of the generator)
+#   n_prefetch : number of batches built ahead of time
+# returns : SharedArrays holding (X_train, y_train, seq_len_train) (in a shuffled order)
+def load_shared_batches(batch_gen, n_prefetch=4):
+
+    n_labeled_steps = batch_gen.n_steps - batch_gen.starting_step
+    shared_data = SharedArrays()
+    train_batches = PrefetchBatchIterator(batch_gen, n_prefetch=n_prefetch)
+    try :
+        start_i = 0
+        for _, _, X_batch, y_batch, seq_len_batch in train_batches.batches(1):
+            if not shared_data.arrays:
+                shared_data.new_array((batch_gen.data_len, ) + X_batch.shape[1 : ], X_batch.dtype)
+                shared_data.new_array((batch_gen.data_len * n_labeled_steps, ), y_batch.dtype)
+                shared_data.new_array((batch_gen.data_len, ), seq_len_batch.dtype)
+            X_train, y_train, seq_len_train = shared_data.arrays
+            end_i = start_i + len(X_batch)
+            X_train[start_i : end_i] = X_batch
+            y_train[start_i * n_labeled_steps : end_i * n_labeled_steps] = y_batch
+            seq_len_train[start_i : end_i] = seq_len_batch
+            start_i = end_i
+    except :
+        shared_data.close()
+        shared_data.unlink()
+        raise
+    finally :
+        train_batches.close()
+
+    return shared_data
+
+
+# returns : indexes of the sequences of each minibatch of an epoch, shuffled with the specified seed
+#           (a slice of all sequences when batch_size is None or holds all of them)
+def epoch_minibatches(n_sequences, batch_size, seed):
+
+    if batch_size is None or batch_size >= n_sequences : return [slice(None)]
+
+    order = np.random.RandomState(seed).permutation(n_sequences)
+    return [np.sort(order[start_i : start_i + batch_size]) for start_i in range(0, n_sequences, batch_size)]
+
+
+# data and session configuration of a search worker process (see init_search_worker)
+search_worker_state = {}
+
+
+# initializes a worker process of the parameter search
+# inputs :
+#   data_descriptor : descriptor of the shared training and testing arrays (see SharedArrays)
+#   intra_op_threads : number of threads used by the tensorflow session of the worker
+def init_search_worker(data_descriptor, intra_op_threads):
+
+    shared_data = SharedArrays(descriptor=data_descriptor)
+    search_worker_state["shared_data"] = shared_data
+    search_worker_state["data"] = shared_data.arrays
+    search_worker_state["model_factory"] = ModelFactory(tf.ConfigProto(intra_op_parallelism_threads=intra_op_threads,
+                                                                       inter_op_parallelism_threads=intra_op_threads))
+
+
+# returns : directory of the model of a search configuration
+def search_config_dir(model_dir, config_i):
+    return os.path.join(model_dir, "config_" + str(config_i))
+
+
+# trains one configuration of the parameter search from start_epoch to end_epoch (in a worker process)
+# the model is created in memory by the model factory of the worker (the graphs are cached by shape) when 
+# start_epoch is 0, otherwise the training resumes from the checkpoint of the previous segment
+# each epoch iterates over minibatches of the shared training data, shuffled at every epoch (the order only
+# depends on the configuration and the epoch, a resumed segment sees the same minibatches)
+# the checkpoint is saved in the directory of the configuration (see search_config_dir) at the end of the
+# training (cortex_rnn-(epoch)), so that the next segment can resume from it. When the test accuracy improved
+# during the segment, the weights of the best evaluation are also saved (cortex_rnn_best-(epoch_at_max))
+# inputs :
+#   search_task : dictionary with the entries :
+#       - config_i, model_param : index and model configuration
+#       - start_epoch, end_epoch : epochs to train
+#       - model_dir : directory of the search
+#       - eval_every : number of epochs between two evaluations of the test accuracy
+#       - patience : number of epochs without improvement before the training stops (None : no early stopping)
+#       - batch_size : number of sequences per training step (None : whole training set)
+#       - max_accuracy, epoch_at_max : best accuracy of the previous segments
+#       - checkpoint_path : checkpoint of the previous segment
+# returns : dictionary with the entries config_i, evaluations (list of (epoch, accuracy)), epochs_trained,
+#           stopped (early stopping), checkpoint_path (None if the configuration failed to build),
+#           epoch_at_max, best_checkpoint_path (None if the accuracy did not improve during the segment)
+def train_search_config(search_task):
+
+    config_i = search_task["config_i"]
+    start_epoch = search_task["start_epoch"]
+    eval_every = search_task["eval_every"]
+    patience = search_task["patience"]
+    X_train, y_train, seq_len_train, X_test, y_test, seq_len_test = search_worker_state["data"]
+    model_factory = search_worker_state["model_factory"]
+
+    # labels of each training sequence (the labels are flattened, n_labeled_steps per sequence)
+    n_sequences = len(X_train)
+    y_sequences = y_train.reshape(n_sequences, -1)
+
+    # creating the model with the config params (first segment) or restoring the previous segment
+    config_dir = search_config_dir(search_task["model_dir"], config_i)
+    try :
+        if start_epoch == 0 : model = model_factory.new_model(search_task["model_param"])
+        else : model = model_factory.restore_model(search_task["model_param"], search_task["checkpoint_path"])
+    except :
+        print("Configuration #", config_i, " failed to build.")
+        return {"config_i" : config_i, "evaluations" : [], "epochs_trained" : start_epoch, "stopped" : True, 
+                "checkpoint_path" : None, "epoch_at_max" : search_task["epoch_at_max"], "best_checkpoint_path" : None}
+
+    max_accuracy = search_task["max_accuracy"]
+    epoch_at_max = search_task["epoch_at_max"]
+    evaluations = []
+    best_snapshot = None
+    stopped = False
+    epoch = start_epoch
+
+    # fetching place holders and ops
+    session = model.session
+    X, y = model.ops["X"], model.ops["y"]
+    seq_length = model.ops["seq_length"]
+    training_model = model.ops["training_model"]
+    training_op = model.ops["training_op"]
+    accuracy = model.ops["accuracy"]
+
+    while epoch < search_task["end_epoch"] and not stopped:
+
+        for batch_i in epoch_minibatches(n_sequences, search_task["batch_size"], (config_i, epoch)):
+            session.run(training_op, feed_dict={X:X_train[batch_i], y:y_sequences[batch_i].ravel(), 
+                                                training_model:True, seq_length:seq_len_train[batch_i]})
+
+        # keeping track of peak accuracy (the last epoch of the segment is always evaluated)
+        if(epoch % eval_every == 0 or epoch == search_task["end_epoch"] - 1):
+            acc_val = float(session.run(accuracy, feed_dict={X:X_test, y:y_test, training_model:False, 
+                                                             seq_length:seq_len_test}))
+            evaluations.append((epoch, acc_val))
+            if acc_val > max_accuracy :
+                max_accuracy = acc_val
+                epoch_at_max = epoch
+                best_snapshot = model.snapshot()
+            # early stopping : no improvement during the last (patience) epochs
+            elif patience is not None and epoch - epoch_at_max >= patience :
+                stopped = True
+
+        epoch += 1
+
+    # saving the checkpoint the next segment resumes from (the graph definition is written once)
+    if not os.path.exists(config_dir) : os.makedirs(config_dir)
+    checkpoint_path = model.save(os.path.join(config_dir, "cortex_rnn"), global_step=epoch, 
+                                 write_meta_graph=start_epoch == 0)
+
+    # saving the weights of the best evaluation of the segment
+    best_checkpoint_path = None
+    if best_snapshot is not None:
+        model.load_snapshot(best_snapshot)
+        best_checkpoint_path = model.save(os.path.join(config_dir, "cortex_rnn_best"), global_step=epoch_at_max, 
+                                          write_meta_graph=False)
+
+    print("Configuration #", config_i, " trained up to epoch ", epoch, ", max accuracy : ", max_accuracy)
+
+    return {"config_i" : config_i, "evaluations" : evaluations, "epochs_trained" : epoch, "stopped" : stopped, 
+            "checkpoint_path" : checkpoint_path, "epoch_at_max" : epoch_at_max, 
+            "best_checkpoint_path" : best_checkpoint_path}
+
+
+# Parameter search where the configurations are trained in parallel worker processes, by segments of epochs
+# The training and testing data is loaded once, in shared memory, and used by all workers (a single copy of
+# the training set for all workers, the workers train on minibatches of it)
+# Each configuration is trained in its own model directory (see search_config_dir) and resumes from its
+# checkpoint at every segment
+class ParallelSearch():
+
+    '''
+    ParallelSearch
+
+    - train_configs trains a set of configurations up to an epoch (resuming from their checkpoint), in
+      parallel : n_workers configurations are trained at the same time, each with intra_op_threads
+      threads (n_workers * intra_op_threads ~ number of cores)
+
+    - The workers are new processes (tensorflow is not fork safe), each worker keeps its model factory
+      (see snaprnn.model.ModelFactory) : the graphs and sessions are reused by the next segments and
+      configurations of the same shape
+
+    - The state of each configuration (evaluations, epochs trained, checkpoint) is kept in config_states,
+      performances returns the configurations with their "max_accuracy", "epoch_at_max" and "epochs_trained"
+      entries (see log_config_performances)
+
+    - train_data :
+        Arrays, or a ModelBatchGenerator whose minibatches are written in shared memory one after the
+        other (see load_shared_batches) : the full training set is then never built in a single batch
+
+    - journal_f :
+        Each configuration and training segment is written in a search journal (see SearchJournal) as
+        soon as it is known. When the journal exists, the search resumes from it : the configurations
+        already trained are skipped, the others resume from their last checkpoint
+
+    - close has to be called to stop the workers and free the shared memory
+    '''
+
+    # inputs :
+    #   train_data : (X_train, y_train, seq_len_train), as returned by ModelBatchGenerator.next_batch,
+    #                or the ModelBatchGenerator of the training data
+    #   test_data : (X_test, y_test, seq_len_test)
+    #   model_dir : directory where the model of each configuration is generated
+    #   n_workers : number of configurations trained at the same time
+    #   intra_op_threads : number of threads of each worker
+    #   eval_every : number of epochs between two evaluations of the test accuracy
+    #   patience : number of epochs without improvement before a configuration stops (None : no early stopping)
+    #   journal_f : path to the search journal (None : no journal)
+    #   training_batch_size : number of sequences per training step (None : batch size of the generator,
+    #                         whole training set for arrays)
+    #   n_prefetch : number of batches built ahead of time while the generator is loaded
+    def __init__(self, train_data, test_data, model_dir, n_workers=2, intra_op_threads=1, eval_every=10, patience=None,
+                 journal_f=None, training_batch_size=None, n_prefetch=4):
+
+        self.model_dir = model_dir
+        self.eval_every = eval_every
+        self.patience = patience
+
+        # resuming from the journal
+        self.journal = None
+        self.config_states = {}
+        if journal_f is not None:
+            self.journal = SearchJournal(journal_f)
+            self.config_states = self.journal.config_states()
+
+        if isinstance(train_data, ModelBatchGenerator):
+            if training_batch_size is None : training_batch_size = train_data.batch_size
+            self.shared_data = load_shared_batches(train_data, n_prefetch)
+        else :
+            self.shared_data = SharedArrays(list(train_data))
+        self.training_batch_size = training_batch_size
+
+        try :
+            for array in test_data:
+                array = np.ascontiguousarray(array)
+                self.shared_data.new_array(array.shape, array.dtype)[...] = array
+            context = get_context("spawn")
+            self.pool = context.Pool(n_workers, initializer=init_search_worker,
+                                     initargs=(self.shared_data.descriptor(), intra_op_threads))
+        except :
+            self.shared_data.close()
+            self.shared_data.unlink()
+            raise
+
+
+    # adds configurations to the search (a configuration already in the search, resumed from the journal,
+    # is not added again)
+    # inputs : 
+    #   model_params : list of model configurations (see generate_random_params)
+    #   bracket : index of the bracket of the configurations (see run_hyperband_search)
+    # returns : index of each configuration
+    def add_configs(self, model_params, bracket=None):
+
+        config_ids = []
+        for model_param in model_params:
+
+            # configurations compared as written in the journal (numpy values)
+            journal_param = json.loads(json.dumps(model_param, default=json_value))
+            known_ids = [config_i for config_i, state in self.config_states.items() 
+                         if state["bracket"] == bracket and state["model_param"] == journal_param
+                         and config_i not in config_ids]
+            if known_ids : 
+                config_ids.append(known_ids[0])
+                continue
+
+            config_i = max(self.config_states.keys(), default=0) + 1
+            self.config_states[config_i] = new_config_state(model_param, bracket)
+            if self.journal is not None : self.journal.record_config(config_i, model_param, bracket)
+            config_ids.append(config_i)
+
+        return config_ids
+
+
+    # returns : indexes of the configurations of a bracket (see add_configs)
+    def bracket_configs(self, bracket):
+        return [config_i for config_i, state in self.config_states.items() if state["bracket"] == bracket]
+
+
+    # trains the specified configurations up to end_epoch (configurations that are further, stopped
+    # or failed are skipped)
+    # inputs :
+    #   config_ids : indexes of the configurations to train (see add_configs)
+    #   end_epoch : epoch reached by the configurations
+    # returns : number of epochs trained (all configurations)
+    def train_configs(self, config_ids, end_epoch):
+
+        search_tasks = []
+        for config_i in config_ids:
+            state = self.config_states[config_i]
+            if state["epochs_trained"] >= end_epoch or state["stopped"] or state["failed"] : continue
+            search_tasks.append({"config_i" : config_i, "model_param" : state["model_param"], 
+                                 "start_epoch" : state["epochs_trained"], "end_epoch" : end_epoch,
+                                 "model_dir" : self.model_dir, "eval_every" : self.eval_every, 
+                                 "patience" : self.patience, "batch_size" : self.training_batch_size,
+                                 "max_accuracy" : state["max_accuracy"],
+                                 "epoch_at_max" : state["epoch_at_max"], 
+                                 "checkpoint_path" : state["checkpoint_path"]})
+
+        # merging the results of the segment in the configuration states (and the journal) as they are done
+        # only the resume checkpoint and the best checkpoint of a configuration are kept
+        epochs_trained = 0
+        for result in self.pool.imap_unordered(train_search_config, search_tasks, chunksize=1):
+            if self.journal is not None : self.journal.record_segment(result)
+            state = self.config_states[result["config_i"]]
+            epochs_trained += merge_segment_result(state, result)
+            self.release_checkpoints(result["config_i"], (state["checkpoint_path"], state["best_checkpoint_path"]))
+
+        return epochs_trained
+
+
+    # deletes the checkpoints of a configuration, except the specified ones (the graph definition is kept)
+    # the directory of the configuration is removed when no checkpoint is kept
+    # inputs :
+    #   config_i : index of the configuration
+    #   keep_paths : checkpoints to keep (ex : resume checkpoint and best checkpoint)
+    def release_checkpoints(self, config_i, keep_paths=()):
+
+        config_dir = search_config_dir(self.model_dir, config_i)
+        if not os.path.isdir(config_dir) : return
+
+        keep_paths = [os.path.normpath(path) for path in keep_paths if path is not None]
+        checkpoint_paths = [os.path.join(config_dir, f[ : -len(".index")]) for f in listdir(config_dir) if f.endswith(".index")]
+        deleted_paths = [path for path in checkpoint_paths if os.path.normpath(path) not in keep_paths]
+        if not deleted_paths : return
+
+        # the deletion is journaled first : a checkpoint of the journal is never missing
+        if self.journal is not None : self.journal.record_deleted(config_i, deleted_paths)
+        forget_checkpoints(self.config_states[config_i], deleted_paths)
+
+        if not keep_paths : 
+            shutil.rmtree(config_dir)
+            return
+        for path in deleted_paths:
+            for checkpoint_file in glob.glob(path + ".index") + glob.glob(path + ".data-*"):
+                os.remove(checkpoint_file)
+
+
+    # returns : test accuracy of a configuration at the last evaluation before the specified epoch
+    #           (the checkpoint of the segment ending at that epoch)
+    def checkpoint_accuracy(self, config_i, epoch):
+
+        accuracy = 0
+        for eval_epoch, acc_val in self.config_states[config_i]["evaluations"]:
+            if eval_epoch < epoch : accuracy = acc_val
+
+        return accuracy
+
+
+    # returns : True if the configuration was stopped (failed or early stopping) before reaching the specified epoch
+    def is_stopped(self, config_i, epoch):
+        state = self.config_states[config_i]
+        return state["failed"] or (state["stopped"] and state["epochs_trained"] <= epoch)
+
+
+    # returns : total number of epochs trained by the specified configurations
+    def epochs_trained(self, config_ids):
+        return sum(self.config_states[config_i]["epochs_trained"] for config_i in config_ids)
+
+
+    # returns : list of the configurations which were trained, with their performance
+    def performances(self):
+
+        config_performances = []
+        for state in self.config_states.values():
+            model_perf = config_performance(state)
+            if model_perf is not None : config_performances.append(model_perf)
+
+        return config_performances
+
+
+    # stops the workers and frees the shared memory
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        self.shared_data.close()
+        self.shared_data.unlink()
+
+
+# trains the configurations of a parameter search in parallel worker processes, for n_epochs each
+# inputs :
+#   model_params : list of model configurations (see generate_random_params)
+#   train_data : (X_train, y_train, seq_len_train), as returned by ModelBatchGenerator.next_batch,
+#                or the ModelBatchGenerator of the training data (see ParallelSearch)
+#   test_data : (X_test, y_test, seq_len_test)
+#   n_epochs : number of training epochs per configuration
+#   model_dir : directory where the model of each configuration is generated
+#   n_workers : number of configurations trained at the same time
+#   intra_op_threads : number of threads of each worker (n_workers * intra_op_threads ~ number of cores)
+#   eval_every : number of epochs between two evaluations of the test accuracy
+#   log_name : name of the output log file (see log_config_performances)
+#   journal_f : path to the search journal, the search resumes from it when it exists (see ParallelSearch)
+#   training_batch_size, n_prefetch : minibatches of the training (see ParallelSearch)
+# returns : list of configurations with their performance (sorted, best first)
+def run_parallel_search(model_params, train_data, test_data, n_epochs, model_dir, n_workers=2, intra_op_threads=1,
+                        eval_every=10, log_name=None, journal_f=None, training_batch_size=None, n_prefetch=4):
+
+    search = ParallelSearch(train_data, test_data, model_dir, n_workers, intra_op_threads, eval_every, 
+                            journal_f=journal_f, training_batch_size=training_batch_size, n_prefetch=n_prefetch)
+    try :
+        search.train_configs(search.add_configs(model_params), n_epochs)
+    finally :
+        search.close()
+
+    # merging the performances of the configurations that were trained
+    config_performances = search.performances()
+    if config_performances : log_config_performances(config_performances, log_name)
+
+    return config_performances
+
+
+# defines the rungs of a successive halving search : the configurations are trained up to the epoch of
+# the rung, then only the best 1/eta of them is trained up to the epoch of the next rung (eta times further)
+# the last rung reaches max_epochs (as soon as a single configuration remains)
+# inputs :
+#   n_configs : number of configurations of the first rung
+#   min_epochs : epoch of the first rung
+#   max_epochs : epoch of the last rung
+#   eta : reduction factor between two rungs
+# returns : list of (number of configurations, epoch) of each rung
+def successive_halving_rungs(n_configs, min_epochs, max_epochs, eta=3):
+
+    if eta < 2 : raise(ValueError("The reduction factor eta has to be at least 2."))
+
+    rungs = []
+    n_rung = n_configs
+    rung_epoch = min(min_epochs, max_epochs)
+    while rung_epoch < max_epochs:
+        rungs.append((n_rung, rung_epoch))
+        n_rung = max(n_rung // eta, 1)
+        rung_epoch = max_epochs if n_rung == 1 else min(rung_epoch * eta, max_epochs)
+    rungs.append((n_rung, max_epochs))
+
+    return rungs
+
+
+# defines the brackets of a hyperband search : successive halving searches that trade the number of
+# configurations against the epoch of their first rung (from many configurations stopped early to
+# a few configurations trained for max_epochs)
+# inputs :
+#   min_epochs : smallest epoch of a first rung
+#   max_epochs : epoch of the last rung
+#   eta : reduction factor between two rungs
+# returns : list of (number of configurations, epoch of the first rung) of each bracket
+def hyperband_brackets(min_epochs, max_epochs, eta=3):
+
+    s_max = 0
+    while min_epochs * eta**(s_max + 1) <= max_epochs : s_max += 1
+
+    brackets = []
+    for s in range(s_max, -1, -1):
+        n_configs = int(math.ceil((s_max + 1) * eta**s / (s + 1)))
+        brackets.append((n_configs, max(max_epochs // eta**s, 1)))
+
+    return brackets
+
+
+# trains configurations as a successive halving search (see successive_halving_rungs) :
+# at each rung the configurations are evaluated at their checkpoint, the ones that are not in the best 1/eta
+# are stopped, and the epochs are reallocated to the others, which resume from their checkpoint
+# the selection of each rung only depends on the evaluations at the previous rung, so that a search
+# resumed from its journal keeps the same configurations
+# the checkpoints of the eliminated configurations are deleted, only the configurations of the last rung keep theirs
+# inputs :
+#   search : ParallelSearch where the configurations are trained
+#   config_ids : indexes of the configurations (see ParallelSearch.add_configs)
+#   min_epochs : epoch of the first rung
+#   max_epochs : epoch of the last rung
+#   eta : reduction factor between two rungs
+# returns : number of epochs trained, number of epochs of an exhaustive training (max_epochs per configuration)
+def successive_halving(search, config_ids, min_epochs, max_epochs, eta=3):
+
+    rung_ids = list(config_ids)
+    previous_epoch = 0
+
+    for n_rung, rung_epoch in successive_halving_rungs(len(config_ids), min_epochs, max_epochs, eta):
+
+        # keeping the best configurations of the previous rung (configurations stopped early are not kept)
+        previous_ids = rung_ids
+        rung_ids = [config_i for config_i in rung_ids if not search.is_stopped(config_i, previous_epoch)]
+        rung_ids.sort(key=lambda config_i: search.checkpoint_accuracy(config_i, previous_epoch), reverse=True)
+        rung_ids = rung_ids[ : n_rung]
+        for config_i in previous_ids:
+            if config_i not in rung_ids : search.release_checkpoints(config_i)
+        if not rung_ids : break
+
+        print("Rung : ", len(rung_ids), " configurations trained up to epoch ", rung_epoch)
+        search.train_configs(rung_ids, rung_epoch)
+        previous_epoch = rung_epoch
+
+    return search.epochs_trained(config_ids), len(config_ids) * max_epochs
+
+
+# returns : summary of the compute saved by a search, compared to an exhaustive training
+def search_compute_summary(epochs_trained, exhaustive_epochs):
+
+    saved = 1 - epochs_trained / float(max(exhaustive_epochs, 1))
+
+    summary = "Epochs trained : " + str(epochs_trained) + "\n"
+    summary += "Epochs of an exhaustive search : " + str(exhaustive_epochs) + "\n"
+    summary += "Compute saved : " + str(round(100 * saved, 1)) + " %\n"
+
+    return summary
+
+
+# hyperband parameter search : successive halving brackets (see hyperband_brackets), the configurations
+# of each bracket are randomly generated around the anchor values (see generate_random_params)
+# when the search resumes from its journal, the configurations of the brackets already started are kept
+# inputs :
+#   anchor_values, variation, static_params : parameter space (see generate_random_params)
+#   train_data : (X_train, y_train, seq_len_train), as returned by ModelBatchGenerator.next_batch,
+#                or the ModelBatchGenerator of the training data (see ParallelSearch)
+#   test_data : (X_test, y_test, seq_len_test)
+#   min_epochs : smallest epoch of a first rung
+#   max_epochs : number of training epochs of the best configurations
+#   model_dir : directory where the model of each configuration is generated
+#   eta : reduction factor between two rungs
+#   n_brackets : number of brackets to run (None : all brackets, from the most aggressive one)
+#   n_workers, intra_op_threads, eval_every, patience, journal_f, training_batch_size, n_prefetch : see ParallelSearch
+#   log_name : name of the output log file (see log_config_performances)
+# returns : list of configurations with their performance (sorted, best first), summary of the compute saved
+def run_hyperband_search(anchor_values, train_data, test_data, min_epochs, max_epochs, model_dir, eta=3, n_brackets=None,
+                         variation=0.5, static_params=None, n_workers=2, intra_op_threads=1, eval_every=10, 
+                         patience=None, log_name=None, journal_f=None, training_batch_size=None, n_prefetch=4):
+
+    brackets = hyperband_brackets(min_epochs, max_epochs, eta)
+    if n_brackets is not None : brackets = brackets[ : n_brackets]
+
+    epochs_trained = 0
+    exhaustive_epochs = 0
+
+    search = ParallelSearch(train_data, test_data, model_dir, n_workers, intra_op_threads, eval_every, patience, 
+                            journal_f, training_batch_size, n_prefetch)
+    try :
+        for bracket, (n_configs, bracket_min_epochs) in enumerate(brackets):
+
+            print("Bracket : ", n_configs, " configurations, first rung at epoch ", bracket_min_epochs)
+            config_ids = search.bracket_configs(bracket)
+            if not config_ids :
+                model_params = generate_random_params(anchor_values, n_configs, variation, static_params)
+                config_ids = search.add_configs(model_params, bracket)
+
+            bracket_epochs, bracket_exhaustive = successive_halving(search, config_ids, bracket_min_epochs, 
+                                                                    max_epochs, eta)
+            epochs_trained += bracket_epochs
+            exhaustive_epochs += bracket_exhaustive
+    finally :
+        search.close()
+
+    summary = search_compute_summary(epochs_trained, exhaustive_epochs)
+    print(summary)
+
+    config_performances = search.performances()
+    if config_performances : log_config_performances(config_performances, log_name, summary)
+
+    return config_performances, summary
@@ -0,0 +1,79 @@
+import tempfile
+import time
+import numpy as np
+import tensorflow as tf
+
+# importing model utilities
+from snaprnn.evaluate import restore_tf_session, zero_padd_sequence, ModelInference
+from snaprnn.model import generate_blank_model
+
+# Compares the two ways of evaluating a movement one step at a time :
+#   - full runs : the zero padded sequence is run again through the RNN for each new step
+#   - streaming : only the new step is run, from the hidden state of the previous step
+# Checks that both produce the same labels and probabilities and times both modes
+# A blank model is generated, the movements are random
+
+n_movements = 10
+
+
+if __name__ == "__main__":
+
+    model_dir = tempfile.mkdtemp()
+    generate_blank_model(model_dir)
+    tf.reset_default_graph()
+
+    restored_sess, _ = restore_tf_session(model_dir)
+
+    with restored_sess as session:
+
+        # fetching the sequence operations
+        X = tf.get_collection('X')[0]
+        seq_length = tf.get_collection('seq_length')[0]
+        training_model = tf.get_collection('training_model')[0]
+        predictions_op = tf.get_collection('class_ids')[0]
+        prob_op = tf.get_collection('probabilities')[0]
+        n_inputs = int(X.shape[2])
+        n_steps = int(X.shape[1])
+
+        # fetching the single step operations
+        model = ModelInference(session)
+
+        movements = np.random.randn(n_movements, n_steps, n_inputs).astype(np.float32)
+
+        # full runs, as done before the streaming mode
+        full_labels = np.zeros((n_movements, n_steps), dtype=np.int64)
+        full_probs = np.zeros((n_movements, n_steps, prob_op.shape[2]), dtype=np.float32)
+        t0 = time.time()
+        for mov_i in range(n_movements):
+            for step in range(1, n_steps + 1):
+                formatted_mov = np.expand_dims(zero_padd_sequence(movements[mov_i, : step], n_steps), axis=0)
+                labels, probs = session.run([predictions_op, prob_op],
+                                feed_dict={training_model:False, seq_length:[step], X:formatted_mov})
+                full_labels[mov_i, step-1] = labels[0][step-1]
+                full_probs[mov_i, step-1] = probs[0][step-1]
+        full_time = time.time() - t0
+
+        # streaming, the hidden state is carried from one step to the next
+        stream_labels = np.zeros_like(full_labels)
+        stream_probs = np.zeros_like(full_probs)
+        t0 = time.time()
+        for mov_i in range(n_movements):
+            state = model.zero_states(1)
+            for step in range(n_steps):
+                labels, probs, _, state = model.run_step(movements[mov_i, step : step + 1], state)
+                stream_labels[mov_i, step] = labels[0]
+                stream_probs[mov_i, step] = probs[0]
+        stream_time = time.time() - t0
+
+    # regression check : same labels, same probabilities
+    assert np.array_equal(full_labels, stream_labels)
+    assert np.allclose(full_probs, stream_probs, rtol=0, atol=1e-6)
+    print("parity : same labels, probabilities %s (max difference %.2e)" %
+          ("bit for bit" if np.array_equal(full_probs, stream_probs) else "within 1e-6",
+           np.abs(full_probs - stream_probs).max()))
+
+    n_evals = n_movements * n_steps
+    print("full runs : %5d GRU steps per movement, %6.2f ms per step" %
+          (n_steps * (n_steps + 1) // 2, full_time / n_evals * 1000))
+    print("streaming : %5d GRU steps per movement, %6.2f ms per step" %
+          (n_steps, stream_time / n_evals * 1000))